@@ -1,13 +1,24 @@
 import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dotenv import load_dotenv
 
 from langchain_core.prompts import PromptTemplate
-from langchain_huggingface.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
 from langchain_groq import ChatGroq
 
-from query_transformation import transform_query
+from query_transformation import transform_query, atransform_query
+from transform_gate import transform_gate
+from session_store import SessionStore
+from embedding_cache import CachedQueryEmbeddings, query_embedding_cache
+from answer_cache import ANSWER_CACHE_ENABLED, answer_cache
+from index_pool import VectorStorePool
+from embedding_registry import get_embeddings, loaded_models
+from vectorstore_io import get_index_embedding_model, load_vectorstore
+from hybrid_retriever import HYBRID_SEARCH, RRF_K, HybridRetriever
+from reranker import RERANK_ENABLED, RERANK_CANDIDATES, RERANK_TOP_N, reranker
+from prompt_budget import PROMPT_CONTEXT_TOKENS, PROMPT_HISTORY_TOKENS, pack_context, pack_history, format_turn, token_counter
+from history_compactor import HistoryCompactor, format_summary
 
 # --- Configurações ---
 load_dotenv()
@@ -19,6 +30,11 @@ EMBED_MODEL_ID = os.getenv("EMBED_MODEL_ID")
 GEN_MODEL_ID = os.getenv("GEN_MODEL_ID")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY") 
 TOP_K = int(os.getenv("TOP_K", 3))
+RAG_MAX_WORKERS = int(os.getenv("RAG_MAX_WORKERS", 4))
+# Candidatos buscados em cada lista (densa e BM25) antes da fusão
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", TOP_K * 2))
+# Com o reranking, a busca traz mais candidatos e o cross-encoder escolhe os melhores
+RETRIEVAL_K = max(RERANK_CANDIDATES, TOP_K) if RERANK_ENABLED else TOP_K
 
 PROMPT = PromptTemplate.from_template(
     "Você é um assistente acadêmico especializado da UFAPE (Universidade Federal do Agreste de Pernambuco). Sua única missão é responder perguntas baseando-se estrita e exclusivamente no CONTEXTO fornecido, que contém trechos de documentos oficiais do Departamento de Registro e Controle Acadêmico (DRCA). \nContexto fornecido.\n---------------------\n{context}\n---------------------\nHistórico da conversa.\n---------------------\n{conversation}\n---------------------\nInstruções para a resposta: 1. O CONTEXTO é sua única fonte de informação. NÃO utilize nenhum conhecimento prévio ou externo à UFAPE ou ao mundo.\n2. Se a informação para responder a pergunta não estiver contida no CONTEXTO, sua única e obrigatória resposta deve ser: 'Com base nos documentos oficiais fornecidos, não encontrei informações sobre este tópico.' Não tente adivinhar ou inferir.\n3. Não sugira outros documentos, sites, links ou departamentos, a menos que o CONTEXTO fornecido os mencione explicitamente como um próximo passo.\n4. Nunca use frases como 'conforme descrito no contexto', 'segundo o contexto fornecido' ou similares em sua resposta final. Sua função é agir como se você fosse a fonte da informação, sintetizando os fatos do contexto de forma direta.\npergunta: {input}\nResposta (Forneça uma resposta clara, concisa e profissional, extraída diretamente do CONTEXTO. Se possível, inicie citando a fonte, como 'De acordo com o Art. XX do Regimento...'):\n",
@@ -27,7 +43,8 @@ PROMPT = PromptTemplate.from_template(
 # --- Variáveis globais para estado atual ---
 current_vectorstore = None
 current_retriever = None
-conversation_history = []
+current_index_version = None
+session_store = SessionStore()
 
 # --- Gerenciador de bases (será injetado) ---
 # Vamos assumir que temos um base_manager global disponível
@@ -65,48 +82,128 @@ def load_vector_store(faiss_index_path=None):
                 "Por favor, execute o script 'ingest.py' primeiro para criar o índice."
             )
         print(f"✅ Carregando índice FAISS existente de '{faiss_index_path}'...")
-        embedding = HuggingFaceEmbeddings(model_name=EMBED_MODEL_ID)
-        vectorstore = FAISS.load_local(faiss_index_path, embedding, allow_dangerous_deserialization=True)
+        # Usa o mesmo modelo que construiu o índice, compartilhado pelo registro de modelos
+        model_id = get_index_embedding_model(faiss_index_path, default=EMBED_MODEL_ID)
+        embedding = CachedQueryEmbeddings(get_embeddings(model_id), model_id=model_id)
+        vectorstore = load_vectorstore(faiss_index_path, embedding)
         print("✅ Índice carregado com sucesso.")
         return vectorstore
     except Exception as e:
         print(f"⚠️ Erro ao carregar o índice FAISS: {e}")
         return None
 
+def create_retriever(vectorstore):
+    """Busca híbrida (FAISS + BM25) quando a base tem índice esparso; senão, só a densa."""
+    sparse_index = getattr(vectorstore, "sparse_index", None)
+    if HYBRID_SEARCH and sparse_index is not None:
+        return HybridRetriever(
+            vectorstore=vectorstore,
+            sparse_index=sparse_index,
+            k=RETRIEVAL_K,
+            dense_k=max(HYBRID_CANDIDATES, RETRIEVAL_K),
+            sparse_k=max(HYBRID_CANDIDATES, RETRIEVAL_K),
+            rrf_k=RRF_K
+        )
+    return vectorstore.as_retriever(search_kwargs={"k": RETRIEVAL_K})
+
+# Pool com os vector stores de várias bases residentes em memória
+index_pool = VectorStorePool(load_vector_store, create_retriever)
+
+def get_base_config(base_name):
+    """Retorna a configuração de uma base, relendo o bases_config.json se ela for nova."""
+    base_config = base_manager.bases_config.get(base_name)
+    if base_config is None and hasattr(base_manager, "load_bases_config"):
+        base_manager.load_bases_config()
+        base_config = base_manager.bases_config.get(base_name)
+    return base_config
+
+def resolve_base(base_name=None):
+    """Retorna o nome da base a usar na requisição (a base atual se nenhuma for informada)."""
+    base_name = base_name or base_manager.current_base
+    if get_base_config(base_name) is None:
+        raise ValueError(f"Base '{base_name}' não encontrada")
+    return base_name
+
+def acquire_retriever(base_name):
+    """
+    Retorna (retriever, versão do índice, entrada do pool) da base, carregando-a
+    no pool se necessário. A entrada deve ser devolvida com release_retriever.
+    """
+    entry = index_pool.acquire(base_name, get_base_config(base_name)["faiss_index_path"])
+    if entry is None:
+        return None, None, None
+    return entry.retriever, entry.index_version, entry
+
+def release_retriever(entry):
+    """Devolve ao pool a entrada obtida com acquire_retriever."""
+    index_pool.release(entry)
+
 def initialize_rag_system():
     """Inicializa o sistema RAG com a base atual"""
-    global current_vectorstore, current_retriever
+    global current_vectorstore, current_retriever, current_index_version
     
     try:
-        base_config = base_manager.get_current_base_config()
-
-        faiss_index_path = base_config["faiss_index_path"]
+        # Carrega o tokenizer da contagem do prompt (se configurado) fora do caminho das consultas
+        token_counter.name
+        entry = index_pool.get(base_manager.current_base, base_manager.get_current_base_config()["faiss_index_path"])
         
-        current_vectorstore = load_vector_store(faiss_index_path)
-        
-        if current_vectorstore is not None:
-            current_retriever = current_vectorstore.as_retriever(search_kwargs={"k": TOP_K})
+        if entry is not None:
+            current_vectorstore = entry.vectorstore
+            current_retriever = entry.retriever
+            current_index_version = entry.index_version
             print(f"✅ Sistema RAG inicializado para base: {base_manager.current_base}")
         else:
+            current_vectorstore = None
             current_retriever = None
+            current_index_version = None
             print(f"⚠️ Continuando sem vectorstore para base: {base_manager.current_base}")
             
     except Exception as e:
         print(f"❌ Erro ao inicializar sistema RAG: {e}")
         current_vectorstore = None
         current_retriever = None
+        current_index_version = None
 
 def switch_base_rag(base_name):
-    """Muda para uma base específica"""
-    global current_vectorstore, current_retriever
-
+    """
+    Muda a base padrão (usada quando a requisição não informa uma base). Os
+    históricos das sessões são mantidos: cada sessão escolhe a sua base.
+    """
     if base_name in base_manager.bases_config:
         base_manager.current_base = base_name
         initialize_rag_system()
-        reset_conversation_history()
         return True
     return False
 
+def invalidate_base_index(base_name=None):
+    """Descarta o índice residente de uma base para que seja recarregado do disco."""
+    index_pool.invalidate(base_name)
+    if base_name is None or base_name == base_manager.current_base:
+        initialize_rag_system()
+
+def invalidate_query_embedding_cache():
+    """Descarta os embeddings de consultas em cache (ex.: após mudança do EMBED_MODEL_ID)."""
+    query_embedding_cache.clear()
+    print("Cache de embeddings de consultas invalidado.")
+
+def invalidate_answer_cache(base_name=None):
+    """Descarta as respostas em cache de uma base (ex.: após recriar o índice)."""
+    answer_cache.invalidate(base_name)
+    print(f"Cache de respostas invalidado para base: {base_name or 'todas'}")
+
+def get_cache_stats():
+    """Retorna estatísticas dos caches e das sessões do RAG."""
+    return {
+        "query_embeddings": query_embedding_cache.stats(),
+        "answers": answer_cache.stats(),
+        "index_pool": index_pool.stats(),
+        "embedding_models": loaded_models(),
+        "reranker": reranker.stats(),
+        "sessions": session_store.stats(),
+        "history_compactor": history_compactor.stats(),
+        "query_transform": transform_gate.stats()
+    }
+
 def get_current_base():
     """Retorna o nome da base atual"""
     return base_manager.current_base
@@ -117,86 +214,316 @@ client = ChatGroq(
     model_name=GEN_MODEL_ID
 )
 
+# Resumo dos turnos antigos das sessões longas, gerado em segundo plano
+history_compactor = HistoryCompactor(session_store, client)
+
 # 3. Lógica de Conversação
-def reset_conversation_history():
-    """Reseta o histórico da conversa."""
-    global conversation_history
-    conversation_history = []
-    print("Histórico da conversa resetado.")
+def reset_conversation_history(session_id=None):
+    """Reseta o histórico da conversa de uma sessão, ou de todas se session_id for None."""
+    if session_id is None:
+        session_store.clear()
+        print("Histórico de todas as conversas resetado.")
+    else:
+        session_store.reset(session_id)
+        print(f"Histórico da conversa resetado para a sessão: {session_id}")
+
+def get_conversation_history(session_id=None):
+    """Retorna o histórico da conversa de uma sessão."""
+    return session_store.get_history(session_id)
+
+def get_conversation_summary(session_id=None):
+    """Retorna o resumo dos turnos antigos da sessão (vazio se não houver)."""
+    return session_store.get_summary(session_id)
 
-def update_conversation_history(question, answer):
-    """Adiciona a pergunta e resposta ao histórico."""
-    conversation_history.append({"question": question, "answer": answer})
+def update_conversation_history(question, answer, session_id=None):
+    """
+    Adiciona a pergunta e resposta ao histórico da sessão e, se ela passou dos
+    limites, agenda o resumo dos turnos antigos (sem bloquear a resposta).
+    """
+    session_store.append(session_id, question, answer)
+    history_compactor.schedule(session_id)
 
-def rag_chain(input_text: str):
+def merge_documents(original_docs, transformed_docs):
+    """Une os documentos das duas buscas, removendo duplicados e limitando a RETRIEVAL_K*2."""
+    unique_docs = []
+    seen_content = set()
+
+    for doc in original_docs + transformed_docs:
+        if doc.page_content not in seen_content:
+            seen_content.add(doc.page_content)
+            unique_docs.append(doc)
+
+    return unique_docs[:RETRIEVAL_K*2]
+
+def rerank_context(query, docs):
+    """
+    Reordena os candidatos com o cross-encoder e mantém os RERANK_TOP_N melhores.
+    Se o reranker falhar, mantém os TOP_K primeiros candidatos na ordem da busca.
+    Retorna (documentos, relatório da etapa); o relatório é None sem reranking.
+    """
+    if not RERANK_ENABLED or not docs:
+        return docs, None
+    try:
+        kept, report = reranker.rerank(query, docs, RERANK_TOP_N)
+    except Exception as e:
+        print(f"⚠️ Erro no reranking, usando a ordem da busca: {e}")
+        return docs[:TOP_K], None
+    print(f"✂️ Rerank: {report['candidates']} → {report['kept']} chunks, "
+          f"~{report['tokens_saved']} tokens de contexto economizados ({report['latency_ms']} ms)")
+    return kept, report
+
+def build_prompt(input_text, context_docs, conversation_history, conversation_summary=""):
+    """
+    Monta o prompt final a partir do contexto e do histórico da sessão, dentro
+    dos orçamentos de tokens: os chunks mais relevantes (PROMPT_CONTEXT_TOKENS)
+    e os turnos mais recentes (PROMPT_HISTORY_TOKENS). O resumo dos turnos
+    antigos, se houver, abre o histórico e conta no mesmo orçamento.
+    Retorna (prompt, chunks que entraram no prompt).
+    """
+    summary_block = format_summary(conversation_summary) if conversation_summary else ""
+    summary_tokens = token_counter.count(summary_block) if summary_block else 0
+    context_docs, context_tokens = pack_context(context_docs)
+    turns, history_tokens = pack_history(conversation_history, max(PROMPT_HISTORY_TOKENS - summary_tokens, 0))
+    history_tokens += summary_tokens
+    print(f"🧮 Prompt: contexto {context_tokens}/{PROMPT_CONTEXT_TOKENS} tokens ({len(context_docs)} chunks), "
+          f"histórico {history_tokens}/{PROMPT_HISTORY_TOKENS} tokens ({len(turns)} de {len(conversation_history)} turnos)")
+    context = "\n".join([doc.page_content for doc in context_docs])
+    formatted_history = "\n".join(([summary_block] if summary_block else []) + [format_turn(turn) for turn in turns])
+    return PROMPT.format(context=context, input=input_text, conversation=formatted_history), context_docs
+
+def log_interaction(base_name, input_text, transformed_query, final_prompt, answer, has_retriever):
+    """LOGs para depuração."""
+    print('='*50)
+    print(f"Base: {base_name} | LLM: {GEN_MODEL_ID} | Embedding: {EMBED_MODEL_ID}")
+    print('='*50)
+    print(f"QUERY ORIGINAL: {input_text}")
+    if has_retriever:
+        print(f"QUERY TRANSFORMADA: {transformed_query}")
+    else:
+        print("QUERY TRANSFORMADA: (não aplicável - sem vectorstore)")
+    print('='*50)
+    print(f"PROMPT ENVIADO:\n{final_prompt}")
+    print('='*50)
+    print(f"RESPOSTA RECEBIDA:\n{answer}")
+    print('='*50)
+
+def build_result(base_name, input_text, transformed_query, answer, context_docs, cache_hit=False, rerank=None):
+    return {
+        "input": input_text,
+        "transformed_query": transformed_query,
+        "resposta": answer,
+        "contexto": context_docs,
+        "base_used": base_name,
+        "cache_hit": cache_hit,
+        "rerank": rerank
+    }
+
+def lookup_answer_cache(retriever, base_name, index_version, input_text, conversation_history):
+    """
+    Consulta o cache semântico para perguntas de primeiro turno.
+    Retorna (vetor da pergunta, resultado em cache); o vetor é None quando o cache não se aplica.
+    """
+    if not ANSWER_CACHE_ENABLED or retriever is None or conversation_history or index_version is None:
+        return None, None
+    query_vector = retriever.vectorstore.embeddings.embed_query(input_text)
+    return query_vector, answer_cache.lookup(base_name, index_version, query_vector)
+
+def serve_cached_answer(cached, base_name, input_text, session_id):
+    """Monta a resposta a partir do cache e registra o turno no histórico da sessão."""
+    print(f"♻️ Resposta servida do cache semântico para: {input_text}")
+    update_conversation_history(input_text, cached["resposta"], session_id)
+    return build_result(base_name, input_text, cached["transformed_query"], cached["resposta"], cached["contexto"], cache_hit=True)
+
+def store_answer(query_vector, base_name, index_version, input_text, result):
+    if query_vector is not None:
+        answer_cache.store(base_name, index_version, query_vector, input_text, result)
+
+def build_error_result(base_name, input_text):
+    """Resposta padrão em caso de erro."""
+    return build_result(
+        base_name,
+        input_text,
+        input_text,
+        "Ocorreu um erro ao processar sua solicitação. Por favor, tente novamente.",
+        []
+    )
+
+# Embeddings e busca no FAISS são CPU-bound e rodam em um pool de threads limitado,
+# o que também permite sobrepor a busca da pergunta original com a transformação da query.
+retrieval_executor = ThreadPoolExecutor(max_workers=RAG_MAX_WORKERS, thread_name_prefix="rag-retrieval")
+
+def rag_chain(input_text: str, session_id: str = None, base: str = None):
     """Executa a cadeia de RAG. Funciona mesmo sem o vectorstore carregado."""
-    global current_retriever
-    
+    base_name = resolve_base(base)
+    entry = None
+
     try:
+        retriever, index_version, entry = acquire_retriever(base_name)
+        conversation_history = get_conversation_history(session_id)
+        conversation_summary = get_conversation_summary(session_id)
+
+        # Perguntas de primeiro turno podem ser respondidas pelo cache semântico, sem chamar o LLM
+        query_vector, cached = lookup_answer_cache(
+            retriever, base_name, index_version, input_text, conversation_history or conversation_summary
+        )
+        if cached is not None:
+            return serve_cached_answer(cached, base_name, input_text, session_id)
+
         # Se não tivermos um retriever, usamos um contexto vazio
-        if current_retriever is None:
-            context = ""
+        rerank_report = None
+        if retriever is None:
             context_docs = []
             transformed_query = input_text
         else:
-            original_docs = current_retriever.get_relevant_documents(input_text)
-            transformed_query = transform_query(input_text, conversation_history)
-            transformed_docs = current_retriever.get_relevant_documents(transformed_query)
-
-            all_docs = original_docs + transformed_docs
-            unique_docs = []
-            seen_content = set()
-
-            for doc in all_docs:
-                if doc.page_content not in seen_content:
-                    seen_content.add(doc.page_content)
-                    unique_docs.append(doc)
-            
-            context_docs = unique_docs[:TOP_K*2]
-            context = "\n".join([doc.page_content for doc in context_docs])
-        
-        # Formata o histórico para o prompt
-        formatted_history = "\n".join([f"User: {turn['question']}\nAI: {turn['answer']}" for turn in conversation_history])
+            # A busca pela pergunta original roda enquanto o LLM transforma a query
+            original_future = retrieval_executor.submit(retriever.invoke, input_text)
+            transformed_query = transform_query(input_text, conversation_history, conversation_summary)
+            original_docs = original_future.result()
+            # Sem transformação, a segunda busca seria igual à primeira
+            transformed_docs = [] if transformed_query == input_text else retriever.invoke(transformed_query)
+            context_docs, rerank_report = rerank_context(transformed_query, merge_documents(original_docs, transformed_docs))
+
+        final_prompt, context_docs = build_prompt(input_text, context_docs, conversation_history, conversation_summary)
 
-        final_prompt = PROMPT.format(context=context, input=input_text, conversation=formatted_history)
-        
         response = client.invoke(final_prompt)
         answer = response.content
-        
-        update_conversation_history(input_text, answer)
-
-        # LOGs para depuração
-        print('='*50)
-        print(f"Base: {base_manager.current_base} | LLM: {GEN_MODEL_ID} | Embedding: {EMBED_MODEL_ID}")
-        print('='*50)
-        print(f"QUERY ORIGINAL: {input_text}")
-        if current_retriever is not None:
-            print(f"QUERY TRANSFORMADA: {transformed_query}")
-        else:
-            print("QUERY TRANSFORMADA: (não aplicável - sem vectorstore)")
-        print('='*50)
-        print(f"PROMPT ENVIADO:\n{final_prompt}")
-        print('='*50)
-        print(f"RESPOSTA RECEBIDA:\n{answer}")
-        print('='*50)
-
-        return {
-            "input": input_text,
-            "transformed_query": transformed_query,
-            "resposta": answer,
-            "contexto": context_docs if current_retriever is not None else [],
-            "base_used": base_manager.current_base
-        }
+
+        update_conversation_history(input_text, answer, session_id)
+        log_interaction(base_name, input_text, transformed_query, final_prompt, answer, retriever is not None)
+
+        result = build_result(base_name, input_text, transformed_query, answer, context_docs, rerank=rerank_report)
+        store_answer(query_vector, base_name, index_version, input_text, result)
+        return result
+    except Exception as e:
+        print(f"⚠️ Erro durante o processamento RAG: {e}")
+        return build_error_result(base_name, input_text)
+    finally:
+        release_retriever(entry)
+
+# --- Versão assíncrona ---
+async def aretrieve(retriever, query: str):
+    """Executa a busca de documentos no pool de threads."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(retrieval_executor, retriever.invoke, query)
+
+async def atransform_and_retrieve(retriever, input_text: str, conversation_history, conversation_summary=""):
+    """Transforma a query com o LLM e busca os documentos da query transformada."""
+    transformed_query = await atransform_query(input_text, conversation_history, conversation_summary)
+    if transformed_query == input_text:
+        # Sem transformação, a busca seria igual à da pergunta original
+        return transformed_query, []
+    transformed_docs = await aretrieve(retriever, transformed_query)
+    return transformed_query, transformed_docs
+
+async def aretrieve_context(retriever, input_text: str, conversation_history, conversation_summary=""):
+    """
+    Retorna (query transformada, documentos de contexto, relatório do reranking)
+    sem bloquear o event loop.
+    """
+    if retriever is None:
+        return input_text, [], None
+
+    # A busca pela pergunta original roda enquanto o LLM transforma a query
+    original_docs, (transformed_query, transformed_docs) = await asyncio.gather(
+        aretrieve(retriever, input_text),
+        atransform_and_retrieve(retriever, input_text, conversation_history, conversation_summary)
+    )
+    loop = asyncio.get_running_loop()
+    context_docs, rerank_report = await loop.run_in_executor(
+        retrieval_executor, rerank_context, transformed_query, merge_documents(original_docs, transformed_docs)
+    )
+    return transformed_query, context_docs, rerank_report
+
+async def arag_chain(input_text: str, session_id: str = None, base: str = None):
+    """Versão assíncrona de rag_chain: usa ainvoke nas chamadas ao LLM e não bloqueia o event loop."""
+    base_name = resolve_base(base)
+    entry = None
+
+    try:
+        conversation_history = get_conversation_history(session_id)
+        conversation_summary = get_conversation_summary(session_id)
+
+        loop = asyncio.get_running_loop()
+        retriever, index_version, entry = await loop.run_in_executor(retrieval_executor, acquire_retriever, base_name)
+        query_vector, cached = await loop.run_in_executor(
+            retrieval_executor, lookup_answer_cache, retriever, base_name, index_version, input_text,
+            conversation_history or conversation_summary
+        )
+        if cached is not None:
+            return serve_cached_answer(cached, base_name, input_text, session_id)
+
+        transformed_query, context_docs, rerank_report = await aretrieve_context(
+            retriever, input_text, conversation_history, conversation_summary
+        )
+
+        final_prompt, context_docs = build_prompt(input_text, context_docs, conversation_history, conversation_summary)
+
+        response = await client.ainvoke(final_prompt)
+        answer = response.content
+
+        update_conversation_history(input_text, answer, session_id)
+        log_interaction(base_name, input_text, transformed_query, final_prompt, answer, retriever is not None)
+
+        result = build_result(base_name, input_text, transformed_query, answer, context_docs, rerank=rerank_report)
+        store_answer(query_vector, base_name, index_version, input_text, result)
+        return result
     except Exception as e:
         print(f"⚠️ Erro durante o processamento RAG: {e}")
-        # Retorna uma resposta padrão em caso de erro
-        return {
-            "input": input_text,
-            "transformed_query": input_text,
-            "resposta": "Ocorreu um erro ao processar sua solicitação. Por favor, tente novamente.",
-            "contexto": [],
-            "base_used": base_manager.current_base
-        }
+        return build_error_result(base_name, input_text)
+    finally:
+        release_retriever(entry)
+
+async def astream_rag_chain(input_text: str, session_id: str = None, base: str = None):
+    """
+    Versão em streaming de arag_chain. Gera eventos na ordem:
+    'context' (query transformada e documentos), vários 'token' com trechos da
+    resposta e um 'done' com o resultado completo. Em caso de falha gera 'error'.
+    O histórico da sessão só é atualizado quando a resposta termina.
+    """
+    base_name = resolve_base(base)
+    entry = None
+
+    try:
+        conversation_history = get_conversation_history(session_id)
+        conversation_summary = get_conversation_summary(session_id)
+
+        loop = asyncio.get_running_loop()
+        retriever, index_version, entry = await loop.run_in_executor(retrieval_executor, acquire_retriever, base_name)
+        query_vector, cached = await loop.run_in_executor(
+            retrieval_executor, lookup_answer_cache, retriever, base_name, index_version, input_text,
+            conversation_history or conversation_summary
+        )
+        if cached is not None:
+            result = serve_cached_answer(cached, base_name, input_text, session_id)
+            yield {"event": "context", "transformed_query": result["transformed_query"], "contexto": result["contexto"]}
+            yield {"event": "token", "content": result["resposta"]}
+            yield {"event": "done", "result": result}
+            return
+
+        transformed_query, context_docs, rerank_report = await aretrieve_context(
+            retriever, input_text, conversation_history, conversation_summary
+        )
+        final_prompt, context_docs = build_prompt(input_text, context_docs, conversation_history, conversation_summary)
+        yield {"event": "context", "transformed_query": transformed_query, "contexto": context_docs}
+
+        answer_parts = []
+        async for chunk in client.astream(final_prompt):
+            if chunk.content:
+                answer_parts.append(chunk.content)
+                yield {"event": "token", "content": chunk.content}
+        answer = "".join(answer_parts)
+
+        update_conversation_history(input_text, answer, session_id)
+        log_interaction(base_name, input_text, transformed_query, final_prompt, answer, retriever is not None)
+
+        result = build_result(base_name, input_text, transformed_query, answer, context_docs, rerank=rerank_report)
+        store_answer(query_vector, base_name, index_version, input_text, result)
+        yield {"event": "done", "result": result}
+    except Exception as e:
+        print(f"⚠️ Erro durante o processamento RAG (streaming): {e}")
+        yield {"event": "error", "result": build_error_result(base_name, input_text)}
+    finally:
+        release_retriever(entry)
 
 # Inicializar o sistema ao importar
 initialize_rag_system()
\ No newline at end of file
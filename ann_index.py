@@ -0,0 +1,315 @@
+import os
+import math
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import faiss
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Tipo de índice padrão das bases sem "index" no bases_config.json
+FAISS_INDEX_SPEC = os.getenv("FAISS_INDEX_SPEC", "flat")
+# Consultas usadas na avaliação de recall/latência após cada construção (0 = desativada)
+ANN_EVAL_QUERIES = int(os.getenv("ANN_EVAL_QUERIES", 200))
+ANN_EVAL_K = int(os.getenv("ANN_EVAL_K", os.getenv("TOP_K", 10)))
+# Candidatos buscados no índice quantizado por resultado final, antes da reordenação exata
+ANN_RESCORE_FACTOR = int(os.getenv("ANN_RESCORE_FACTOR", 4))
+
+INDEX_TYPES = ("flat", "ivf", "hnsw")
+QUANTIZERS = ("none", "sq8", "pq")
+
+# Vetores em precisão total gravados junto ao índice para a reordenação exata
+FULL_VECTORS_FILE = "vectors.f32"
+
+SPEC_DEFAULTS = {
+    "flat": {},
+    "ivf": {"nlist": None, "nprobe": 16},  # nlist None = 4 * sqrt(n)
+    "hnsw": {"M": 32, "ef_construction": 200, "ef_search": 64},
+}
+# Quantização, comum a todos os tipos (pq_m None = dimensão / 8)
+QUANTIZATION_DEFAULTS = {"quantizer": "none", "pq_m": None, "pq_bits": 8, "rerank": False}
+
+# Nomes aceitos na forma textual (ex.: "hnsw:M=32,efSearch=128,quantizer=sq8")
+PARAM_ALIASES = {
+    "m": "M",
+    "efsearch": "ef_search",
+    "ef_search": "ef_search",
+    "efconstruction": "ef_construction",
+    "ef_construction": "ef_construction",
+    "nlist": "nlist",
+    "nprobe": "nprobe",
+    "quantizer": "quantizer",
+    "pq_m": "pq_m",
+    "pq_bits": "pq_bits",
+    "rerank": "rerank",
+}
+
+
+def _parse_value(name: str, value: Any) -> Any:
+    if value is None:
+        return None
+    if name == "quantizer":
+        value = str(value).lower()
+        if value not in QUANTIZERS:
+            raise ValueError(f"Quantização desconhecida: '{value}' (use {', '.join(QUANTIZERS)})")
+        return value
+    if name == "rerank":
+        return value if isinstance(value, bool) else str(value).lower() in ("1", "true", "yes", "sim")
+    return int(value)
+
+
+def parse_index_spec(spec: Union[str, Dict[str, Any], None]) -> Dict[str, Any]:
+    """
+    Normaliza a especificação do índice. Aceita um dict (como no bases_config.json,
+    ex.: {"type": "ivf", "nlist": 256, "nprobe": 16, "quantizer": "sq8"}) ou texto
+    (ex.: "flat", "ivf:nlist=256,nprobe=16", "hnsw:M=32,efSearch=64,quantizer=pq,rerank=true").
+    """
+    if spec is None:
+        spec = FAISS_INDEX_SPEC
+    if isinstance(spec, str):
+        index_type, _, params_text = spec.strip().partition(":")
+        params = {}
+        for item in filter(None, (p.strip() for p in params_text.split(","))):
+            key, _, value = item.partition("=")
+            params[key.strip()] = value.strip()
+        spec = {"type": index_type, **params}
+
+    index_type = str(spec.get("type", "flat")).lower()
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Tipo de índice desconhecido: '{index_type}' (use {', '.join(INDEX_TYPES)})")
+
+    normalized = {"type": index_type, **SPEC_DEFAULTS[index_type], **QUANTIZATION_DEFAULTS}
+    for key, value in spec.items():
+        if key == "type":
+            continue
+        name = PARAM_ALIASES.get(key.lower(), PARAM_ALIASES.get(key))
+        if name is None or name not in normalized:
+            raise ValueError(f"Parâmetro '{key}' não se aplica ao índice '{index_type}'")
+        normalized[name] = _parse_value(name, value)
+    return normalized
+
+
+def spec_label(spec: Dict[str, Any]) -> str:
+    """Descrição curta da especificação, para logs."""
+    params = ",".join(
+        f"{key}={value}" for key, value in spec.items()
+        if key != "type" and value is not None and QUANTIZATION_DEFAULTS.get(key) != value
+    )
+    return f"{spec['type']}:{params}" if params else spec["type"]
+
+
+def is_quantized(spec: Dict[str, Any]) -> bool:
+    return spec.get("quantizer", "none") != "none"
+
+
+def supports_incremental(spec: Dict[str, Any]) -> bool:
+    """Apenas o índice flat sem quantização é atualizado no lugar; os demais são reconstruídos."""
+    return spec["type"] == "flat" and not is_quantized(spec)
+
+
+def supports_removal(spec: Dict[str, Any]) -> bool:
+    """
+    Tipos de índice em que remove_ids renumera as posições como o LangChain
+    espera (no IVF os ids são mantidos e o HNSW não aceita remoção).
+    """
+    return supports_incremental(spec)
+
+
+def _pq_params(spec: Dict[str, Any], dim: int, count: int) -> Tuple[int, int]:
+    pq_m = spec.get("pq_m") or max(1, dim // 8)
+    if dim % pq_m:
+        raise ValueError(f"pq_m={pq_m} precisa dividir a dimensão dos vetores ({dim})")
+    # O treino do PQ precisa de pelo menos 2^bits vetores
+    pq_bits = max(1, min(spec.get("pq_bits") or 8, int(math.log2(max(count, 2)))))
+    spec["pq_m"], spec["pq_bits"] = pq_m, pq_bits
+    return pq_m, pq_bits
+
+
+def build_index(vectors: np.ndarray, spec: Dict[str, Any]) -> faiss.Index:
+    """
+    Cria e preenche o índice FAISS descrito pela especificação (métrica L2, como
+    o índice padrão do LangChain), com quantização SQ8 ou PQ se pedida. Os
+    parâmetros efetivos (ex.: nlist ajustado ao número de vetores) são gravados
+    de volta em spec.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    count, dim = vectors.shape
+    quantizer = spec.get("quantizer", "none") if count else "none"
+    sq8 = faiss.ScalarQuantizer.QT_8bit
+
+    if spec["type"] == "ivf" and count > 0:
+        nlist = spec.get("nlist") or int(4 * math.sqrt(count))
+        # O k-means precisa de pelo menos um ponto por lista
+        nlist = max(1, min(nlist, count))
+        spec["nlist"] = nlist
+        spec["nprobe"] = min(spec["nprobe"], nlist)
+        coarse = faiss.IndexFlatL2(dim)
+        if quantizer == "sq8":
+            index = faiss.IndexIVFScalarQuantizer(coarse, dim, nlist, sq8, faiss.METRIC_L2)
+        elif quantizer == "pq":
+            pq_m, pq_bits = _pq_params(spec, dim, count)
+            index = faiss.IndexIVFPQ(coarse, dim, nlist, pq_m, pq_bits)
+        else:
+            index = faiss.IndexIVFFlat(coarse, dim, nlist, faiss.METRIC_L2)
+    elif spec["type"] == "hnsw":
+        if quantizer == "sq8":
+            index = faiss.IndexHNSWSQ(dim, sq8, spec["M"])
+        elif quantizer == "pq":
+            pq_m, pq_bits = _pq_params(spec, dim, count)
+            index = faiss.IndexHNSWPQ(dim, pq_m, spec["M"], pq_bits)
+        else:
+            index = faiss.IndexHNSWFlat(dim, spec["M"], faiss.METRIC_L2)
+        index.hnsw.efConstruction = spec["ef_construction"]
+    else:
+        if quantizer == "sq8":
+            index = faiss.IndexScalarQuantizer(dim, sq8, faiss.METRIC_L2)
+        elif quantizer == "pq":
+            pq_m, pq_bits = _pq_params(spec, dim, count)
+            index = faiss.IndexPQ(dim, pq_m, pq_bits, faiss.METRIC_L2)
+        else:
+            index = faiss.IndexFlatL2(dim)
+
+    if count:
+        if not index.is_trained:
+            index.train(vectors)
+        index.add(vectors)
+    apply_search_params(index, spec)
+    return index
+
+
+def apply_search_params(index: faiss.Index, spec: Optional[Dict[str, Any]]):
+    """Aplica os parâmetros de busca (nprobe / efSearch) a um índice carregado."""
+    if not spec:
+        return
+    if spec.get("type") == "ivf" and spec.get("nprobe"):
+        faiss.extract_index_ivf(index).nprobe = spec["nprobe"]
+    elif spec.get("type") == "hnsw" and spec.get("ef_search"):
+        faiss.downcast_index(index).hnsw.efSearch = spec["ef_search"]
+
+
+def index_memory_bytes(index: faiss.Index) -> int:
+    """Tamanho do índice serializado, aproximação da memória residente."""
+    return int(faiss.serialize_index(index).nbytes)
+
+
+# ----------- vetores em precisão total / reordenação exata -----------
+def save_full_vectors(faiss_index_path: str, vectors: np.ndarray):
+    """Grava os vetores float32 na ordem das posições do índice (de forma atômica)."""
+    target = Path(faiss_index_path) / FULL_VECTORS_FILE
+    tmp_file = target.with_suffix(".f32.tmp")
+    with open(tmp_file, "wb") as f:
+        f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+    os.replace(tmp_file, target)
+
+
+def remove_full_vectors(faiss_index_path: str):
+    target = Path(faiss_index_path) / FULL_VECTORS_FILE
+    if target.exists():
+        target.unlink()
+
+
+def open_full_vectors(faiss_index_path: str, dim: int) -> Optional[np.memmap]:
+    """Abre os vetores em precisão total via memmap (lidos do disco sob demanda)."""
+    target = Path(faiss_index_path) / FULL_VECTORS_FILE
+    if not target.exists() or target.stat().st_size == 0:
+        return None
+    rows = target.stat().st_size // (4 * dim)
+    return np.memmap(target, dtype=np.float32, mode="r", shape=(rows, dim))
+
+
+def rescored_search(index: faiss.Index, full_vectors: np.ndarray, query: np.ndarray, k: int,
+                    factor: int = ANN_RESCORE_FACTOR) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Busca k * factor candidatos no índice (quantizado) e os reordena pela
+    distância L2 exata calculada com os vetores em precisão total.
+    Retorna (distâncias, posições) dos k melhores.
+    """
+    query = np.asarray(query, dtype=np.float32).reshape(1, -1)
+    _, candidates = index.search(query, max(k, k * factor))
+    positions = np.asarray([p for p in candidates[0] if p != -1], dtype=np.int64)
+    if positions.size == 0:
+        return np.empty(0, dtype=np.float32), positions
+    # Leitura em ordem crescente de posição (acesso sequencial ao memmap)
+    order = np.argsort(positions)
+    exact = np.empty(positions.size, dtype=np.float32)
+    exact[order] = ((np.asarray(full_vectors[positions[order]]) - query) ** 2).sum(axis=1)
+    best = np.argsort(exact)[:k]
+    return exact[best], positions[best]
+
+
+# ----------- avaliação -----------
+def _timed_search(search, queries: np.ndarray, k: int):
+    """Busca uma consulta por vez (como no atendimento) e mede a latência de cada uma."""
+    latencies = []
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        ids = search(query, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(ids)
+    latencies = np.asarray(latencies)
+    return {
+        "mean": round(float(latencies.mean()), 3),
+        "p95": round(float(np.percentile(latencies, 95)), 3),
+    }, results
+
+
+def _index_search(index: faiss.Index):
+    return lambda query, k: index.search(query.reshape(1, -1), k)[1][0]
+
+
+def _recall(truth: List[np.ndarray], found: List[np.ndarray], k: int) -> float:
+    return round(float(np.mean([len(set(t) & set(f)) / k for t, f in zip(truth, found)])), 4)
+
+
+def evaluate_index(index: faiss.Index, vectors: np.ndarray, k: int = ANN_EVAL_K,
+                   n_queries: int = ANN_EVAL_QUERIES, seed: int = 0,
+                   spec: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Compara o índice com uma busca exata (flat) sobre os mesmos vetores.
+    As consultas são vetores de chunks da própria base, sorteados.
+    Retorna recall@k e latência por consulta (ms) dos dois índices e a memória
+    do índice. Para índices quantizados, inclui também a perda de recall em
+    relação ao mesmo índice sem quantização e o recall com reordenação exata.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    count = vectors.shape[0]
+    if count == 0 or n_queries <= 0:
+        return {}
+
+    k = min(k, count)
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.choice(count, size=min(n_queries, count), replace=False)]
+
+    baseline = faiss.IndexFlatL2(vectors.shape[1])
+    baseline.add(vectors)
+    flat_latency, truth = _timed_search(_index_search(baseline), queries, k)
+    index_latency, found = _timed_search(_index_search(index), queries, k)
+
+    report = {
+        "k": k,
+        "queries": len(queries),
+        "recall_at_k": _recall(truth, found, k),
+        "latency_ms": {"flat": flat_latency, "index": index_latency},
+        "memory": {
+            "index_bytes": index_memory_bytes(index),
+            "flat_bytes": int(vectors.nbytes),
+        },
+    }
+    report["memory"]["compression"] = round(report["memory"]["flat_bytes"] / max(1, report["memory"]["index_bytes"]), 2)
+
+    if spec and is_quantized(spec):
+        unquantized = build_index(vectors, {**spec, "quantizer": "none"})
+        _, unquantized_found = _timed_search(_index_search(unquantized), queries, k)
+        report["recall_unquantized"] = _recall(truth, unquantized_found, k)
+        report["recall_delta"] = round(report["recall_at_k"] - report["recall_unquantized"], 4)
+        if spec.get("rerank"):
+            rescored_latency, rescored = _timed_search(
+                lambda query, k: rescored_search(index, vectors, query, k)[1], queries, k
+            )
+            report["recall_rescored"] = _recall(truth, rescored, k)
+            report["latency_ms"]["rescored"] = rescored_latency
+    return report
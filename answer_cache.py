@@ -0,0 +1,130 @@
+import os
+import time
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.95))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 500))
+
+
+def get_index_version(faiss_index_path: str) -> Optional[str]:
+    """
+    Identifica a versão do índice FAISS em disco a partir do mtime e do tamanho
+    do arquivo index.faiss. Retorna None se o índice não existir.
+    """
+    index_file = Path(faiss_index_path) / "index.faiss"
+    try:
+        stat = index_file.stat()
+    except OSError:
+        return None
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+class _BaseEntries:
+    """Respostas em cache de uma base, com os vetores normalizados empilhados."""
+
+    def __init__(self):
+        self.vectors: List[np.ndarray] = []
+        self.entries: List[Dict[str, Any]] = []
+        self.matrix: Optional[np.ndarray] = None
+
+
+class SemanticAnswerCache:
+    """
+    Cache de respostas por base, consultado por similaridade de cosseno entre o
+    embedding da pergunta e o das perguntas já respondidas.
+
+    Cada entrada é marcada com a versão do índice FAISS usada para gerá-la;
+    entradas de outra versão nunca são servidas.
+    """
+
+    def __init__(self, threshold: float = ANSWER_CACHE_THRESHOLD, max_entries: int = ANSWER_CACHE_MAX_ENTRIES):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._bases: Dict[str, _BaseEntries] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, base_name: str, index_version: str, vector) -> Optional[Dict[str, Any]]:
+        """Retorna a resposta em cache mais similar acima do limiar, se houver."""
+        query = self._normalize(vector)
+        with self._lock:
+            base = self._bases.get(base_name)
+            if base is None or not base.entries:
+                self.misses += 1
+                return None
+            if base.matrix is None:
+                base.matrix = np.stack(base.vectors)
+
+            scores = base.matrix @ query
+            # Entradas de outra versão do índice são ignoradas
+            for position in np.argsort(-scores):
+                if scores[position] < self.threshold:
+                    break
+                entry = base.entries[position]
+                if entry["index_version"] == index_version:
+                    self.hits += 1
+                    return entry["result"]
+
+            self.misses += 1
+            return None
+
+    def store(self, base_name: str, index_version: str, vector, question: str, result: Dict[str, Any]):
+        """Guarda a resposta de uma pergunta de primeiro turno."""
+        with self._lock:
+            base = self._bases.setdefault(base_name, _BaseEntries())
+            # Descarta entradas de versões antigas do índice antes de inserir
+            if base.entries and base.entries[0]["index_version"] != index_version:
+                keep = [i for i, entry in enumerate(base.entries) if entry["index_version"] == index_version]
+                base.vectors = [base.vectors[i] for i in keep]
+                base.entries = [base.entries[i] for i in keep]
+
+            base.vectors.append(self._normalize(vector))
+            base.entries.append({
+                "question": question,
+                "index_version": index_version,
+                "created_at": time.time(),
+                "result": result,
+            })
+            if len(base.entries) > self.max_entries:
+                del base.vectors[0]
+                del base.entries[0]
+            base.matrix = None
+
+    def invalidate(self, base_name: Optional[str] = None):
+        """Remove as respostas de uma base, ou de todas se base_name for None."""
+        with self._lock:
+            if base_name is None:
+                self._bases.clear()
+            else:
+                self._bases.pop(base_name, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": ANSWER_CACHE_ENABLED,
+                "threshold": self.threshold,
+                "entries_per_base": {name: len(base.entries) for name, base in self._bases.items()},
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+# Instância global usada pelo RAG
+answer_cache = SemanticAnswerCache()
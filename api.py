@@ -1,6 +1,6 @@
 import os
+import json
 import logging
-import pickle
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional
@@ -13,34 +13,51 @@ from fastapi import (
     Depends,
     File,
     HTTPException,
+    Query,
     Request,
     status,
     UploadFile,
 )
+from fastapi.concurrency import run_in_threadpool
 from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.security import APIKeyHeader
 from pydantic import BaseModel
 
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_huggingface.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
 import shutil
 
 # Local application imports
-from RAG import rag_chain, reset_conversation_history, get_current_base, switch_base_rag
+from RAG import (
+    arag_chain,
+    astream_rag_chain,
+    reset_conversation_history,
+    get_current_base,
+    switch_base_rag,
+    invalidate_query_embedding_cache,
+    invalidate_answer_cache,
+    invalidate_base_index,
+    get_cache_stats,
+)
+from session_store import DEFAULT_SESSION_ID
 from store_manager import FileStorageManager
-from load_docs import (
-    load_all_files_from_directory,
-    preprocess_text,
-    rebuild_pdf_from_text,
-    DoclingLoader,
-    ExportType,
-    Document
+from load_docs import load_all_files_from_directory
+from doc_store import open_document_store, document_summary_cache
+from ann_index import parse_index_spec
+
+from job_manager import (
+    job_manager,
+    JobConflictError,
+    ACTIVE_STATUSES,
+    JOB_PROCESS_DOCUMENTS,
+    JOB_CREATE_VECTORSTORE,
+    JOB_REMOVE_DOCUMENT,
 )
-
-from create_vectorstore import create_vectorstore
+from embedding_registry import warm_up
+from vector_cache import cache_stats_all
+from vectorstore_io import get_index_embedding_model
 
 # --- Modelo para atualização do .env ---
 class EnvUpdateRequest(BaseModel):
@@ -56,10 +73,16 @@ class BaseConfig(BaseModel):
     faiss_index_path: str
     output_docs_file: str
     description: Optional[str] = None
+    # Tipo de índice, ex.: {"type": "hnsw", "M": 32, "ef_search": 64} (padrão: FAISS_INDEX_SPEC)
+    index: Optional[Dict[str, Any]] = None
 
 class SwitchBaseRequest(BaseModel):
     base_name: str
 
+# --- Modelo para reset de conversa ---
+class ResetConversationRequest(BaseModel):
+    session_id: Optional[str] = None
+
 # --- Configuração da API ---
 app = FastAPI(
     title="API de Consulta Acadêmica UFAPE",
@@ -171,6 +194,8 @@ class BaseManager:
             "output_docs_file": base_config.output_docs_file,
             "description": base_config.description
         }
+        if base_config.index:
+            self.bases_config[base_config.base_name]["index"] = base_config.index
         
         self.save_bases_config()
         return True
@@ -197,6 +222,19 @@ class BaseManager:
 # Inicializar gerenciador de bases
 base_manager = BaseManager()
 
+# --- Pré-carregamento dos modelos de embedding ---
+@app.on_event("startup")
+async def warm_up_embedding_models():
+    """Carrega na inicialização os modelos de embedding usados pelos índices das bases."""
+    if os.getenv("EMBED_WARMUP", "true").lower() != "true":
+        return
+    model_ids = [EMBED_MODEL_ID] + [
+        get_index_embedding_model(config["faiss_index_path"], default=None)
+        for config in base_manager.bases_config.values()
+    ]
+    loaded = warm_up(model_ids)
+    logger.info(f"Modelos de embedding pré-carregados: {loaded}")
+
 # --- Funções auxiliares para obter configurações atuais ---
 def get_current_documents_dir():
     return base_manager.get_current_base_config()["documents_dir"]
@@ -220,6 +258,7 @@ class QueryInput(BaseModel):
     text: str
     user_id: Optional[str] = None
     session_id: Optional[str] = None
+    base: Optional[str] = None
 
 class QueryOutput(BaseModel):
     input: str
@@ -229,6 +268,7 @@ class QueryOutput(BaseModel):
     timestamp: str
     model_used: str
     base_used: str
+    rerank: Optional[Dict[str, Any]] = None
 
 class HealthCheck(BaseModel):
     status: str
@@ -272,12 +312,23 @@ async def health_check():
         "current_base": base_manager.current_base
     }
 
+def resolve_query_base(query: QueryInput) -> str:
+    """Retorna a base da consulta (a base atual se nenhuma for informada)."""
+    base_name = query.base or base_manager.current_base
+    if base_manager.get_base_config(base_name) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Base '{base_name}' não encontrada"
+        )
+    return base_name
+
 @app.post("/query", response_model=QueryOutput)
 async def process_query(query: QueryInput, api_key: str = Depends(get_api_key)):
+    base_name = resolve_query_base(query)
     try:
-        logger.info(f"Nova consulta - User: {query.user_id} - Session: {query.session_id} - Base: {base_manager.current_base}")
+        logger.info(f"Nova consulta - User: {query.user_id} - Session: {query.session_id} - Base: {base_name}")
         
-        result = rag_chain(query.text)
+        result = await arag_chain(query.text, session_id=query.session_id, base=base_name)
         
         response = QueryOutput(
             input=result["input"],
@@ -286,10 +337,11 @@ async def process_query(query: QueryInput, api_key: str = Depends(get_api_key)):
             contexto=convert_documents_to_response(result["contexto"]),
             timestamp=datetime.now().isoformat(),
             model_used=os.getenv("GEN_MODEL_ID", "unknown"),
-            base_used=base_manager.current_base
+            base_used=result["base_used"],
+            rerank=result.get("rerank")
         )
         
-        logger.info(f"Consulta processada - Input: {query.text[:50]}... - Base: {base_manager.current_base}")
+        logger.info(f"Consulta processada - Input: {query.text[:50]}... - Base: {base_name}")
         return jsonable_encoder(response)
         
     except Exception as e:
@@ -299,11 +351,58 @@ async def process_query(query: QueryInput, api_key: str = Depends(get_api_key)):
             detail=f"Erro interno ao processar a consulta: {str(e)}"
         )
 
+def format_sse(event: str, data: Any) -> str:
+    """Formata um evento no padrão server-sent events."""
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data), ensure_ascii=False)}\n\n"
+
+@app.post("/query/stream")
+async def process_query_stream(query: QueryInput, api_key: str = Depends(get_api_key)):
+    """
+    Processa a consulta e envia a resposta via server-sent events:
+    primeiro o evento 'context' (contexto e query transformada), depois os
+    eventos 'token' com a resposta e, por fim, 'done' com os metadados.
+    """
+    base_name = resolve_query_base(query)
+    logger.info(f"Nova consulta (stream) - User: {query.user_id} - Session: {query.session_id} - Base: {base_name}")
+
+    async def event_stream():
+        async for event in astream_rag_chain(query.text, session_id=query.session_id, base=base_name):
+            if event["event"] == "context":
+                yield format_sse("context", {
+                    "transformed_query": event["transformed_query"],
+                    "contexto": convert_documents_to_response(event["contexto"])
+                })
+            elif event["event"] == "token":
+                yield format_sse("token", {"content": event["content"]})
+            else:
+                result = event["result"]
+                yield format_sse(event["event"], {
+                    "input": result["input"],
+                    "transformed_query": result["transformed_query"],
+                    "resposta": result["resposta"],
+                    "timestamp": datetime.now().isoformat(),
+                    "model_used": os.getenv("GEN_MODEL_ID", "unknown"),
+                    "base_used": result["base_used"],
+                    "cache_hit": result["cache_hit"],
+                    "rerank": result.get("rerank")
+                })
+        logger.info(f"Consulta (stream) processada - Input: {query.text[:50]}... - Base: {base_name}")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/reset-conversation")
-async def reset_conversation(api_key: str = Depends(get_api_key)):
+async def reset_conversation(reset_request: Optional[ResetConversationRequest] = None, api_key: str = Depends(get_api_key)):
+    """
+    Reseta o histórico da conversa apenas da sessão informada.
+    """
     try:
-        reset_conversation_history()
-        logger.info("Histórico da conversação resetado")
+        session_id = reset_request.session_id if reset_request else None
+        reset_conversation_history(session_id or DEFAULT_SESSION_ID)
+        logger.info(f"Histórico da conversação resetado - Session: {session_id}")
         return {"status": "success", "message": "Histórico resetado"}
     except Exception as e:
         logger.error(f"Erro ao resetar histórico: {str(e)}")
@@ -338,9 +437,17 @@ async def list_documents(api_key: str = Depends(get_api_key)):
 @app.delete("/api/documents/{filename}")
 async def delete_document(filename: str, api_key: str = Depends(get_api_key)):
     """
-    Deleta um documento específico do sistema de arquivos da base atual.
+    Deleta um documento específico do sistema de arquivos da base atual. A
+    remoção dos seus documentos processados e chunks do índice roda como um
+    trabalho em segundo plano (acompanhe em /jobs/{job_id}), de modo que não
+    concorre com outro trabalho gravando a mesma base.
     """
     try:
+        base_name = base_manager.current_base
+        active = job_manager.active(base_name)
+        if active is not None:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(JobConflictError(active)))
+
         documents_dir = get_current_documents_dir()
         storage_manager = FileStorageManager(storage_root=documents_dir)
         
@@ -355,13 +462,34 @@ async def delete_document(filename: str, api_key: str = Depends(get_api_key)):
         # Deletar o arquivo
         os.remove(file_path)
         
-        logger.info(f"Documento deletado: {filename} da base {base_manager.current_base}")
+        # Remover os documentos e chunks do arquivo do índice em uso
+        try:
+            job = job_manager.submit(
+                JOB_REMOVE_DOCUMENT,
+                base_name,
+                {
+                    "output_docs_file": get_current_output_docs_file(),
+                    "faiss_index_path": get_current_faiss_index_path(),
+                    "file_path": os.path.join(documents_dir, filename),
+                },
+                on_success=on_document_removed
+            )
+        except JobConflictError as e:
+            # Outro trabalho começou entre a verificação e a remoção do arquivo
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Arquivo '{filename}' deletado, mas o índice não foi atualizado: {e}"
+            )
+        
+        logger.info(f"Documento deletado: {filename} da base {base_name} - Job de remoção do índice: {job.id}")
         
         return {
             "status": "success",
             "message": f"Documento '{filename}' deletado com sucesso",
             "deleted_file": filename,
-            "base": base_manager.current_base
+            "job_id": job.id,
+            "job": job.to_dict(),
+            "base": base_name
         }
         
     except HTTPException:
@@ -383,12 +511,14 @@ async def get_document(filename: str, api_key: str = Depends(get_api_key)):
     return FileResponse(file_path)
 
 @app.post("/process/", status_code=status.HTTP_202_ACCEPTED)
-async def process_documents(reprocess: bool = False, api_key: str = Depends(get_api_key)):
+async def process_documents(reprocess: bool = False, full: bool = False, workers: Optional[int] = None, api_key: str = Depends(get_api_key)):
     """
-    Endpoint para processar todos os documentos no diretório da base atual.
+    Inicia em segundo plano o processamento dos documentos da base atual e
+    retorna imediatamente o id do trabalho (acompanhe em /jobs/{job_id}).
+    Apenas arquivos novos ou alterados são processados; use full=true para
+    forçar o reprocessamento de todos os arquivos.
     """
     try:
-        start_time = datetime.now()
         documents_dir = get_current_documents_dir()
         output_docs_file = get_current_output_docs_file()
         
@@ -399,93 +529,88 @@ async def process_documents(reprocess: bool = False, api_key: str = Depends(get_
                 detail=f"Nenhum arquivo encontrado no diretório {documents_dir}"
             )
         
-        all_docs = []
-        failed_files = []
-
-        for file_path in file_paths:
-            file_name = Path(file_path).name
-            
-            # Pular arquivos já reconstruídos, a menos que reprocess=True
-            if "_REBUILT_FROM_" in file_name and not reprocess:
-                continue
-                
-            try:
-                loader = DoclingLoader(file_path=file_path, export_type=ExportType.MARKDOWN)
-                docs_from_file = loader.load()
-                all_docs.extend(docs_from_file)
-                
-            except Exception as e:
-                # Tentar reconstruir o PDF
-                base_name, ext = os.path.splitext(file_path)
-                rebuilt_file_path = f"{base_name}_REBUILT_FROM_TEXT{ext}"
-                
-                if rebuild_pdf_from_text(file_path, rebuilt_file_path):
-                    try:
-                        loader = DoclingLoader(file_path=rebuilt_file_path, export_type=ExportType.MARKDOWN)
-                        docs_from_file = loader.load()
-                        all_docs.extend(docs_from_file)
-                    except Exception as e2:
-                        failed_files.append(file_name)
-                else:
-                    failed_files.append(file_name)
-        
-        # Pré-processamento
-        processed_docs = []
-        for doc in all_docs:
-            cleaned_content = preprocess_text(doc.page_content)
-            if cleaned_content:
-                processed_docs.append(Document(
-                    page_content=cleaned_content,
-                    metadata=doc.metadata
-                ))
-        
-        # Salvar documentos processados
-        with open(output_docs_file, "wb") as f:
-            pickle.dump(processed_docs, f)
-        
-        processing_time = (datetime.now() - start_time).total_seconds()
+        job = job_manager.submit(
+            JOB_PROCESS_DOCUMENTS,
+            base_manager.current_base,
+            {
+                "documents_dir": documents_dir,
+                "output_docs_file": output_docs_file,
+                "full": full or reprocess,
+                "workers": workers
+            }
+        )
+        logger.info(f"Processamento de documentos iniciado - Job: {job.id} - Base: {job.base}")
         
         return {
-            "status": "completed",
-            "processed_documents": len(processed_docs),
-            "failed_documents": len(failed_files),
-            "failed_files": failed_files,
-            "processing_time_seconds": processing_time,
-            "output_file": output_docs_file,
-            "base": base_manager.current_base
+            "status": "accepted",
+            "job_id": job.id,
+            "job": job.to_dict(),
+            "base": job.base
         }
         
+    except HTTPException:
+        raise
+    except JobConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Erro durante o processamento: {str(e)}"
+            detail=f"Erro ao iniciar o processamento: {str(e)}"
         )
 
-@app.get("/processed-documents/", response_model=List[dict])
-async def get_processed_documents(api_key: str = Depends(get_api_key)):
+@app.get("/processed-documents/")
+async def get_processed_documents(
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=0, le=500),
+    source: Optional[str] = None,
+    api_key: str = Depends(get_api_key)
+):
     """
-    Retorna a lista de documentos processados da base atual.
+    Retorna uma página dos documentos processados da base atual.
+    source filtra pelas fontes que contêm o texto informado; a resposta inclui
+    os totais e o resumo por fonte (use limit=0 para obter apenas o resumo).
     """
     try:
-        output_docs_file = get_current_output_docs_file()
+        store = open_document_store(get_current_output_docs_file())
         
-        if not os.path.exists(output_docs_file):
+        if not store.exists():
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Nenhum documento processado encontrado"
             )
+        
+        summary = await run_in_threadpool(document_summary_cache.get, store)
+        by_source = summary["by_source"]
+        if source:
+            needle = source.lower()
+            by_source = {name: totals for name, totals in by_source.items() if needle in name.lower()}
+            positions = sorted(position for totals in by_source.values() for position in totals["positions"])
+        else:
+            positions = range(len(summary["documents"]))
+        
+        page_positions = positions[offset:offset + limit]
+        docs = await run_in_threadpool(lambda: list(store.iter_documents(positions=page_positions)))
             
-        with open(output_docs_file, "rb") as f:
-            processed_docs = pickle.load(f)
-            
-        return [
-            {
-                "content": doc.page_content[:500] + "..." if len(doc.page_content) > 500 else doc.page_content,
-                "metadata": doc.metadata,
-                "length": len(doc.page_content)
-            }
-            for doc in processed_docs
-        ]
+        return {
+            "items": [
+                {
+                    "content": doc.page_content[:500] + "..." if len(doc.page_content) > 500 else doc.page_content,
+                    "metadata": doc.metadata,
+                    "length": len(doc.page_content)
+                }
+                for doc in docs
+            ],
+            "total": len(summary["documents"]),
+            "filtered_total": len(positions),
+            "offset": offset,
+            "limit": limit,
+            "sources": [
+                {"source": name, "documents": totals["documents"], "length": totals["length"]}
+                for name, totals in by_source.items()
+            ],
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -499,16 +624,25 @@ async def get_processing_status(api_key: str = Depends(get_api_key)):
     """
     try:
         documents_dir = get_current_documents_dir()
-        output_docs_file = get_current_output_docs_file()
+        store = open_document_store(get_current_output_docs_file())
         
         total_files = len(load_all_files_from_directory(documents_dir))
-        processed_exists = os.path.exists(output_docs_file)
+        processed_exists = store.exists()
+        
+        # Estado do último processamento em segundo plano da base
+        job = job_manager.latest(JOB_PROCESS_DOCUMENTS, base_manager.current_base)
+        if job is None:
+            processing_status = "completed" if processed_exists else "idle"
+        else:
+            processing_status = "processing" if job.status in ACTIVE_STATUSES else job.status
         
         return {
+            "status": processing_status,
+            "job": job.to_dict() if job else None,
             "documents_directory": documents_dir,
             "total_files": total_files,
             "processing_completed": processed_exists,
-            "last_processed": datetime.fromtimestamp(os.path.getmtime(output_docs_file)).isoformat() if processed_exists else None,
+            "last_processed": datetime.fromtimestamp(store.mtime()).isoformat() if processed_exists else None,
             "current_base": base_manager.current_base
         }
     except Exception as e:
@@ -518,27 +652,95 @@ async def get_processing_status(api_key: str = Depends(get_api_key)):
         )
 
 #  ------ vector store
-@app.post("/create-vector-store")
-async def create_vector_store_endpoint(api_key: str = Depends(get_api_key)):
+def on_document_removed(job):
+    """Ao concluir a remoção de um documento, descarta o índice residente e as respostas em cache da base."""
+    if job.result and job.result.get("removed_chunks"):
+        invalidate_answer_cache(job.base)
+        invalidate_base_index(job.base)
+
+def on_vectorstore_created(job):
+    """Ao concluir a criação do índice, descarta o índice residente e as respostas em cache da base."""
+    invalidate_answer_cache(job.base)
+    invalidate_base_index(job.base)
+
+@app.post("/create-vector-store", status_code=status.HTTP_202_ACCEPTED)
+async def create_vector_store_endpoint(
+    full: bool = False,
+    batch_size: Optional[int] = None,
+    threads: Optional[int] = None,
+    normalize: Optional[bool] = None,
+    index: Optional[str] = None,
+    api_key: str = Depends(get_api_key)
+):
     """
-    Cria um novo vector store para a base atual
+    Inicia em segundo plano a criação do vector store da base atual e
+    retorna imediatamente o id do trabalho (acompanhe em /jobs/{job_id}).
+    batch_size, threads e normalize ajustam a etapa de embedding; o progresso
+    inclui a vazão (chunks/s) e o tempo restante estimado. index substitui o
+    tipo de índice da base (ex.: "hnsw:M=32,efSearch=64"); o resultado traz
+    recall@k e latência comparados a uma busca exata.
     """
+    if index is not None:
+        try:
+            parse_index_spec(index)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     try:
-        documents_dir = get_current_documents_dir()
-        faiss_index_path = get_current_faiss_index_path()
-        output_docs_file = get_current_output_docs_file()
-        
-        result = create_vectorstore(
-            documents_dir=documents_dir,
-            faiss_index_path=faiss_index_path,
-            output_docs_file=output_docs_file
+        job = job_manager.submit(
+            JOB_CREATE_VECTORSTORE,
+            base_manager.current_base,
+            {
+                "base_name": base_manager.current_base,
+                "full": full,
+                "batch_size": batch_size,
+                "threads": threads,
+                "normalize": normalize,
+                "index_spec": index,
+            },
+            on_success=on_vectorstore_created
         )
+        logger.info(f"Criação do vector store iniciada - Job: {job.id} - Base: {job.base}")
         
-        result["base"] = base_manager.current_base
-        return result
+        return {
+            "status": "accepted",
+            "job_id": job.id,
+            "job": job.to_dict(),
+            "base": job.base
+        }
+    except JobConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# ----------- trabalhos em segundo plano -----------
+@app.get("/jobs")
+async def list_jobs(base: Optional[str] = None, api_key: str = Depends(get_api_key)):
+    """
+    Lista os trabalhos recentes (de uma base específica ou de todas)
+    """
+    return {"jobs": job_manager.list_jobs(base)}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, api_key: str = Depends(get_api_key)):
+    """
+    Retorna o estado e o progresso de um trabalho
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trabalho não encontrado")
+    return job.to_dict()
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str, api_key: str = Depends(get_api_key)):
+    """
+    Cancela um trabalho em execução
+    """
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trabalho não encontrado")
+    logger.info(f"Trabalho cancelado: {job_id} - Status: {job.status}")
+    return job.to_dict()
+
 # ----------- gerenciamento de bases -----------
 @app.get("/bases/")
 async def list_bases(api_key: str = Depends(get_api_key)):
@@ -556,6 +758,11 @@ async def create_base(base_config: BaseConfig, api_key: str = Depends(get_api_ke
     """
     Cria uma nova base
     """
+    if base_config.index is not None:
+        try:
+            parse_index_spec(base_config.index)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     try:
         success = base_manager.create_base(base_config)
         if not success:
@@ -615,6 +822,9 @@ async def delete_base(base_name: str, api_key: str = Depends(get_api_key)):
                 detail=f"Não foi possível deletar a base '{base_name}'"
             )
         
+        invalidate_base_index(base_name)
+        invalidate_answer_cache(base_name)
+        
         return {
             "status": "success",
             "message": f"Base '{base_name}' removida com sucesso"
@@ -699,6 +909,9 @@ async def update_environment_variables(update_request: EnvUpdateRequest, api_key
         if update_request.TOP_K is not None:
             os.environ["TOP_K"] = update_request.TOP_K
         if update_request.EMBED_MODEL_ID is not None:
+            if update_request.EMBED_MODEL_ID != os.getenv("EMBED_MODEL_ID"):
+                # Vetores de consultas do modelo anterior não servem para o novo
+                invalidate_query_embedding_cache()
             os.environ["EMBED_MODEL_ID"] = update_request.EMBED_MODEL_ID
         if update_request.GEN_MODEL_ID is not None:
             os.environ["GEN_MODEL_ID"] = update_request.GEN_MODEL_ID
@@ -739,6 +952,22 @@ async def get_environment_status(api_key: str = Depends(get_api_key)):
             detail=f"Erro ao verificar status do ambiente: {str(e)}"
         )
 
+@app.get("/cache-stats")
+async def get_cache_statistics(api_key: str = Depends(get_api_key)):
+    """
+    Retorna contadores de acertos/erros dos caches do RAG e o uso das sessões
+    """
+    try:
+        return {
+            **get_cache_stats(),
+            "chunk_embedding_cache": cache_stats_all()
+        }
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao obter estatísticas de cache: {str(e)}"
+        )
+
 # Documentação adicional
 app.openapi_tags = [{
     "name": "consultas",
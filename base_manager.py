@@ -65,6 +65,8 @@ class BaseManager:
             "output_docs_file": base_config["output_docs_file"],
             "description": base_config.get("description", "")
         }
+        if base_config.get("index"):
+            self.bases_config[base_name]["index"] = base_config["index"]
         
         self.save_bases_config()
         return True
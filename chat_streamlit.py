@@ -7,10 +7,11 @@ st.set_page_config(page_title="Chat com DRiaCA", layout="wide")
 # Agora importe outros módulos e defina funções
 from RAG import *
 import json
+import uuid
 
 # Função para resetar o histórico de conversa
 def reset_conversation():
-    reset_conversation_history()
+    reset_conversation_history(st.session_state.session_id)
     st.session_state.conversation_history = []
 
 # Adicionar o GIF ao lado do título usando HTML/CSS
@@ -29,6 +30,10 @@ st.markdown(
 if 'conversation_history' not in st.session_state:
     st.session_state.conversation_history = []
 
+# Identificador da sessão no RAG (cada aba do navegador tem seu próprio histórico)
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = str(uuid.uuid4())
+
 # Exibir o histórico de conversa como um chat
 chat_container = st.container()
 with chat_container:
@@ -74,7 +79,7 @@ st.markdown("""
 if user_input:
     with st.spinner("Pensando..."):
         # Processar a pergunta do usuário
-        resp_dict = rag_chain(user_input)
+        resp_dict = rag_chain(user_input, session_id=st.session_state.session_id)
 
     # Atualizar o histórico de conversa
     st.session_state.conversation_history.append({
@@ -0,0 +1,212 @@
+import os
+import json
+import pickle
+import shutil
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+from langchain_community.docstore.base import AddableMixin, Docstore
+
+load_dotenv()
+
+# Chunks mais acessados mantidos em memória por docstore
+DOCSTORE_CACHE_SIZE = int(os.getenv("DOCSTORE_CACHE_SIZE", 512))
+
+DOCSTORE_DB_FILE = "docstore.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    id TEXT PRIMARY KEY,
+    page_content TEXT NOT NULL,
+    metadata TEXT NOT NULL,
+    source TEXT
+);
+CREATE INDEX IF NOT EXISTS chunks_source ON chunks(source);
+CREATE TABLE IF NOT EXISTS positions (
+    position INTEGER PRIMARY KEY,
+    id TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _row_to_document(page_content: str, metadata: str) -> Document:
+    return Document(page_content=page_content, metadata=json.loads(metadata))
+
+
+class SQLiteDocstore(Docstore, AddableMixin):
+    """
+    Docstore do índice FAISS em SQLite: o texto e os metadados de cada chunk são
+    lidos sob demanda pelo id, com um cache LRU dos chunks mais acessados.
+
+    O arquivo nunca é alterado no lugar: inclusões e exclusões ficam pendentes
+    em memória até write_docstore gravar um novo arquivo e substituí-lo com
+    os.replace, de modo que os processos que estão lendo o arquivo antigo não
+    são afetados.
+    """
+
+    def __init__(self, db_path, cache_size: int = DOCSTORE_CACHE_SIZE):
+        self.db_path = Path(db_path)
+        self.cache_size = cache_size
+        self._conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, Document]" = OrderedDict()
+        self._added: Dict[str, Document] = {}
+        self._deleted = set()
+        self.hits = 0
+        self.misses = 0
+
+    # ----------- leitura -----------
+    def _fetch(self, chunk_id: str) -> Optional[Document]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT page_content, metadata FROM chunks WHERE id = ?", (chunk_id,)
+            ).fetchone()
+        return _row_to_document(*row) if row else None
+
+    def search(self, search: str) -> Union[str, Document]:
+        if search in self._added:
+            return self._added[search]
+        if search in self._deleted:
+            return f"ID {search} not found."
+
+        with self._lock:
+            doc = self._cache.get(search)
+            if doc is not None:
+                self._cache.move_to_end(search)
+                self.hits += 1
+                return doc
+            self.misses += 1
+
+        doc = self._fetch(search)
+        if doc is None:
+            return f"ID {search} not found."
+        with self._lock:
+            self._cache[search] = doc
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return doc
+
+    def load_positions(self) -> Dict[int, str]:
+        """Mapeamento posição no índice FAISS -> id do chunk."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT position, id FROM positions"))
+
+    def load_index_stamp(self) -> Optional[Dict[str, int]]:
+        """
+        Identificação do index.faiss gravado junto com este docstore (ver
+        write_docstore). None para docstores criados antes da marcação.
+        """
+        with self._lock:
+            try:
+                row = self._conn.execute("SELECT value FROM meta WHERE key = 'index_stamp'").fetchone()
+            except sqlite3.OperationalError:
+                return None
+        return json.loads(row[0]) if row else None
+
+    def ids_for_sources(self, sources: Iterable[str]) -> List[str]:
+        """Ids dos chunks cujos documentos vêm das fontes informadas."""
+        sources = list(sources)
+        if not sources:
+            return []
+        placeholders = ",".join("?" * len(sources))
+        with self._lock:
+            ids = [row[0] for row in self._conn.execute(
+                f"SELECT id FROM chunks WHERE source IN ({placeholders})", sources
+            )]
+        ids = [chunk_id for chunk_id in ids if chunk_id not in self._deleted]
+        ids.extend(chunk_id for chunk_id, doc in self._added.items() if str(doc.metadata.get("source")) in sources)
+        return ids
+
+    # ----------- alterações (pendentes até write_docstore) -----------
+    def add(self, texts: Dict[str, Document]) -> None:
+        for chunk_id, doc in texts.items():
+            self._added[chunk_id] = doc
+            self._deleted.discard(chunk_id)
+
+    def delete(self, ids: List) -> None:
+        for chunk_id in ids:
+            if self._added.pop(chunk_id, None) is None:
+                self._deleted.add(chunk_id)
+            with self._lock:
+                self._cache.pop(chunk_id, None)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "cached_chunks": len(self._cache),
+                "cache_size": self.cache_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+def _insert_documents(conn: sqlite3.Connection, docs: Iterable):
+    conn.executemany(
+        "INSERT OR REPLACE INTO chunks (id, page_content, metadata, source) VALUES (?, ?, ?, ?)",
+        (
+            (chunk_id, doc.page_content, json.dumps(doc.metadata, ensure_ascii=False, default=str),
+             str(doc.metadata.get("source", "")))
+            for chunk_id, doc in docs
+        )
+    )
+
+
+def write_docstore(faiss_index_path: str, docstore, index_to_docstore_id: Dict[int, str],
+                   index_stamp: Optional[Dict[str, int]] = None):
+    """
+    Grava o docstore e o mapeamento de posições em um novo arquivo SQLite e o
+    publica de forma atômica. Aceita um SQLiteDocstore (copia o arquivo atual e
+    aplica as alterações pendentes) ou um InMemoryDocstore. index_stamp
+    identifica o index.faiss a que as posições se referem.
+    """
+    target = Path(faiss_index_path) / DOCSTORE_DB_FILE
+    tmp_file = target.with_name(f"{DOCSTORE_DB_FILE}.{os.getpid()}.tmp")
+    if tmp_file.exists():
+        tmp_file.unlink()
+
+    if isinstance(docstore, SQLiteDocstore) and docstore.db_path.exists():
+        shutil.copyfile(docstore.db_path, tmp_file)
+        conn = sqlite3.connect(tmp_file)
+        if docstore._deleted:
+            conn.executemany("DELETE FROM chunks WHERE id = ?", ((chunk_id,) for chunk_id in docstore._deleted))
+        _insert_documents(conn, docstore._added.items())
+    else:
+        conn = sqlite3.connect(tmp_file)
+        conn.executescript(SCHEMA)
+        _insert_documents(conn, docstore._dict.items())
+
+    try:
+        conn.executescript(SCHEMA)
+        conn.execute("DELETE FROM positions")
+        conn.executemany("INSERT INTO positions (position, id) VALUES (?, ?)", index_to_docstore_id.items())
+        conn.execute("DELETE FROM meta WHERE key = 'index_stamp'")
+        if index_stamp is not None:
+            conn.execute("INSERT INTO meta (key, value) VALUES ('index_stamp', ?)", (json.dumps(index_stamp),))
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_file, target)
+
+
+def convert_pickle_docstore(faiss_index_path: str, pickle_file: Path):
+    """Converte o index.pkl (InMemoryDocstore + mapeamento) para o SQLite e o renomeia para .migrated."""
+    with open(pickle_file, "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    write_docstore(faiss_index_path, docstore, index_to_docstore_id)
+    os.replace(pickle_file, pickle_file.with_name(f"{pickle_file.name}.migrated"))
+    print(f"📦 Docstore de '{faiss_index_path}' convertido para SQLite ({len(index_to_docstore_id)} chunks).")
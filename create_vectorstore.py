@@ -1,16 +1,48 @@
 import os
-import pickle
+import hashlib
+import argparse
+import faiss
+import numpy as np
 from dotenv import load_dotenv
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_huggingface.embeddings import HuggingFaceEmbeddings
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
 
+from ann_index import (
+    ANN_EVAL_QUERIES,
+    parse_index_spec,
+    spec_label,
+    supports_incremental,
+    supports_removal,
+    is_quantized,
+    build_index,
+    evaluate_index,
+    open_full_vectors,
+    save_full_vectors,
+    remove_full_vectors,
+)
+from doc_store import open_document_store
+from embedding_registry import get_embeddings
+from embedding_stage import EmbeddingStage, EMBED_BATCH_SIZE, EMBED_THREADS, EMBED_NORMALIZE, normalize_vectors
+from sparse_index import BM25Index
+from prompt_budget import token_counter
+from vector_cache import VectorCache, EMBED_CACHE_ENABLED, cache_stats_all
+from vectorstore_io import (
+    read_index_meta,
+    write_index_meta,
+    index_exists,
+    load_vectorstore,
+    save_vectorstore,
+)
+
 load_dotenv()
 
 # Configurações padrão (podem ser sobrescritas por parâmetros)
 EMBED_MODEL_ID = os.getenv("EMBED_MODEL_ID") 
 CHUNK_SIZE = 1000 
 CHUNK_OVERLAP = 200
+# Ids dos chunks derivados de fonte + hash do conteúdo
+CHUNK_ID_SCHEME = "source-sha256"
 
 # Gerenciador de bases
 try:
@@ -33,11 +65,219 @@ except ImportError:
     
     base_manager = FallbackBaseManager()
 
-def create_vectorstore(documents_dir=None, faiss_index_path=None, output_docs_file=None, base_name=None):
+def chunk_id_for(source, text):
+    """Id estável do chunk: hash da fonte e do conteúdo."""
+    return hashlib.sha256(f"{source}\0{text}".encode("utf-8")).hexdigest()[:32]
+
+def assign_chunk_ids(splits):
+    """
+    Retorna {chunk_id: chunk}, descartando chunks repetidos da mesma fonte.
+    Também grava em cada chunk o número de tokens (n_tokens), usado na montagem
+    do prompt sem precisar tokenizar na consulta.
+    """
+    chunks = {}
+    token_counts = token_counter.count_many([doc.page_content for doc in splits]) if splits else []
+    for doc, n_tokens in zip(splits, token_counts):
+        source = doc.metadata.get("source", "")
+        doc.metadata["chunk_hash"] = hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()
+        doc.metadata["n_tokens"] = n_tokens
+        chunks.setdefault(chunk_id_for(source, doc.page_content), doc)
+    return chunks
+
+def load_for_update(faiss_index_path, embedding, normalize=False, index_spec=None):
+    """
+    Carrega o índice existente para atualização incremental. Retorna None se for
+    preciso reconstruir (índice inexistente, outro modelo, outro chunking, outra
+    normalização, outro tipo de índice, índice não flat ou ids antigos).
+    """
+    index_spec = index_spec or parse_index_spec("flat")
+    if not index_exists(faiss_index_path) or not supports_incremental(index_spec):
+        return None
+    meta = read_index_meta(faiss_index_path)
+    if parse_index_spec(meta.get("index_spec", "flat")) != index_spec:
+        return None
+    if (meta.get("embedding_model") != EMBED_MODEL_ID
+            or meta.get("id_scheme") != CHUNK_ID_SCHEME
+            or meta.get("chunk_size") != CHUNK_SIZE
+            or meta.get("chunk_overlap") != CHUNK_OVERLAP
+            or bool(meta.get("normalize", False)) != normalize):
+        return None
+    try:
+        return load_vectorstore(faiss_index_path, embedding, mmap=False)
+    except Exception as e:
+        print(f"⚠️ Não foi possível carregar o índice existente, reconstruindo: {e}")
+        return None
+
+def embed_chunks(splits, embedding, progress_callback=None, cache=None, batch_size=EMBED_BATCH_SIZE,
+                 threads=EMBED_THREADS, normalize=EMBED_NORMALIZE):
+    """
+    Gera os embeddings dos chunks com a EmbeddingStage (lotes e threads configuráveis),
+    informando progresso, vazão e ETA. Com um VectorCache, reaproveita os vetores já
+    calculados pelo hash do chunk e grava os novos no cache (sem normalização).
+    Retorna (vetores, acertos no cache, vazão).
+    """
+    hashes = [doc.metadata["chunk_hash"] for doc in splits]
+    cached = cache.get_many(hashes) if cache is not None else {}
+    missing = [i for i, chunk_hash in enumerate(hashes) if chunk_hash not in cached]
+    cache_hits = len(splits) - len(missing)
+
+    def report(progress):
+        if progress_callback is not None:
+            done = cache_hits + progress.get("embedded", 0)
+            progress_callback({**progress, "done": done, "chunks_embedded": done, "cache_hits": cache_hits})
+
+    def on_batch(start, batch_vectors):
+        if cache is not None:
+            cache.put_many([hashes[i] for i in missing[start:start + len(batch_vectors)]], batch_vectors)
+
+    report({})
+    stage = EmbeddingStage(embedding, batch_size=batch_size, threads=threads, progress_callback=report)
+    new_vectors = stage.run([splits[i].page_content for i in missing], on_batch=on_batch)
+
+    vectors = [cached.get(chunk_hash) for chunk_hash in hashes]
+    for i, vector in zip(missing, new_vectors):
+        vectors[i] = vector
+    if normalize and vectors:
+        vectors = normalize_vectors(vectors)
+
+    throughput = stage.throughput()
+    if throughput["chunks"]:
+        print(f"⚡ {throughput['chunks']} chunks embedados em {throughput['seconds']}s "
+              f"({throughput['chunks_per_second']} chunks/s, lote={throughput['batch_size']}, threads={throughput['threads']})")
+    return vectors, cache_hits, throughput
+
+def compact_vector_cache(model_id=EMBED_MODEL_ID):
+    """
+    Compacta o cache de embeddings do modelo, mantendo apenas os chunks que ainda
+    existem nos documentos processados de alguma base.
+    """
+    keep_hashes = set()
+    for base_config in base_manager.bases_config.values():
+        store = open_document_store(base_config["output_docs_file"])
+        for doc in store:
+            for chunk in split_documents([doc]):
+                keep_hashes.add(hashlib.sha256(chunk.page_content.encode("utf-8")).hexdigest())
+    return VectorCache(model_id).compact(keep_hashes)
+
+def build_vectorstore(chunks, ids, vectors, embedding, index_spec):
+    """
+    Monta o vector store com o tipo de índice da especificação. O flat sem
+    quantização segue o caminho padrão do LangChain; os demais são criados pelo
+    ann_index.
+    """
+    if supports_incremental(index_spec):
+        return FAISS.from_embeddings(
+            text_embeddings=list(zip([doc.page_content for doc in chunks], vectors)),
+            embedding=embedding,
+            metadatas=[doc.metadata for doc in chunks],
+            ids=ids
+        )
+    index = build_index(np.asarray(vectors, dtype=np.float32), index_spec)
+    return FAISS(
+        embedding_function=embedding,
+        index=index,
+        docstore=InMemoryDocstore(dict(zip(ids, chunks))),
+        index_to_docstore_id=dict(enumerate(ids))
+    )
+
+def exact_vectors(chunks, faiss_index_path):
+    """
+    Vetores em precisão total dos chunks, para reconstruir índices quantizados
+    (os vetores decodificados do índice têm perda, que se acumularia a cada
+    reconstrução). Vêm do cache de embeddings pelo chunk_hash; os ausentes são
+    embedados de novo com o modelo do índice.
+    """
+    meta = read_index_meta(faiss_index_path)
+    model_id = meta.get("embedding_model") or EMBED_MODEL_ID
+    hashes = [doc.metadata.get("chunk_hash") or hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()
+              for doc in chunks]
+    cache = VectorCache(model_id) if EMBED_CACHE_ENABLED else None
+    cached = cache.get_many(hashes) if cache is not None else {}
+    missing = [i for i, chunk_hash in enumerate(hashes) if chunk_hash not in cached]
+    vectors = [cached.get(chunk_hash) for chunk_hash in hashes]
+    if missing:
+        print(f"🔁 {len(missing)} vetores sem cópia exata, gerando os embeddings novamente...")
+        new_vectors = EmbeddingStage(get_embeddings(model_id)).run([chunks[i].page_content for i in missing])
+        if cache is not None:
+            cache.put_many([hashes[i] for i in missing], new_vectors)
+        for i, vector in zip(missing, new_vectors):
+            vectors[i] = vector
+    if meta.get("normalize") and vectors:
+        vectors = normalize_vectors(vectors)
+    return np.asarray(vectors, dtype=np.float32).reshape(len(chunks), -1)
+
+def stored_vectors(vectorstore, positions, chunks, faiss_index_path, index_spec):
+    """
+    Vetores das posições informadas: dos vetores em precisão total no disco, se
+    existirem; reconstruídos a partir do índice, se ele não for quantizado
+    (reconstrução exata); senão, do cache de embeddings (ver exact_vectors).
+    """
+    dim = vectorstore.index.d
+    if not positions:
+        return np.empty((0, dim), dtype=np.float32)
+    full_vectors = open_full_vectors(faiss_index_path, dim)
+    if full_vectors is not None and full_vectors.shape[0] >= vectorstore.index.ntotal:
+        return np.asarray(full_vectors[positions], dtype=np.float32)
+    if is_quantized(index_spec):
+        return exact_vectors(chunks, faiss_index_path)
+    try:
+        # IVF só reconstrói com o mapa direto de ids
+        faiss.extract_index_ivf(vectorstore.index).make_direct_map()
+    except RuntimeError:
+        pass
+    return np.vstack([vectorstore.index.reconstruct(position) for position in positions])
+
+def rebuild_without(vectorstore, removed_ids, index_spec, faiss_index_path):
+    """
+    Reconstrói o índice sem os chunks informados (para tipos sem remoção no lugar).
+    Retorna (vector store, vetores na ordem das posições).
+    """
+    removed_ids = set(removed_ids)
+    kept = [(position, chunk_id) for position, chunk_id in sorted(vectorstore.index_to_docstore_id.items())
+            if chunk_id not in removed_ids]
+    ids = [chunk_id for _, chunk_id in kept]
+    chunks = [vectorstore.docstore.search(chunk_id) for chunk_id in ids]
+    vectors = stored_vectors(vectorstore, [position for position, _ in kept], chunks, faiss_index_path, index_spec)
+    return build_vectorstore(chunks, ids, vectors, vectorstore.embedding_function, index_spec), vectors
+
+def update_full_vectors(faiss_index_path, index_spec, vectors):
+    """Grava (ou remove) os vetores em precisão total usados na reordenação exata."""
+    if is_quantized(index_spec) and index_spec.get("rerank"):
+        save_full_vectors(faiss_index_path, vectors)
+    else:
+        remove_full_vectors(faiss_index_path)
+
+def index_vectors(vectorstore):
+    """Vetores armazenados em um índice flat (usados na avaliação após atualizações incrementais)."""
+    return vectorstore.index.reconstruct_n(0, vectorstore.index.ntotal)
+
+def split_documents(processed_docs):
+    """Aplica a estratégia de chunking aos documentos processados."""
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        separators=["\n\n", "\n", ". ", ", ", " ", ""],
+    )
+    return text_splitter.split_documents(processed_docs)
+
+def create_vectorstore(documents_dir=None, faiss_index_path=None, output_docs_file=None, base_name=None, progress_callback=None, full=False,
+                       batch_size=None, threads=None, normalize=None, index_spec=None, evaluate=True):
     """
-    Carrega documentos pré-processados e cria um Vector Store.
-    Se base_name for fornecido, usa a configuração dessa base.
+    Carrega documentos pré-processados e cria ou atualiza o Vector Store.
+    Se o índice existente for compatível, apenas os chunks novos são embedados e
+    os chunks de fontes removidas ou alteradas são excluídos; full=True força a
+    reconstrução completa. Se base_name for fornecido, usa a configuração dessa base.
+    batch_size, threads e normalize ajustam a etapa de embedding (padrões no .env).
+    index_spec define o tipo de índice (flat, ivf, hnsw; padrão: "index" da base
+    no bases_config.json ou FAISS_INDEX_SPEC); índices não flat são sempre
+    reconstruídos, reaproveitando os vetores do cache em disco. Com evaluate=True
+    o resultado inclui recall@k contra uma busca exata e a latência das consultas.
+    Se informado, progress_callback recebe um dict com a etapa e o progresso.
     """
+    def report(**progress):
+        if progress_callback is not None:
+            progress_callback(progress)
+
     print("🚀 Iniciando a criação do Vector Store...")
     
     # Determinar qual configuração usar
@@ -50,12 +290,15 @@ def create_vectorstore(documents_dir=None, faiss_index_path=None, output_docs_fi
             }
         
         base_config = base_manager.bases_config[base_name]
+        index_spec = base_config.get("index") if index_spec is None else index_spec
         documents_dir = base_config["documents_dir"]
         faiss_index_path = base_config["faiss_index_path"]
         output_docs_file = base_config["output_docs_file"]
         print(f"📁 Criando vectorstore para base: {base_name}")
     else:
         # Usar configuração fornecida ou padrão da base atual
+        if index_spec is None and faiss_index_path is None:
+            index_spec = base_manager.get_current_base_config().get("index")
         if documents_dir is None:
             documents_dir = base_manager.get_current_base_config()["documents_dir"]
         if faiss_index_path is None:
@@ -64,44 +307,137 @@ def create_vectorstore(documents_dir=None, faiss_index_path=None, output_docs_fi
             output_docs_file = base_manager.get_current_base_config()["output_docs_file"]
         print(f"📁 Criando vectorstore para diretório: {documents_dir}")
 
-    # 1. Carregar os documentos pré-processados do arquivo pickle
-    print(f"🔄 Carregando documentos de '{output_docs_file}'...")
-    try:
-        with open(output_docs_file, "rb") as f:
-            processed_docs = pickle.load(f)
-    except FileNotFoundError:
-        print(f"❌ Erro: Arquivo '{output_docs_file}' não encontrado.")
+    # 1. Abrir os documentos pré-processados da base
+    report(stage="loading")
+    store = open_document_store(output_docs_file)
+    print(f"🔄 Carregando documentos de '{store.path}'...")
+    if not store.exists():
+        print(f"❌ Erro: Arquivo '{store.path}' não encontrado.")
         print("➡️ Por favor, processe os documentos primeiro.")
         return {
             "status": "error",
-            "message": f"Arquivo '{output_docs_file}' não encontrado"
+            "message": f"Arquivo '{store.path}' não encontrado"
         }
-    print(f"✅ {len(processed_docs)} documentos carregados.")
+    print(f"✅ {store.count()} documentos encontrados.")
 
-    # 2. Aplicar a estratégia de Chunking
+    # 2. Aplicar a estratégia de Chunking (documento a documento, em streaming)
+    report(stage="chunking")
     print(f"📄 Aplicando chunking: size={CHUNK_SIZE}, overlap={CHUNK_OVERLAP}")
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP,
-        separators=["\n\n", "\n", ". ", ", ", " ", ""],
-    )
-    splits = text_splitter.split_documents(processed_docs)
+    splits = [chunk for doc in store for chunk in split_documents([doc])]
     print(f"✅ Documentos divididos em {len(splits)} chunks.")
     
     # 3. Criar os Embeddings e o Vector Store
     print(f"🧠 Criando embeddings com o modelo: {EMBED_MODEL_ID}")
-    embedding = HuggingFaceEmbeddings(model_name=EMBED_MODEL_ID)
+    embedding = get_embeddings(EMBED_MODEL_ID)
 
-    print(f"💾 Criando e salvando o índice FAISS em '{faiss_index_path}'...")
+    print(f"💾 Atualizando o índice FAISS em '{faiss_index_path}'...")
     if not splits:
         print("❌ Nenhum chunk foi criado. Abortando a criação do índice.")
         return {
             "status": "error",
             "message": "Nenhum chunk foi criado a partir dos documentos"
         }
-        
-    vectorstore = FAISS.from_documents(documents=splits, embedding=embedding)
-    vectorstore.save_local(faiss_index_path)
+
+    if normalize is None:
+        normalize = EMBED_NORMALIZE
+    try:
+        index_spec = parse_index_spec(index_spec)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    print(f"🗂️ Tipo de índice: {spec_label(index_spec)}")
+
+    chunks = assign_chunk_ids(splits)
+    vectorstore = None if full else load_for_update(faiss_index_path, embedding, normalize, index_spec)
+
+    if vectorstore is None:
+        # Reconstrução completa
+        print(f"🆕 Reconstruindo o índice com {len(chunks)} chunks...")
+        to_add = list(chunks.keys())
+        to_delete = []
+        unchanged = 0
+    else:
+        existing_ids = set(vectorstore.index_to_docstore_id.values())
+        to_add = [chunk_id for chunk_id in chunks if chunk_id not in existing_ids]
+        to_delete = [chunk_id for chunk_id in existing_ids if chunk_id not in chunks]
+        unchanged = len(chunks) - len(to_add)
+        print(f"♻️ Atualização incremental: {len(to_add)} novos, {len(to_delete)} removidos, {unchanged} inalterados.")
+
+    new_chunks = [chunks[chunk_id] for chunk_id in to_add]
+    report(stage="embedding", total=len(new_chunks), done=0, chunks_total=len(new_chunks), chunks_embedded=0)
+    cache = VectorCache(EMBED_MODEL_ID) if EMBED_CACHE_ENABLED else None
+    vectors, cache_hits, throughput = embed_chunks(
+        new_chunks, embedding, progress_callback, cache,
+        batch_size=EMBED_BATCH_SIZE if batch_size is None else batch_size,
+        threads=EMBED_THREADS if threads is None else threads,
+        normalize=normalize
+    )
+    if cache_hits:
+        print(f"♻️ {cache_hits} de {len(new_chunks)} embeddings reaproveitados do cache em disco.")
+
+    report(stage="indexing")
+    rebuilt = vectorstore is None
+    if rebuilt:
+        vectorstore = build_vectorstore(new_chunks, to_add, vectors, embedding, index_spec)
+    else:
+        if to_delete:
+            vectorstore.delete(to_delete)
+        if to_add:
+            text_embeddings = list(zip([doc.page_content for doc in new_chunks], vectors))
+            metadatas = [doc.metadata for doc in new_chunks]
+            vectorstore.add_embeddings(text_embeddings=text_embeddings, metadatas=metadatas, ids=to_add)
+
+    index_report = {}
+    if evaluate and ANN_EVAL_QUERIES > 0 and (rebuilt or to_add or to_delete):
+        report(stage="evaluating")
+        all_vectors = np.asarray(vectors, dtype=np.float32) if rebuilt else index_vectors(vectorstore)
+        index_report = evaluate_index(vectorstore.index, all_vectors, spec=index_spec)
+        if index_report:
+            latency = index_report["latency_ms"]
+            print(f"📏 recall@{index_report['k']}: {index_report['recall_at_k']} | "
+                  f"latência média: {latency['index']['mean']} ms (flat: {latency['flat']['mean']} ms) | "
+                  f"memória: {index_report['memory']['index_bytes'] / (1024 * 1024):.1f} MB "
+                  f"(compressão {index_report['memory']['compression']}x em relação ao flat)")
+            if "recall_delta" in index_report:
+                print(f"📉 Perda de recall pela quantização: {index_report['recall_delta']}"
+                      + (f" | com reordenação exata: {index_report['recall_rescored']}" if "recall_rescored" in index_report else ""))
+
+    report(stage="saving")
+
+    # Índice esparso (BM25) para a busca híbrida, refeito sobre todos os chunks
+    sparse_index = None if (to_add or to_delete) else BM25Index.load(faiss_index_path)
+    sparse_changed = sparse_index is None
+    if sparse_changed:
+        sparse_index = BM25Index.build((chunk_id, doc.page_content) for chunk_id, doc in chunks.items())
+        print(f"🔤 Índice BM25: {len(sparse_index.postings)} termos (analisador {sparse_index.analyzer.name}).")
+    if not index_report:
+        # Índice inalterado: mantém a última avaliação registrada
+        index_report = read_index_meta(faiss_index_path).get("index_report", {})
+
+    def write_index_files():
+        if rebuilt:
+            update_full_vectors(faiss_index_path, index_spec, np.asarray(vectors, dtype=np.float32))
+        if sparse_changed:
+            sparse_index.save(faiss_index_path)
+        # Registra o modelo e o esquema de ids do índice, usados nas próximas atualizações
+        write_index_meta(
+            faiss_index_path,
+            embedding_model=EMBED_MODEL_ID,
+            id_scheme=CHUNK_ID_SCHEME,
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP,
+            normalize=normalize,
+            index_spec=index_spec,
+            index_report=index_report,
+            sparse_analyzer=sparse_index.analyzer.name,
+            prompt_tokenizer=token_counter.name,
+            chunks=len(chunks)
+        )
+
+    if to_add or to_delete or not index_exists(faiss_index_path):
+        # Vetores, BM25 e metadados são gravados antes da publicação do index.faiss
+        save_vectorstore(vectorstore, faiss_index_path, before_publish=write_index_files)
+    else:
+        write_index_files()
     
     result = {
         "status": "success",
@@ -110,13 +446,57 @@ def create_vectorstore(documents_dir=None, faiss_index_path=None, output_docs_fi
         "documents_dir": documents_dir,
         "faiss_index_path": faiss_index_path,
         "output_docs_file": output_docs_file,
-        "chunks_created": len(splits),
+        "chunks_created": len(chunks),
+        "chunks_added": len(to_add),
+        "chunks_removed": len(to_delete),
+        "chunks_unchanged": unchanged,
+        "embedding_cache_hits": cache_hits,
+        "embedding_throughput": throughput,
+        "incremental": unchanged > 0 or bool(to_delete),
+        "index_spec": index_spec,
+        "index_report": index_report,
+        "sparse_index": sparse_index.stats(),
         "embedding_model": EMBED_MODEL_ID
     }
     
     print(f"🎉 Vector Store criado com sucesso para base: {result['base']}")
     return result
 
+def remove_sources_from_index(faiss_index_path, sources):
+    """
+    Remove do índice (e do docstore) os chunks cujos documentos vêm das fontes informadas.
+    Retorna o número de chunks removidos.
+    """
+    if not index_exists(faiss_index_path):
+        return 0
+
+    index_spec = parse_index_spec(read_index_meta(faiss_index_path).get("index_spec", "flat"))
+    # Remover não gera embeddings: o modelo só é carregado se exact_vectors precisar
+    vectorstore = load_vectorstore(faiss_index_path, None, mmap=False)
+    sources = {str(source) for source in sources}
+
+    to_delete = vectorstore.docstore.ids_for_sources(sources)
+
+    if to_delete:
+        if supports_removal(index_spec):
+            vectorstore.delete(to_delete)
+        else:
+            vectorstore, vectors = rebuild_without(vectorstore, to_delete, index_spec, faiss_index_path)
+        sparse_index = BM25Index.load(faiss_index_path)
+        if sparse_index is not None:
+            sparse_index.remove(to_delete)
+
+        def write_index_files():
+            if not supports_removal(index_spec):
+                update_full_vectors(faiss_index_path, index_spec, vectors)
+            if sparse_index is not None:
+                sparse_index.save(faiss_index_path)
+            write_index_meta(faiss_index_path, chunks=len(vectorstore.index_to_docstore_id))
+
+        save_vectorstore(vectorstore, faiss_index_path, before_publish=write_index_files)
+        print(f"🗑️ {len(to_delete)} chunks removidos do índice '{faiss_index_path}'.")
+    return len(to_delete)
+
 def create_vectorstore_for_all_bases():
     """Cria vectorstores para todas as bases configuradas"""
     results = {}
@@ -132,8 +512,38 @@ def create_vectorstore_for_all_bases():
     return results
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cria ou atualiza o Vector Store de uma base.")
+    parser.add_argument("--base", default=None, help="Nome da base (padrão: base atual)")
+    parser.add_argument("--full", action="store_true", help="Reconstrói o índice do zero")
+    parser.add_argument("--compact-cache", action="store_true", help="Compacta o cache de embeddings em disco e sai")
+    parser.add_argument("--cache-stats", action="store_true", help="Mostra o tamanho do cache de embeddings em disco e sai")
+    parser.add_argument("--batch-size", type=int, default=None, help=f"Tamanho do lote de embedding (padrão: {EMBED_BATCH_SIZE})")
+    parser.add_argument("--threads", type=int, default=None, help="Threads do PyTorch na etapa de embedding (0 = padrão)")
+    parser.add_argument("--normalize", action="store_true", default=None, help="Normaliza os vetores (L2) antes de indexar")
+    parser.add_argument("--index", default=None, help='Tipo de índice, ex.: "flat", "ivf:nlist=256,nprobe=16", "hnsw:M=32,efSearch=64"')
+    parser.add_argument("--no-eval", action="store_true", help="Não avalia recall/latência após a construção")
+    args = parser.parse_args()
+
+    if args.cache_stats:
+        for stats in cache_stats_all():
+            print(f"🗄️ {stats['model_id']}: {stats['entries']} vetores, {stats['size_mb']} MB ({stats['path']})")
+        raise SystemExit(0)
+
+    if args.compact_cache:
+        stats = compact_vector_cache()
+        print(f"🧹 Cache compactado: {stats['removed']} vetores removidos, {stats['bytes_before']} -> {stats['bytes_after']} bytes")
+        raise SystemExit(0)
+
     # Comportamento padrão: criar para a base atual
-    result = create_vectorstore()
+    result = create_vectorstore(
+        base_name=args.base,
+        full=args.full,
+        batch_size=args.batch_size,
+        threads=args.threads,
+        normalize=args.normalize,
+        index_spec=args.index,
+        evaluate=not args.no_eval
+    )
     
     if result and result.get("status") == "success":
         print(f"\n🎉 Vector Store criado com sucesso!")
@@ -141,5 +551,9 @@ if __name__ == "__main__":
         print(f"Documentos: {result['documents_dir']}")
         print(f"Índice: {result['faiss_index_path']}")
         print(f"Chunks: {result['chunks_created']}")
+        print(f"Vazão: {result['embedding_throughput']['chunks_per_second']} chunks/s")
+        print(f"Tipo de índice: {spec_label(result['index_spec'])}")
+        if result["index_report"]:
+            print(f"Recall@{result['index_report']['k']}: {result['index_report']['recall_at_k']}")
     else:
-        print(f"\n❌ Falha ao criar Vector Store: {result.get('message', 'Erro desconhecido')}")
\ No newline at end of file
+        print(f"\n❌ Falha ao criar Vector Store: {result.get('message', 'Erro desconhecido')}")
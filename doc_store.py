@@ -0,0 +1,259 @@
+import os
+import json
+import pickle
+import argparse
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from langchain_core.documents import Document
+
+# Documentos processados de uma base: um registro JSON por linha (.jsonl) e um
+# índice (.idx.json) com o deslocamento de cada registro no arquivo, permitindo
+# percorrer, posicionar e paginar sem carregar o corpus inteiro em memória.
+
+STORE_SUFFIX = ".jsonl"
+INDEX_SUFFIX = ".idx.json"
+INDEX_VERSION = 1
+
+
+def store_path_for(output_docs_file: str) -> Path:
+    """Caminho do arquivo JSONL associado ao output_docs_file configurado na base."""
+    return Path(output_docs_file).with_suffix(STORE_SUFFIX)
+
+
+def _to_record(doc: Document) -> Dict:
+    return {"page_content": doc.page_content, "metadata": doc.metadata}
+
+
+def _to_document(record: Dict) -> Document:
+    return Document(page_content=record["page_content"], metadata=record.get("metadata", {}))
+
+
+class DocumentStore:
+    """
+    Armazenamento de documentos processados em JSONL com índice de deslocamentos.
+
+    A escrita é sempre feita em arquivos temporários e publicada com os.replace,
+    de modo que uma gravação interrompida nunca corrompe a base. O índice guarda
+    o tamanho do JSONL a que se refere; se não corresponder (ex.: índice de uma
+    gravação anterior), ele é refeito percorrendo o arquivo.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.index_path = self.path.with_suffix(INDEX_SUFFIX)
+        self._lock = threading.Lock()
+        self._index: Optional[Dict] = None
+        self._index_key = None
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def mtime(self) -> Optional[float]:
+        return os.path.getmtime(self.path) if self.exists() else None
+
+    # ----------- escrita -----------
+    def write(self, docs: Iterable[Document]) -> int:
+        """
+        Grava os documentos (pode ser um iterador, inclusive sobre este mesmo
+        arquivo) de forma atômica. Retorna o número de documentos gravados.
+        """
+        tmp_file = self.path.with_suffix(STORE_SUFFIX + ".tmp")
+        offsets, sources, lengths = [], [], []
+        with open(tmp_file, "wb") as f:
+            for doc in docs:
+                offsets.append(f.tell())
+                sources.append(str(doc.metadata.get("source", "")))
+                lengths.append(len(doc.page_content))
+                line = json.dumps(_to_record(doc), ensure_ascii=False, default=str)
+                f.write(line.encode("utf-8") + b"\n")
+            data_size = f.tell()
+            f.flush()
+            os.fsync(f.fileno())
+
+        index = {
+            "version": INDEX_VERSION,
+            "data_size": data_size,
+            "offsets": offsets,
+            "sources": sources,
+            "lengths": lengths,
+        }
+        tmp_index = self.index_path.with_suffix(".json.tmp")
+        with open(tmp_index, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+
+        with self._lock:
+            os.replace(tmp_file, self.path)
+            os.replace(tmp_index, self.index_path)
+            self._index = None
+        return len(offsets)
+
+    # ----------- índice -----------
+    def _scan(self, f) -> Dict:
+        """Reconstrói o índice percorrendo o arquivo aberto."""
+        offsets, sources, lengths = [], [], []
+        f.seek(0)
+        while True:
+            offset = f.tell()
+            line = f.readline()
+            if not line:
+                break
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            offsets.append(offset)
+            sources.append(str(record.get("metadata", {}).get("source", "")))
+            lengths.append(len(record["page_content"]))
+        return {"version": INDEX_VERSION, "data_size": f.tell(), "offsets": offsets, "sources": sources, "lengths": lengths}
+
+    def _load_index(self, f) -> Dict:
+        """Índice correspondente ao arquivo aberto (em cache enquanto o arquivo não mudar)."""
+        stat = os.fstat(f.fileno())
+        key = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            if self._index is not None and self._index_key == key:
+                return self._index
+
+        index = None
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as index_file:
+                index = json.load(index_file)
+        except (FileNotFoundError, ValueError):
+            pass
+        if not index or index.get("version") != INDEX_VERSION or index.get("data_size") != stat.st_size:
+            index = self._scan(f)
+
+        with self._lock:
+            self._index, self._index_key = index, key
+        return index
+
+    def _open(self):
+        return open(self.path, "rb")
+
+    # ----------- leitura -----------
+    def count(self) -> int:
+        if not self.exists():
+            return 0
+        with self._open() as f:
+            return len(self._load_index(f)["offsets"])
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def summary(self) -> List[Dict]:
+        """Fonte e tamanho (em caracteres) de cada documento, sem ler o conteúdo."""
+        if not self.exists():
+            return []
+        with self._open() as f:
+            index = self._load_index(f)
+        return [{"source": source, "length": length} for source, length in zip(index["sources"], index["lengths"])]
+
+    def get(self, position: int) -> Document:
+        """Lê um único documento pela posição."""
+        with self._open() as f:
+            offsets = self._load_index(f)["offsets"]
+            f.seek(offsets[position])
+            return _to_document(json.loads(f.readline()))
+
+    def iter_documents(self, start: int = 0, stop: Optional[int] = None,
+                       positions: Optional[Iterable[int]] = None) -> Iterator[Document]:
+        """
+        Percorre os documentos em streaming, do intervalo [start, stop) ou das
+        posições informadas.
+        """
+        if not self.exists():
+            return
+        with self._open() as f:
+            offsets = self._load_index(f)["offsets"]
+            if positions is None:
+                positions = range(start, len(offsets) if stop is None else min(stop, len(offsets)))
+            for position in positions:
+                f.seek(offsets[position])
+                yield _to_document(json.loads(f.readline()))
+
+    def __iter__(self) -> Iterator[Document]:
+        return self.iter_documents()
+
+    def page(self, offset: int = 0, limit: int = 50) -> List[Document]:
+        return list(self.iter_documents(offset, offset + limit))
+
+    def load_all(self) -> List[Document]:
+        return list(self.iter_documents())
+
+
+class DocumentSummaryCache:
+    """
+    Resumo em memória dos documentos de cada base (fonte e tamanho de cada
+    documento e totais por fonte), refeito apenas quando o arquivo muda.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+
+    def get(self, store: DocumentStore) -> Dict:
+        if not store.exists():
+            return {"documents": [], "by_source": {}}
+        stat = os.stat(store.path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        path = str(store.path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry["key"] == key:
+                return entry["summary"]
+
+        documents = store.summary()
+        by_source: Dict[str, Dict] = {}
+        for position, document in enumerate(documents):
+            totals = by_source.setdefault(document["source"], {"documents": 0, "length": 0, "positions": []})
+            totals["documents"] += 1
+            totals["length"] += document["length"]
+            totals["positions"].append(position)
+        summary = {"documents": documents, "by_source": by_source}
+
+        with self._lock:
+            self._entries[path] = {"key": key, "summary": summary}
+        return summary
+
+    def invalidate(self, store: Optional[DocumentStore] = None):
+        with self._lock:
+            if store is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(str(store.path), None)
+
+
+# Instância global usada pela API
+document_summary_cache = DocumentSummaryCache()
+
+
+def migrate_pickle(pickle_file: str, store: DocumentStore) -> int:
+    """Converte um arquivo pickle de documentos processados para o DocumentStore."""
+    with open(pickle_file, "rb") as f:
+        docs = pickle.load(f)
+    count = store.write(docs)
+    os.replace(pickle_file, f"{pickle_file}.migrated")
+    print(f"📦 {count} documentos migrados de '{pickle_file}' para '{store.path}'.")
+    return count
+
+
+def open_document_store(output_docs_file: str) -> DocumentStore:
+    """
+    Abre o armazenamento de documentos da base. Na primeira abertura, se houver
+    apenas o pickle antigo, ele é convertido (e renomeado para .migrated).
+    """
+    store = DocumentStore(store_path_for(output_docs_file))
+    legacy = Path(output_docs_file)
+    if not store.exists() and legacy.suffix == ".pkl" and legacy.exists():
+        migrate_pickle(str(legacy), store)
+    return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migra arquivos de documentos processados (.pkl) para JSONL indexado.")
+    parser.add_argument("files", nargs="+", help="Arquivos output_docs_file das bases (ex.: processed_docs.pkl)")
+    args = parser.parse_args()
+    for output_docs_file in args.files:
+        store = open_document_store(output_docs_file)
+        print(f"✅ {store.path}: {store.count()} documentos")
@@ -0,0 +1,90 @@
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+
+load_dotenv()
+
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", 2048))
+
+
+def normalize_query(text: str) -> str:
+    """Normaliza a pergunta (Unicode NFC e espaços) para uso como chave do cache."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class QueryEmbeddingCache:
+    """Cache LRU de embeddings de consultas, indexado por (model id, texto normalizado)."""
+
+    def __init__(self, max_size: int = QUERY_EMBEDDING_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, model_id: str, text: str) -> Optional[List[float]]:
+        key = (model_id, text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, model_id: str, text: str, vector: List[float]):
+        key = (model_id, text)
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove todas as entradas (por exemplo, ao trocar o EMBED_MODEL_ID)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+# Instância global compartilhada por todos os caminhos de busca
+query_embedding_cache = QueryEmbeddingCache()
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Envolve um modelo de embeddings e reaproveita os vetores de consultas repetidas.
+    `embed_documents` é repassado diretamente ao modelo original.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_id: str, cache: QueryEmbeddingCache = query_embedding_cache):
+        self.embeddings = embeddings
+        self.model_id = model_id
+        self.cache = cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        normalized = normalize_query(text)
+        vector = self.cache.get(self.model_id, normalized)
+        if vector is None:
+            vector = self.embeddings.embed_query(normalized)
+            self.cache.put(self.model_id, normalized, vector)
+        return vector
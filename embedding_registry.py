@@ -0,0 +1,51 @@
+import os
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from dotenv import load_dotenv
+from langchain_huggingface.embeddings import HuggingFaceEmbeddings
+
+load_dotenv()
+os.environ["HUGGINGFACE_HUB_DISABLE_SYMLINKS"] = "1"
+
+EMBED_MODEL_ID = os.getenv("EMBED_MODEL_ID")
+
+# Modelos de embedding já carregados no processo, por model id
+_models: Dict[str, HuggingFaceEmbeddings] = {}
+_lock = threading.Lock()
+
+
+def get_embeddings(model_id: Optional[str] = None) -> HuggingFaceEmbeddings:
+    """
+    Retorna o modelo de embeddings do model id, carregando-o apenas na primeira vez.
+    A mesma instância é compartilhada pelo RAG, pela ingestão e pela inspeção.
+    """
+    model_id = model_id or EMBED_MODEL_ID
+    embeddings = _models.get(model_id)
+    if embeddings is not None:
+        return embeddings
+
+    with _lock:
+        embeddings = _models.get(model_id)
+        if embeddings is None:
+            print(f"🧠 Carregando modelo de embeddings: {model_id}")
+            embeddings = HuggingFaceEmbeddings(model_name=model_id)
+            _models[model_id] = embeddings
+        return embeddings
+
+
+def warm_up(model_ids: Iterable[str]) -> List[str]:
+    """Carrega antecipadamente os modelos informados (ex.: na inicialização da API)."""
+    loaded = []
+    for model_id in dict.fromkeys(m for m in model_ids if m):
+        try:
+            get_embeddings(model_id)
+            loaded.append(model_id)
+        except Exception as e:
+            print(f"⚠️ Erro ao carregar o modelo de embeddings '{model_id}': {e}")
+    return loaded
+
+
+def loaded_models() -> List[str]:
+    """Lista os model ids já carregados no processo."""
+    return list(_models.keys())
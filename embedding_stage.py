@@ -0,0 +1,105 @@
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 32))
+EMBED_THREADS = int(os.getenv("EMBED_THREADS", 0))  # 0 = padrão do PyTorch
+EMBED_NORMALIZE = os.getenv("EMBED_NORMALIZE", "false").lower() == "true"
+
+
+def set_intra_op_threads(threads: int) -> Optional[int]:
+    """Ajusta o número de threads intra-op do PyTorch. Retorna o valor em uso."""
+    try:
+        import torch
+    except ImportError:
+        return None
+    if threads and threads > 0:
+        torch.set_num_threads(threads)
+    return torch.get_num_threads()
+
+
+def normalize_vectors(vectors: List[List[float]]) -> List[List[float]]:
+    """Normaliza os vetores pela norma L2."""
+    array = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(array, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (array / norms).tolist()
+
+
+class EmbeddingStage:
+    """
+    Etapa de embedding da ingestão: processa os textos em lotes de tamanho
+    configurável, com número de threads do PyTorch ajustável, e mede a vazão
+    (chunks/s) e o tempo restante estimado a cada lote.
+    """
+
+    def __init__(self, embedding, batch_size: int = EMBED_BATCH_SIZE, threads: int = EMBED_THREADS,
+                 progress_callback: Optional[Callable[[Dict], None]] = None):
+        self.embedding = embedding
+        self.batch_size = max(1, batch_size)
+        self.threads = threads
+        self.progress_callback = progress_callback
+        self.embedded = 0
+        self.seconds = 0.0
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        encode_kwargs = getattr(self.embedding, "encode_kwargs", None)
+        if encode_kwargs is None:
+            return self.embedding.embed_documents(texts)
+        # Alinha o lote interno do sentence-transformers ao lote da etapa
+        previous = encode_kwargs.get("batch_size")
+        encode_kwargs["batch_size"] = self.batch_size
+        try:
+            return self.embedding.embed_documents(texts)
+        finally:
+            if previous is None:
+                encode_kwargs.pop("batch_size", None)
+            else:
+                encode_kwargs["batch_size"] = previous
+
+    def run(self, texts: List[str], on_batch: Optional[Callable[[int, List[List[float]]], None]] = None) -> List[List[float]]:
+        """
+        Gera os embeddings dos textos. on_batch(início, vetores) é chamado após
+        cada lote (ex.: para gravar no cache em disco).
+        """
+        threads_in_use = set_intra_op_threads(self.threads)
+        if threads_in_use:
+            self.threads = threads_in_use
+
+        vectors: List[List[float]] = []
+        start_time = time.monotonic()
+        for start in range(0, len(texts), self.batch_size):
+            batch_vectors = self._encode(texts[start:start + self.batch_size])
+            vectors.extend(batch_vectors)
+            if on_batch is not None:
+                on_batch(start, batch_vectors)
+
+            self.embedded = len(vectors)
+            self.seconds = time.monotonic() - start_time
+            if self.progress_callback is not None:
+                rate = self.chunks_per_second
+                self.progress_callback({
+                    "embedded": self.embedded,
+                    "chunks_per_second": round(rate, 2),
+                    "eta_seconds": round((len(texts) - self.embedded) / rate, 1) if rate else None,
+                })
+        return vectors
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.embedded / self.seconds if self.seconds else 0.0
+
+    def throughput(self) -> Dict[str, float]:
+        """Resumo da vazão para registrar no resultado da construção."""
+        return {
+            "chunks": self.embedded,
+            "seconds": round(self.seconds, 2),
+            "chunks_per_second": round(self.chunks_per_second, 2),
+            "batch_size": self.batch_size,
+            "threads": self.threads,
+        }
@@ -70,6 +70,7 @@ export function ChatBot({ prefillQuestion }: ChatBotProps) {
   const [selectedBase, setSelectedBase] = useState<string>('default');
   const [isLoadingBases, setIsLoadingBases] = useState(true);
   const messagesEndRef = useRef<HTMLDivElement>(null);
+  const sessionIdRef = useRef<string>(crypto.randomUUID());
   const [isSwitchingBase, setIsSwitchingBase] = useState(false);
 
   const scrollToBottom = () => {
@@ -143,44 +144,29 @@ export function ChatBot({ prefillQuestion }: ChatBotProps) {
   };
 
   const switchBase = async (baseName: string) => {
-    try {
-      const switchUrl = API_URL+'/bases/switch';
-      const response = await fetch(switchUrl, {
-        method: 'POST',
-        headers: {
-          'x-api-key': API_KEY,
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({ base_name: baseName })
-      });
+    // A base é enviada em cada consulta, sem alterar a base padrão do servidor
+    setSelectedBase(baseName);
 
-      if (!response.ok) {
-        throw new Error(`Erro ao mudar base: ${response.status}`);
-      }
+    // Adicionar mensagem informativa sobre a mudança de base
+    const baseMessage: Message = {
+      id: Date.now().toString(),
+      content: `Base alterada para: ${baseName}. Agora estou usando os documentos desta base para responder suas perguntas.`,
+      sender: 'bot',
+      timestamp: new Date(),
+    };
 
-      const data = await response.json();
-      setSelectedBase(baseName);
-      
-      // Adicionar mensagem informativa sobre a mudança de base
-      const baseMessage: Message = {
-        id: Date.now().toString(),
-        content: `Base alterada para: ${baseName}. Agora estou usando os documentos desta base para responder suas perguntas.`,
-        sender: 'bot',
-        timestamp: new Date(),
-      };
-      
-      setMessages(prev => [...prev, baseMessage]);
-      
-      return data;
-    } catch (error) {
-      console.error('Erro ao mudar base:', error);
-      throw error;
-    }
+    setMessages(prev => [...prev, baseMessage]);
   };
 
-  const callRAGAPI = async (question: string): Promise<APIResponse> => {
+  // Consome a resposta de /query/stream (server-sent events): 'context' traz as
+  // fontes, cada 'token' um trecho da resposta e 'done' o resultado completo.
+  const callRAGAPI = async (
+    question: string,
+    onContext: (contexto: Source[]) => void,
+    onToken: (content: string) => void
+  ): Promise<APIResponse> => {
     try {
-      const response = await fetch(API_URL+'/query', {
+      const response = await fetch(API_URL+'/query/stream', {
         method: 'POST',
         headers: {
           'x-api-key': API_KEY,
@@ -189,16 +175,55 @@ export function ChatBot({ prefillQuestion }: ChatBotProps) {
         body: JSON.stringify({
           text: question,
           user_id: "123",
-          session_id: "abc"
+          session_id: sessionIdRef.current,
+          base: selectedBase
         })
       });
 
-      if (!response.ok) {
+      if (!response.ok || !response.body) {
         throw new Error(`Erro na API: ${response.status}`);
       }
 
-      const data: APIResponse = await response.json();
-      return data;
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let contexto: Source[] = [];
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // Os eventos são separados por uma linha em branco
+        let boundary = buffer.indexOf('\n\n');
+        while (boundary !== -1) {
+          const rawEvent = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+          boundary = buffer.indexOf('\n\n');
+
+          let eventName = 'message';
+          let dataText = '';
+          for (const line of rawEvent.split('\n')) {
+            if (line.startsWith('event:')) eventName = line.slice(6).trim();
+            else if (line.startsWith('data:')) dataText += line.slice(5).trim();
+          }
+          if (!dataText) continue;
+          const data = JSON.parse(dataText);
+
+          if (eventName === 'context') {
+            contexto = data.contexto || [];
+            onContext(contexto);
+          } else if (eventName === 'token') {
+            onToken(data.content);
+          } else if (eventName === 'done') {
+            return { ...data, contexto };
+          } else if (eventName === 'error') {
+            throw new Error(data.resposta || 'Erro ao processar a consulta');
+          }
+        }
+      }
+
+      throw new Error('Resposta da API encerrada antes do evento final');
     } catch (error) {
       console.error('Erro ao chamar API:', error);
       throw error;
@@ -214,7 +239,10 @@ export function ChatBot({ prefillQuestion }: ChatBotProps) {
         headers: {
           'x-api-key': API_KEY,
           'Content-Type': 'application/json',
-        }
+        },
+        body: JSON.stringify({
+          session_id: sessionIdRef.current
+        })
       });
 
       if (!response.ok) {
@@ -279,31 +307,67 @@ export function ChatBot({ prefillQuestion }: ChatBotProps) {
     setInputValue('');
     setIsTyping(true);
 
+    const botId = (Date.now() + 1).toString();
+    let botStarted = false;
+    let streamedSources: Source[] = [];
+    const updateBotMessage = (update: (message: Message) => Message) => {
+      setMessages(prev => prev.map(message => message.id === botId ? update(message) : message));
+    };
+
     try {
-      const response = await callRAGAPI(inputValue);
+      const response = await callRAGAPI(
+        inputValue,
+        (contexto) => {
+          streamedSources = contexto;
+          setSources(contexto);
+        },
+        (content) => {
+          // A mensagem do bot aparece com o primeiro trecho e cresce a cada token
+          if (!botStarted) {
+            botStarted = true;
+            setIsTyping(false);
+            setMessages(prev => [...prev, {
+              id: botId,
+              content,
+              sender: 'bot',
+              timestamp: new Date(),
+              sources: streamedSources
+            }]);
+          } else {
+            updateBotMessage(message => ({ ...message, content: message.content + content }));
+          }
+        }
+      );
 
       console.log("response: ", response)
       setTransformedQuery(response.transformed_query);
-      
-      const botResponse: Message = {
-        id: (Date.now() + 1).toString(),
-        content: response.resposta,
-        sender: 'bot',
-        timestamp: new Date(),
-        sources: response.contexto
-      };
-
-      setMessages(prev => [...prev, botResponse]);
+
+      if (botStarted) {
+        updateBotMessage(message => ({ ...message, content: response.resposta, sources: response.contexto }));
+      } else {
+        setMessages(prev => [...prev, {
+          id: botId,
+          content: response.resposta,
+          sender: 'bot',
+          timestamp: new Date(),
+          sources: response.contexto
+        }]);
+      }
       setSources(response.contexto || []);
       
     } catch (error) {
-      const errorResponse: Message = {
-        id: (Date.now() + 1).toString(),
-        content: 'Desculpe, estou com problemas técnicos no momento. Por favor, tente novamente mais tarde.',
-        sender: 'bot',
-        timestamp: new Date(),
-      };
-      setMessages(prev => [...prev, errorResponse]);
+      const errorContent = 'Desculpe, estou com problemas técnicos no momento. Por favor, tente novamente mais tarde.';
+      if (botStarted) {
+        updateBotMessage(message => ({ ...message, content: errorContent }));
+      } else {
+        const errorResponse: Message = {
+          id: botId,
+          content: errorContent,
+          sender: 'bot',
+          timestamp: new Date(),
+        };
+        setMessages(prev => [...prev, errorResponse]);
+      }
     } finally {
       setIsTyping(false);
     }
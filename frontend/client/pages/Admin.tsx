@@ -45,14 +45,27 @@ interface Document {
   description?: string;
 }
 
-interface ProcessedDocument {
-  content: string;
-  metadata: {
-    source: string;
-  };
+interface ProcessedSource {
+  source: string;
+  documents: number;
   length: number;
 }
 
+interface ProcessedDocumentsPage {
+  items: {
+    content: string;
+    metadata: {
+      source: string;
+    };
+    length: number;
+  }[];
+  total: number;
+  filtered_total: number;
+  offset: number;
+  limit: number;
+  sources: ProcessedSource[];
+}
+
 interface EnvStatus {
   GROQ_API_KEY: string;
   TOP_K: string;
@@ -90,7 +103,8 @@ export default function Admin() {
   const [isAuthenticated, setIsAuthenticated] = useState(false);
   const [isLoading, setIsLoading] = useState(true);
   const [documents, setDocuments] = useState<Document[]>([]);
-  const [processedDocuments, setProcessedDocuments] = useState<ProcessedDocument[]>([]);
+  const [processedSources, setProcessedSources] = useState<ProcessedSource[]>([]);
+  const [processedTotal, setProcessedTotal] = useState(0);
   const [processingStatus, setProcessingStatus] = useState<ProcessingStatus | null>(null);
   const [envStatus, setEnvStatus] = useState<EnvStatus | null>(null);
   const [searchTerm, setSearchTerm] = useState('');
@@ -195,7 +209,8 @@ export default function Admin() {
     if (!selectedBase) return;
     
     try {
-      const response = await fetch(`${API_BASE_URL}/processed-documents/`, {
+      // Apenas o resumo por fonte é usado aqui (limit=0 não traz o conteúdo)
+      const response = await fetch(`${API_BASE_URL}/processed-documents/?limit=0`, {
         headers: {
           'x-api-key': API_KEY,
           'accept': 'application/json',
@@ -203,8 +218,12 @@ export default function Admin() {
       });
       
       if (response.ok) {
-        const data = await response.json();
-        setProcessedDocuments(data);
+        const data: ProcessedDocumentsPage = await response.json();
+        setProcessedSources(data.sources);
+        setProcessedTotal(data.total);
+      } else if (response.status === 404) {
+        setProcessedSources([]);
+        setProcessedTotal(0);
       }
     } catch (error) {
       console.error('Erro ao carregar documentos processados:', error);
@@ -212,18 +231,18 @@ export default function Admin() {
   };
 
   const isDocumentProcessed = (filename: string) => {
-    return processedDocuments.some(doc => 
-      doc.metadata.source.includes(filename)
+    return processedSources.some(entry => 
+      entry.source.includes(filename)
     );
   };
 
   const getProcessedDocInfo = (filename: string) => {
-    const docs = processedDocuments.filter(doc => 
-      doc.metadata.source.includes(filename)
+    const entries = processedSources.filter(entry => 
+      entry.source.includes(filename)
     );
     return {
-      chunks: docs.length,
-      totalLength: docs.reduce((total, doc) => total + doc.length, 0)
+      chunks: entries.reduce((total, entry) => total + entry.documents, 0),
+      totalLength: entries.reduce((total, entry) => total + entry.length, 0)
     };
   };
 
@@ -264,6 +283,9 @@ export default function Admin() {
           setIsProcessing(false);
           fetchProcessedDocuments();
           toast.success('Processamento concluído!');
+        } else {
+          setIsProcessing(false);
+          toast.error(`Processamento não concluído: ${data.job?.error || data.status}`);
         }
       }
     } catch (error) {
@@ -376,17 +398,46 @@ export default function Admin() {
       });
 
       if (response.ok) {
-        toast.success('Vector Store criado com sucesso!');
+        const data = await response.json();
+        toast.success('Criação do Vector Store iniciada!');
+        setTimeout(() => checkVectorStoreJob(data.job_id), 2000);
       } else {
         toast.error('Erro ao criar Vector Store');
+        setIsCreatingVectorStore(false);
       }
     } catch (error) {
       toast.error('Falha ao criar Vector Store');
-    } finally {
       setIsCreatingVectorStore(false);
     }
   };
 
+  const checkVectorStoreJob = async (jobId: string) => {
+    try {
+      const response = await fetch(`${API_BASE_URL}/jobs/${jobId}`, {
+        headers: {
+          'x-api-key': API_KEY,
+          'accept': 'application/json',
+        }
+      });
+
+      if (response.ok) {
+        const job = await response.json();
+        if (job.status === 'running' || job.status === 'cancelling') {
+          setTimeout(() => checkVectorStoreJob(jobId), 2000);
+          return;
+        }
+        if (job.status === 'completed') {
+          toast.success('Vector Store criado com sucesso!');
+        } else {
+          toast.error(`Erro ao criar Vector Store: ${job.error || job.status}`);
+        }
+      }
+    } catch (error) {
+      console.error('Erro ao verificar criação do Vector Store:', error);
+    }
+    setIsCreatingVectorStore(false);
+  };
+
   const createNewBase = async () => {
     setIsCreatingBase(true);
     try {
@@ -639,7 +690,7 @@ export default function Admin() {
               
               <Button 
                 onClick={createVectorStore} 
-                disabled={isCreatingVectorStore || processedDocuments.length === 0}
+                disabled={isCreatingVectorStore || processedTotal === 0}
                 className="flex items-center gap-2"
                 variant="outline"
               >
@@ -0,0 +1,127 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+from langchain_core.prompts import PromptTemplate
+
+from prompt_budget import format_turn, token_counter
+from session_store import SessionStore
+
+load_dotenv()
+
+HISTORY_SUMMARY_ENABLED = os.getenv("HISTORY_SUMMARY_ENABLED", "true").lower() == "true"
+# A sessão é resumida ao passar de N turnos ou T tokens de histórico
+HISTORY_SUMMARY_TURNS = int(os.getenv("HISTORY_SUMMARY_TURNS", 6))
+HISTORY_SUMMARY_TOKENS = int(os.getenv("HISTORY_SUMMARY_TOKENS", 1500))
+# Turnos mais recentes mantidos na íntegra após o resumo
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", 2))
+
+SUMMARY_PROMPT = PromptTemplate.from_template(
+"""Você mantém o resumo de uma conversa entre um estudante e o assistente acadêmico do DRCA da UFAPE.
+Atualize o resumo abaixo incorporando os novos turnos. Preserve os assuntos tratados, números de
+resoluções, artigos, prazos, cursos e demais dados concretos citados nas respostas, e o que o
+estudante quer saber. Seja conciso (no máximo 8 frases) e responda apenas com o resumo atualizado.
+
+Resumo atual:
+{summary}
+
+Novos turnos:
+{turns}
+
+Resumo atualizado:
+"""
+)
+
+
+def format_summary(summary: str) -> str:
+    """Resumo como bloco de texto para os prompts."""
+    return f"Resumo da conversa anterior: {summary}"
+
+
+class HistoryCompactor:
+    """
+    Resume os turnos antigos das sessões longas. Depois que uma resposta é
+    registrada, schedule verifica os limites da sessão e, se necessário, gera
+    o novo resumo em uma thread em segundo plano, fora do caminho da resposta
+    ao usuário. Apenas um resumo por sessão é gerado por vez.
+    """
+
+    def __init__(self, session_store: SessionStore, llm, max_turns: int = HISTORY_SUMMARY_TURNS,
+                 max_tokens: int = HISTORY_SUMMARY_TOKENS, keep_turns: int = HISTORY_KEEP_TURNS):
+        self.session_store = session_store
+        self.llm = llm
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.keep_turns = keep_turns
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-summary")
+        self._lock = threading.Lock()
+        self._pending = set()
+        self.compactions = 0
+        self.failures = 0
+        self.turns_folded = 0
+        self.tokens_folded = 0
+
+    def needs_compaction(self, turns: List[Dict[str, str]]) -> bool:
+        if len(turns) <= self.keep_turns:
+            return False
+        if len(turns) > self.max_turns:
+            return True
+        return sum(token_counter.count_many([format_turn(turn) for turn in turns])) > self.max_tokens
+
+    def schedule(self, session_id: Optional[str]) -> bool:
+        """Agenda o resumo da sessão se ela passou dos limites. Não bloqueia."""
+        if not HISTORY_SUMMARY_ENABLED:
+            return False
+        _, turns, generation = self.session_store.peek(session_id)
+        if not self.needs_compaction(turns):
+            return False
+        with self._lock:
+            if session_id in self._pending:
+                return False
+            self._pending.add(session_id)
+        self._executor.submit(self._compact, session_id, generation)
+        return True
+
+    def _compact(self, session_id: Optional[str], generation: int):
+        try:
+            summary, turns, current = self.session_store.peek(session_id)
+            if current != generation:
+                # Sessão resetada (ou recriada) depois do agendamento
+                return
+            folded = turns[:-self.keep_turns] if self.keep_turns else turns
+            if not folded:
+                return
+            formatted_turns = "\n".join(format_turn(turn) for turn in folded)
+            prompt = SUMMARY_PROMPT.format(summary=summary or "(vazio)", turns=formatted_turns)
+            new_summary = self.llm.invoke(prompt).content.strip()
+            if not new_summary:
+                return
+            if self.session_store.apply_summary(session_id, new_summary, folded, generation):
+                with self._lock:
+                    self.compactions += 1
+                    self.turns_folded += len(folded)
+                    self.tokens_folded += token_counter.count(formatted_turns)
+                print(f"🗜️ Histórico da sessão '{session_id}' resumido: {len(folded)} turnos incorporados ao resumo.")
+        except Exception as e:
+            with self._lock:
+                self.failures += 1
+            print(f"⚠️ Erro ao resumir o histórico da sessão '{session_id}': {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(session_id)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "enabled": HISTORY_SUMMARY_ENABLED,
+                "max_turns": self.max_turns,
+                "max_tokens": self.max_tokens,
+                "keep_turns": self.keep_turns,
+                "pending": len(self._pending),
+                "compactions": self.compactions,
+                "failures": self.failures,
+                "turns_folded": self.turns_folded,
+                "tokens_folded": self.tokens_folded,
+            }
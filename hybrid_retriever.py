@@ -0,0 +1,58 @@
+import os
+from typing import Any, Dict, List, Sequence
+
+from dotenv import load_dotenv
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+load_dotenv()
+
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+# Constante da reciprocal rank fusion (60 é o valor usual)
+RRF_K = int(os.getenv("RRF_K", 60))
+
+
+def reciprocal_rank_fusion(ranked_lists: Sequence[List[Document]], k: int = RRF_K) -> List[Document]:
+    """
+    Une listas ordenadas de documentos pela reciprocal rank fusion: cada
+    documento soma 1 / (k + posição) em cada lista em que aparece.
+    Documentos iguais (mesmo conteúdo) são contados uma única vez.
+    """
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Document] = {}
+    for ranked in ranked_lists:
+        for rank, doc in enumerate(ranked, start=1):
+            key = doc.page_content
+            docs.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Retriever híbrido: busca densa no FAISS e busca esparsa (BM25) no índice
+    invertido da base, combinadas por reciprocal rank fusion. A busca esparsa
+    encontra identificadores exatos (números de resolução, siglas como ACEX)
+    que a busca por similaridade costuma perder.
+    """
+
+    vectorstore: Any
+    sparse_index: Any
+    k: int = 4
+    dense_k: int = 8
+    sparse_k: int = 8
+    rrf_k: int = RRF_K
+
+    def _sparse_documents(self, query: str) -> List[Document]:
+        docs = []
+        for chunk_id, _ in self.sparse_index.search(query, self.sparse_k):
+            doc = self.vectorstore.docstore.search(chunk_id)
+            if isinstance(doc, Document):
+                docs.append(doc)
+        return docs
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        dense_docs = self.vectorstore.similarity_search(query, k=self.dense_k)
+        sparse_docs = self._sparse_documents(query)
+        return reciprocal_rank_fusion([dense_docs, sparse_docs], self.rrf_k)[:self.k]
@@ -0,0 +1,184 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+
+from answer_cache import get_index_version
+from ann_index import FULL_VECTORS_FILE
+from chunk_store import DOCSTORE_DB_FILE
+from vectorstore_io import INDEX_FILE
+
+load_dotenv()
+
+INDEX_POOL_MAX_BASES = int(os.getenv("INDEX_POOL_MAX_BASES", 4))
+INDEX_POOL_MEMORY_MB = int(os.getenv("INDEX_POOL_MEMORY_MB", 2048))
+
+# Arquivos do índice que não ocupam memória residente (memmap ou leitura sob demanda)
+MMAP_FILES = {FULL_VECTORS_FILE, DOCSTORE_DB_FILE}
+
+
+def estimate_index_size(faiss_index_path: str, mmapped: bool = False) -> int:
+    """
+    Estima a memória ocupada por um índice pelo tamanho dos arquivos em disco
+    (exceto os arquivos lidos via memmap, que ficam no page cache compartilhado).
+    O index.faiss só fica de fora quando mmapped indica que os dados do índice
+    estão de fato no arquivo mapeado (ver vectorstore_io.is_index_mapped); um
+    índice copiado para o heap conta no orçamento de memória do pool.
+    """
+    index_dir = Path(faiss_index_path)
+    if not index_dir.is_dir():
+        return 0
+    skip = MMAP_FILES | ({INDEX_FILE} if mmapped else set())
+    return sum(f.stat().st_size for f in index_dir.iterdir() if f.is_file() and f.name not in skip)
+
+
+class PoolEntry:
+    """Vector store residente de uma base."""
+
+    def __init__(self, base_name: str, faiss_index_path: str, vectorstore: Any, retriever: Any, index_version: Optional[str]):
+        self.base_name = base_name
+        self.faiss_index_path = faiss_index_path
+        self.vectorstore = vectorstore
+        self.retriever = retriever
+        self.index_version = index_version
+        self.mmapped = bool(getattr(vectorstore, "mmapped", False))
+        self.size_bytes = estimate_index_size(faiss_index_path, self.mmapped)
+        self.loaded_at = time.time()
+        # Consultas usando a entrada; uma entrada retirada do pool só é fechada quando chega a 0
+        self.users = 0
+        self.retired = False
+
+    def close(self):
+        """Fecha a conexão do docstore SQLite da entrada."""
+        close = getattr(self.vectorstore.docstore, "close", None)
+        if close is not None:
+            close()
+
+
+class VectorStorePool:
+    """
+    Mantém os vector stores de várias bases carregados em memória.
+
+    As bases são descartadas em ordem LRU quando o número de bases residentes
+    passa de `max_bases` ou a soma estimada dos índices passa de `memory_budget_mb`.
+    Um índice recriado em disco (versão diferente) é recarregado no próximo acesso.
+
+    Quem usa uma base por acquire deve devolvê-la com release: a entrada
+    descartada (LRU, invalidação ou nova versão) tem o docstore fechado assim
+    que a última consulta em andamento a devolve.
+    """
+
+    def __init__(self, loader: Callable[[str], Any], retriever_factory: Callable[[Any], Any],
+                 max_bases: int = INDEX_POOL_MAX_BASES, memory_budget_mb: int = INDEX_POOL_MEMORY_MB):
+        self.loader = loader
+        self.retriever_factory = retriever_factory
+        self.max_bases = max_bases
+        self.memory_budget_bytes = memory_budget_mb * 1024 * 1024
+        self._entries: "OrderedDict[str, PoolEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+
+    def _get_resident(self, base_name: str, index_version: Optional[str], acquire: bool) -> Optional[PoolEntry]:
+        with self._lock:
+            entry = self._entries.get(base_name)
+            if entry is None or entry.index_version != index_version:
+                return None
+            self._entries.move_to_end(base_name)
+            if acquire:
+                entry.users += 1
+            return entry
+
+    def get(self, base_name: str, faiss_index_path: str, acquire: bool = False) -> Optional[PoolEntry]:
+        """
+        Retorna o vector store residente da base, carregando-o do disco se
+        necessário. Com acquire=True a entrada fica em uso até release(entry).
+        """
+        index_version = get_index_version(faiss_index_path)
+        entry = self._get_resident(base_name, index_version, acquire)
+        if entry is not None:
+            return entry
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(base_name, threading.Lock())
+
+        # Apenas uma thread carrega cada base; as demais aguardam e reaproveitam
+        with load_lock:
+            entry = self._get_resident(base_name, index_version, acquire)
+            if entry is not None:
+                return entry
+
+            vectorstore = self.loader(faiss_index_path)
+            if vectorstore is None:
+                return None
+
+            entry = PoolEntry(base_name, faiss_index_path, vectorstore, self.retriever_factory(vectorstore), index_version)
+            with self._lock:
+                if acquire:
+                    entry.users += 1
+                replaced = self._entries.pop(base_name, None)
+                if replaced is not None:
+                    self._retire(replaced)
+                self._entries[base_name] = entry
+                self._evict(keep=base_name)
+            return entry
+
+    def acquire(self, base_name: str, faiss_index_path: str) -> Optional[PoolEntry]:
+        """Equivale a get(..., acquire=True)."""
+        return self.get(base_name, faiss_index_path, acquire=True)
+
+    def release(self, entry: Optional[PoolEntry]):
+        """Devolve uma entrada obtida com acquire."""
+        if entry is None:
+            return
+        with self._lock:
+            entry.users -= 1
+            close = entry.retired and entry.users == 0
+        if close:
+            entry.close()
+
+    def _retire(self, entry: PoolEntry):
+        """Marca uma entrada que saiu do pool; fecha já se ninguém a estiver usando (chamado sob a trava)."""
+        entry.retired = True
+        if entry.users == 0:
+            entry.close()
+
+    def _evict(self, keep: str):
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_bases
+            or sum(e.size_bytes for e in self._entries.values()) > self.memory_budget_bytes
+        ):
+            oldest = next(iter(self._entries))
+            if oldest == keep:
+                break
+            self._retire(self._entries.pop(oldest))
+            print(f"♻️ Base '{oldest}' removida do pool de índices (LRU)")
+
+    def invalidate(self, base_name: Optional[str] = None):
+        """Remove uma base do pool (ou todas), forçando o recarregamento no próximo acesso."""
+        with self._lock:
+            if base_name is None:
+                dropped = list(self._entries.values())
+                self._entries.clear()
+            else:
+                entry = self._entries.pop(base_name, None)
+                dropped = [entry] if entry is not None else []
+            for entry in dropped:
+                self._retire(entry)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "resident_bases": list(self._entries.keys()),
+                "mmapped_bases": [name for name, e in self._entries.items() if e.mmapped],
+                "docstores": {
+                    name: e.vectorstore.docstore.stats()
+                    for name, e in self._entries.items() if hasattr(e.vectorstore.docstore, "stats")
+                },
+                "max_bases": self.max_bases,
+                "memory_budget_mb": self.memory_budget_bytes // (1024 * 1024),
+                "resident_mb": round(sum(e.size_bytes for e in self._entries.values()) / (1024 * 1024), 2),
+            }
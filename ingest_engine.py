@@ -0,0 +1,156 @@
+import os
+import time
+import multiprocessing
+from collections import deque
+from multiprocessing.connection import wait
+from typing import Iterator, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+INGEST_FILE_TIMEOUT = int(os.getenv("INGEST_FILE_TIMEOUT", 600))
+
+
+class FileResult:
+    """Resultado do processamento de um arquivo."""
+
+    def __init__(self, file_path: str, docs: list, error: Optional[str] = None, duration: float = 0.0):
+        self.file_path = file_path
+        self.docs = docs
+        self.error = error
+        self.duration = duration
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _parse_file(file_path: str) -> FileResult:
+    # Importação tardia: o Docling só é carregado nos processos que fazem o parsing
+    from load_docs import load_file, preprocess_documents
+
+    start = time.monotonic()
+    try:
+        docs = preprocess_documents(load_file(file_path))
+        return FileResult(file_path, docs, duration=time.monotonic() - start)
+    except Exception as e:
+        return FileResult(file_path, [], error=str(e), duration=time.monotonic() - start)
+
+
+def _worker_main(conn):
+    """Laço do processo de trabalho: recebe caminhos de arquivo e devolve os documentos."""
+    while True:
+        try:
+            file_path = conn.recv()
+        except EOFError:
+            break
+        if file_path is None:
+            break
+        conn.send(_parse_file(file_path))
+
+
+class _Worker:
+    def __init__(self, ctx):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.task: Optional[str] = None
+        self.started_at = 0.0
+
+    def assign(self, file_path: str):
+        self.task = file_path
+        self.started_at = time.monotonic()
+        self.conn.send(file_path)
+
+    def stop(self, timeout: float = 5.0):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
+
+    def kill(self):
+        self.process.terminate()
+        self.process.join()
+        self.conn.close()
+
+
+class IngestionEngine:
+    """
+    Processa arquivos em paralelo em um pool de processos.
+
+    Cada arquivo tem um tempo limite; um processo que trava ou é encerrado
+    inesperadamente é substituído e apenas o arquivo dele é marcado como falha.
+    Os resultados são devolvidos à medida que ficam prontos.
+    Com workers=0 o processamento é feito no próprio processo, sem tempo limite.
+    """
+
+    def __init__(self, workers: int = INGEST_WORKERS, file_timeout: float = INGEST_FILE_TIMEOUT):
+        self.workers = workers
+        self.file_timeout = file_timeout
+
+    def run(self, file_paths: List[str]) -> Iterator[FileResult]:
+        if not file_paths:
+            return
+        if self.workers <= 0:
+            for file_path in file_paths:
+                yield _parse_file(file_path)
+            return
+
+        ctx = multiprocessing.get_context("spawn")
+        pending = deque(file_paths)
+        workers = [_Worker(ctx) for _ in range(min(self.workers, len(file_paths)))]
+
+        try:
+            while pending or any(w.task for w in workers):
+                for worker in workers:
+                    if worker.task is None and pending:
+                        worker.assign(pending.popleft())
+
+                busy = [w for w in workers if w.task]
+                now = time.monotonic()
+                next_deadline = min(w.started_at + self.file_timeout for w in busy)
+                ready = wait(
+                    [w.conn for w in busy] + [w.process.sentinel for w in busy],
+                    timeout=max(0.0, next_deadline - now)
+                )
+
+                for index, worker in enumerate(workers):
+                    if worker.task is None:
+                        continue
+
+                    if worker.conn in ready:
+                        try:
+                            result = worker.conn.recv()
+                            worker.task = None
+                            yield result
+                            continue
+                        except (EOFError, OSError):
+                            pass
+
+                    crashed = worker.process.sentinel in ready or not worker.process.is_alive()
+                    if not crashed and time.monotonic() - worker.started_at <= self.file_timeout:
+                        continue
+
+                    failed_task = worker.task
+                    duration = time.monotonic() - worker.started_at
+                    worker.kill()
+                    if crashed:
+                        error = f"Processo de trabalho encerrado inesperadamente (código {worker.process.exitcode})"
+                    else:
+                        error = f"Tempo limite de {self.file_timeout}s excedido"
+                    workers[index] = _Worker(ctx)
+                    yield FileResult(failed_task, [], error=error, duration=duration)
+        finally:
+            for worker in workers:
+                if worker.task:
+                    worker.kill()
+                else:
+                    worker.stop()
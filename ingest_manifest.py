@@ -0,0 +1,70 @@
+import os
+import json
+import hashlib
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Manifesto por base: para cada arquivo de documentos, hash, tamanho, mtime e
+# as fontes (metadata["source"]) dos documentos que ele gerou.
+
+
+def manifest_path_for(output_docs_file: str) -> Path:
+    """Caminho do manifesto associado ao arquivo de documentos processados."""
+    return Path(output_docs_file).with_suffix(".manifest.json")
+
+
+def load_manifest(output_docs_file: str) -> Dict[str, Dict]:
+    manifest_file = manifest_path_for(output_docs_file)
+    if not manifest_file.exists():
+        return {}
+    try:
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠️ Manifesto '{manifest_file}' inválido, será refeito: {e}")
+        return {}
+
+
+def save_manifest(output_docs_file: str, manifest: Dict[str, Dict]):
+    """Grava o manifesto de forma atômica."""
+    manifest_file = manifest_path_for(output_docs_file)
+    tmp_file = manifest_file.with_suffix(".json.tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_file, manifest_file)
+
+
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fingerprint(file_path: str, previous: Dict = None) -> Dict:
+    """
+    Calcula a impressão digital do arquivo. Se tamanho e mtime não mudaram em
+    relação à entrada anterior, reaproveita o hash sem reler o arquivo.
+    """
+    stat = os.stat(file_path)
+    if previous and previous.get("size") == stat.st_size and previous.get("mtime_ns") == stat.st_mtime_ns:
+        return {"sha256": previous["sha256"], "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    return {"sha256": file_sha256(file_path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def plan_ingestion(file_paths: List[str], manifest: Dict[str, Dict], full: bool = False) -> Tuple[List[str], Dict[str, Dict], List[str]]:
+    """
+    Compara os arquivos atuais com o manifesto.
+    Retorna (arquivos a processar, impressões digitais atuais, arquivos removidos).
+    """
+    fingerprints = {}
+    to_parse = []
+    for file_path in file_paths:
+        previous = manifest.get(file_path)
+        fingerprints[file_path] = fingerprint(file_path, previous)
+        if full or previous is None or previous.get("sha256") != fingerprints[file_path]["sha256"]:
+            to_parse.append(file_path)
+
+    deleted = [file_path for file_path in manifest if file_path not in fingerprints]
+    return to_parse, fingerprints, deleted
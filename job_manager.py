@@ -0,0 +1,266 @@
+import os
+import sys
+import time
+import uuid
+import signal
+import threading
+import multiprocessing
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+JOB_HISTORY_SIZE = int(os.getenv("JOB_HISTORY_SIZE", 20))
+
+JOB_PROCESS_DOCUMENTS = "process_documents"
+JOB_CREATE_VECTORSTORE = "create_vectorstore"
+JOB_REMOVE_DOCUMENT = "remove_document"
+
+# "cancelling": o processo já recebeu SIGTERM, mas ainda pode estar gravando os
+# arquivos da base; a base só é liberada quando ele de fato termina
+ACTIVE_STATUSES = ("running", "cancelling")
+
+
+class JobConflictError(Exception):
+    """Já existe outro trabalho em andamento para a base."""
+
+    def __init__(self, active: "Job"):
+        self.active = active
+        super().__init__(
+            f"A base '{active.base}' já tem um trabalho em andamento ({active.kind}, id {active.id}). "
+            "Aguarde o término ou cancele-o."
+        )
+
+
+def _run_job(kind: str, params: Dict[str, Any], queue):
+    """Executa o trabalho em um processo separado, enviando progresso e resultado pela fila."""
+    # SIGTERM (cancelamento) vira SystemExit para que os processos auxiliares sejam encerrados
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(1))
+
+    def report(progress: Dict[str, Any]):
+        queue.put({"type": "progress", "progress": progress})
+
+    try:
+        if kind == JOB_PROCESS_DOCUMENTS:
+            from load_docs import process_directory
+            result = process_directory(progress_callback=report, **params)
+        elif kind == JOB_CREATE_VECTORSTORE:
+            from create_vectorstore import create_vectorstore
+            result = create_vectorstore(progress_callback=report, **params)
+        elif kind == JOB_REMOVE_DOCUMENT:
+            from load_docs import remove_file_from_processed
+            from create_vectorstore import remove_sources_from_index
+            report({"stage": "removing"})
+            sources = remove_file_from_processed(params["output_docs_file"], params["file_path"])
+            removed_chunks = remove_sources_from_index(params["faiss_index_path"], sources)
+            result = {"status": "success", "sources": sources, "removed_chunks": removed_chunks}
+        else:
+            raise ValueError(f"Tipo de trabalho desconhecido: {kind}")
+        queue.put({"type": "result", "result": result})
+    except Exception as e:
+        queue.put({"type": "error", "error": str(e)})
+
+
+class Job:
+    """
+    Estado de um trabalho em segundo plano. Os campos são alterados pela thread
+    que acompanha o processo e lidos pela API, sempre sob a trava do JobManager.
+    """
+
+    def __init__(self, kind: str, base: str, params: Dict[str, Any], lock: Optional[threading.RLock] = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.base = base
+        self.params = params
+        self._lock = lock or threading.RLock()
+        self.status = "running"
+        self.created_at = datetime.now()
+        self.started_at: Optional[datetime] = self.created_at
+        self.finished_at: Optional[datetime] = None
+        self.progress: Dict[str, Any] = {}
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.process = None
+        self._stage_started = time.monotonic()
+
+    def update_progress(self, progress: Dict[str, Any]):
+        if progress.get("stage") and progress["stage"] != self.progress.get("stage"):
+            self._stage_started = time.monotonic()
+        self.progress.update(progress)
+        if "eta_seconds" in progress:
+            return
+        # ETA pela taxa média desde o início da etapa atual
+        total = self.progress.get("total")
+        done = self.progress.get("done")
+        elapsed = time.monotonic() - self._stage_started
+        if total and done:
+            self.progress["eta_seconds"] = round(elapsed / done * (total - done), 1)
+        else:
+            self.progress["eta_seconds"] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "kind": self.kind,
+                "base": self.base,
+                "status": self.status,
+                "created_at": self.created_at.isoformat(),
+                "started_at": self.started_at.isoformat() if self.started_at else None,
+                "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+                "progress": dict(self.progress),
+                "result": self.result,
+                "error": self.error,
+            }
+
+
+class JobManager:
+    """
+    Executa o processamento de documentos, a criação de vector stores e a
+    remoção de documentos em processos separados, mantendo progresso, cancelamento e um histórico
+    dos trabalhos recentes de cada base.
+
+    Cada base tem no máximo um trabalho em andamento, de qualquer tipo: os
+    trabalhos leem e gravam os mesmos arquivos (a criação do vector store
+    consome a saída do processamento de documentos).
+    """
+
+    def __init__(self, history_size: int = JOB_HISTORY_SIZE):
+        self.history_size = history_size
+        self._jobs: Dict[str, Job] = {}
+        self._history: Dict[str, deque] = {}
+        self._lock = threading.RLock()
+        self._ctx = multiprocessing.get_context("spawn")
+
+    def submit(self, kind: str, base: str, params: Dict[str, Any],
+               on_success: Optional[Callable[[Job], None]] = None) -> Job:
+        """
+        Inicia um trabalho. Se já houver um trabalho do mesmo tipo ativo para a
+        base, ele é retornado em vez de iniciar outro; se o trabalho ativo for de
+        outro tipo, levanta JobConflictError.
+        """
+        with self._lock:
+            active = self._find_active(base)
+            if active is not None:
+                if active.kind == kind:
+                    return active
+                raise JobConflictError(active)
+
+            job = Job(kind, base, params, self._lock)
+            self._jobs[job.id] = job
+            history = self._history.setdefault(base, deque())
+            history.appendleft(job.id)
+            while len(history) > self.history_size:
+                self._jobs.pop(history.pop(), None)
+
+            # O processo é iniciado sob a trava para que a base continue ocupada
+            # até o trabalho estar de fato em execução
+            queue = self._ctx.Queue()
+            job.process = self._ctx.Process(target=_run_job, args=(kind, params, queue), daemon=False)
+            try:
+                job.process.start()
+            except Exception as e:
+                job.status = "failed"
+                job.error = f"Não foi possível iniciar o processo: {e}"
+                job.finished_at = datetime.now()
+                raise
+
+        threading.Thread(target=self._monitor, args=(job, queue, on_success), daemon=True).start()
+        return job
+
+    def _find_active(self, base: str) -> Optional[Job]:
+        for job_id in self._history.get(base, ()):
+            job = self._jobs.get(job_id)
+            if job and job.status in ACTIVE_STATUSES:
+                return job
+        return None
+
+    def active(self, base: str) -> Optional[Job]:
+        """Retorna o trabalho em andamento da base (de qualquer tipo), se houver."""
+        with self._lock:
+            return self._find_active(base)
+
+    def _monitor(self, job: Job, queue, on_success):
+        """Acompanha as mensagens do processo do trabalho até o seu término."""
+        while True:
+            try:
+                message = queue.get(timeout=1.0)
+            except Exception:
+                if not job.process.is_alive():
+                    break
+                continue
+
+            with self._lock:
+                if message["type"] == "progress":
+                    job.update_progress(message["progress"])
+                    continue
+                if message["type"] == "result":
+                    result = message["result"]
+                    if job.status == "running":
+                        if result.get("status") == "error":
+                            job.status = "failed"
+                            job.error = result.get("message")
+                        else:
+                            job.status = "completed"
+                    job.result = result
+                elif message["type"] == "error" and job.status == "running":
+                    job.status = "failed"
+                    job.error = message["error"]
+                break
+
+        job.process.join()
+        with self._lock:
+            job.finished_at = datetime.now()
+            if job.status == "cancelling":
+                job.status = "cancelled"
+            elif job.status == "running":
+                job.status = "failed"
+                job.error = f"Processo encerrado sem resultado (código {job.process.exitcode})"
+            completed = job.status == "completed"
+
+        if completed and on_success is not None:
+            try:
+                on_success(job)
+            except Exception as e:
+                print(f"⚠️ Erro ao finalizar o trabalho {job.id}: {e}")
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Cancela um trabalho em execução encerrando o seu processo. O trabalho
+        fica "cancelling" (e a base ocupada) até o processo terminar; a thread
+        que o acompanha o marca então como "cancelled".
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != "running":
+                return job
+            job.status = "cancelling"
+            job.process.terminate()
+        return job
+
+    def list_jobs(self, base: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Lista os trabalhos recentes (de uma base ou de todas), dos mais novos aos mais antigos."""
+        with self._lock:
+            bases = [base] if base else list(self._history.keys())
+            jobs = [self._jobs[job_id] for name in bases for job_id in self._history.get(name, ()) if job_id in self._jobs]
+        jobs.sort(key=lambda job: job.created_at, reverse=True)
+        return [job.to_dict() for job in jobs]
+
+    def latest(self, kind: str, base: str) -> Optional[Job]:
+        """Retorna o trabalho mais recente de um tipo para a base."""
+        with self._lock:
+            for job_id in self._history.get(base, ()):
+                job = self._jobs.get(job_id)
+                if job and job.kind == kind:
+                    return job
+        return None
+
+
+# Instância global usada pela API
+job_manager = JobManager()
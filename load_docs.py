@@ -1,6 +1,7 @@
 import os
 import re
-import pickle
+import argparse
+from itertools import chain
 from pathlib import Path
 from langchain_docling import DoclingLoader
 from langchain_docling.loader import ExportType
@@ -11,6 +12,10 @@ from dotenv import load_dotenv
 from pypdf import PdfReader
 from fpdf import FPDF
 
+from ingest_manifest import load_manifest, save_manifest, plan_ingestion
+from doc_store import open_document_store
+from ingest_engine import IngestionEngine, INGEST_WORKERS, INGEST_FILE_TIMEOUT
+
 # --- Configurações ---
 load_dotenv()
 DOCUMENTS_DIR =  os.getenv("DOCUMENTS_DIR")
@@ -55,78 +60,175 @@ def rebuild_pdf_from_text(input_pdf_path: str, output_pdf_path: str) -> bool:
         print(f"   -> ERRO durante a reconstrução do PDF: {e}")
         return False
 
-def main():
+def load_file(file_path: str) -> list[Document]:
     """
-    Carrega, processa e salva os documentos de origem em um arquivo intermediário.
+    Carrega um arquivo com o Docling. Se falhar, reconstrói o PDF a partir do texto
+    e tenta novamente. Lança uma exceção se as duas tentativas falharem.
     """
-    print("🚀 Etapa 1: Iniciando o carregamento dos documentos de origem...")
+    file_name = os.path.basename(file_path)
 
+    # --- TENTATIVA 1: Carregar o arquivo original ---
     try:
-        file_paths = load_all_files_from_directory(DOCUMENTS_DIR)
-        if not file_paths:
-            raise ValueError(f"Nenhum arquivo encontrado no diretório {DOCUMENTS_DIR}")
-        
-        print(f"✅ Encontrados {len(file_paths)} arquivos para processar.")
+        loader = DoclingLoader(file_path=file_path, export_type=ExportType.MARKDOWN)
+        docs_from_file = loader.load()
+        print(f"   ✅ Sucesso! Ao carregar {file_name}...")
+        return docs_from_file
+
+    # --- PLANO B: Se a TENTATIVA 1 falhar, reconstruir e tentar de novo ---
     except Exception as e:
-        print(f"❌ Erro ao listar arquivos: {str(e)}")
-        return
+        print(f"   ❌ ERRO no processamento inicial de '{file_name}': {str(e)}")
 
-    all_docs = []
-    failed_files = []
+    base_name, ext = os.path.splitext(file_path)
+    rebuilt_file_path = f"{base_name}_REBUILT_FROM_TEXT{ext}"
 
-    for file_path in file_paths:
-        file_name = os.path.basename(file_path)
-        print(f"📄 Processando arquivo: {file_name}...")
+    # Chama a função de reconstrução
+    if not rebuild_pdf_from_text(file_path, rebuilt_file_path):
+        # Se a própria reconstrução falhar
+        raise RuntimeError(f"Falha ao reconstruir o arquivo '{file_name}'")
 
-        # --- TENTATIVA 1: Carregar o arquivo original ---
-        try:
-            loader = DoclingLoader(file_path=file_path, export_type=ExportType.MARKDOWN)
-            docs_from_file = loader.load()
-            all_docs.extend(docs_from_file)
-            print(f"   ✅ Sucesso! Ao carregar {file_name}...")
-        
-        # --- PLANO B: Se a TENTATIVA 1 falhar, reconstruir e tentar de novo ---
-        except Exception as e:
-            print(f"   ❌ ERRO no processamento inicial de '{file_name}': {str(e)}")
-            
-            base_name, ext = os.path.splitext(file_path)
-            rebuilt_file_path = f"{base_name}_REBUILT_FROM_TEXT{ext}"
-            
-            # Chama a função de reconstrução
-            if rebuild_pdf_from_text(file_path, rebuilt_file_path):
-                # --- TENTATIVA 2: Carregar o arquivo reconstruído ---
-                print(f"   🛠️  Tentando carregar o arquivo reconstruído...")
-                try:
-                    loader = DoclingLoader(file_path=rebuilt_file_path, export_type=ExportType.MARKDOWN)
-                    docs_from_file = loader.load()
-                    all_docs.extend(docs_from_file)
-                    print(f"   ✅ Sucesso na segunda tentativa! Carregados {len(docs_from_file)} documento(s).")
-                except Exception as e2:
-                    print(f"   ❌ ERRO FINAL: Falha ao processar até mesmo o arquivo reconstruído de '{file_name}': {str(e2)}")
-                    failed_files.append(file_name)
-            else:
-                # Se a própria reconstrução falhar
-                print(f"   ❌ ERRO FINAL: Falha ao reconstruir o arquivo '{file_name}'.")
-                failed_files.append(file_name)
-    
-    # Aplicar pré-processamento nos documentos que foram carregados com sucesso
-    print("\n✨ Aplicando pré-processamento nos textos...")
+    # --- TENTATIVA 2: Carregar o arquivo reconstruído ---
+    print(f"   🛠️  Tentando carregar o arquivo reconstruído...")
+    try:
+        loader = DoclingLoader(file_path=rebuilt_file_path, export_type=ExportType.MARKDOWN)
+        docs_from_file = loader.load()
+        print(f"   ✅ Sucesso na segunda tentativa! Carregados {len(docs_from_file)} documento(s).")
+        return docs_from_file
+    except Exception as e2:
+        raise RuntimeError(f"Falha ao processar até mesmo o arquivo reconstruído de '{file_name}': {str(e2)}")
+
+def preprocess_documents(docs: list[Document]) -> list[Document]:
+    """Aplica o pré-processamento e descarta documentos vazios."""
     processed_docs = []
-    for doc in all_docs:
+    for doc in docs:
         cleaned_content = preprocess_text(doc.page_content)
         if cleaned_content:
             processed_docs.append(Document(page_content=cleaned_content, metadata=doc.metadata))
-    
-    print(f"✨ {len(processed_docs)} documentos válidos após o pré-processamento.")
-    if failed_files:
-        print(f"⚠️ Arquivos que falharam no carregamento final: {', '.join(failed_files)}")
-
-    # Salvar a lista de documentos processados
-    print(f"\n💾 Salvando documentos processados em '{OUTPUT_DOCS_FILE}'...")
-    with open(OUTPUT_DOCS_FILE, "wb") as f:
-        pickle.dump(processed_docs, f)
-    
-    print(f"🎉 Etapa 1 concluída! Documentos salvos com sucesso.")
+    return processed_docs
+
+def process_directory(documents_dir: str, output_docs_file: str, full: bool = False,
+                      workers: int = None, file_timeout: float = None, progress_callback=None) -> dict:
+    """
+    Processa os documentos de uma base de forma incremental.
+
+    Apenas arquivos novos ou alterados (segundo o manifesto de hash, tamanho e
+    mtime) são carregados; os documentos de arquivos removidos ou alterados são
+    descartados e o resultado é mesclado aos documentos já processados, que são
+    lidos em streaming do DocumentStore da base.
+    Com full=True todos os arquivos são reprocessados. O parsing é feito em
+    paralelo pelo IngestionEngine (workers processos, file_timeout por arquivo).
+    Se informado, progress_callback recebe um dict a cada arquivo concluído.
+    """
+    def report(**progress):
+        if progress_callback is not None:
+            progress_callback(progress)
+
+    file_paths = load_all_files_from_directory(documents_dir)
+
+    manifest = load_manifest(output_docs_file)
+    store = open_document_store(output_docs_file)
+    existing = store.summary()
+    if existing and not manifest:
+        # Sem manifesto não há como saber a origem dos documentos: reprocessa tudo
+        full = True
+    if full:
+        manifest = {}
+        existing = []
+
+    to_parse, fingerprints, deleted = plan_ingestion(file_paths, manifest, full=full)
+    print(f"✅ {len(file_paths)} arquivos encontrados: {len(to_parse)} novos/alterados, {len(deleted)} removidos.")
+
+    # Fontes cujos documentos precisam ser descartados
+    stale_sources = set()
+    for file_path in to_parse + deleted:
+        stale_sources.update(manifest.get(file_path, {}).get("sources", []))
+    for file_path in deleted:
+        manifest.pop(file_path, None)
+
+    new_docs = []
+    failed_files = []
+    engine = IngestionEngine(
+        workers=INGEST_WORKERS if workers is None else workers,
+        file_timeout=INGEST_FILE_TIMEOUT if file_timeout is None else file_timeout
+    )
+    print(f"⚙️ Processando {len(to_parse)} arquivo(s) com {engine.workers} processo(s)...")
+    report(stage="parsing", total=len(to_parse), done=0, files_parsed=0, files_failed=0)
+
+    # Os resultados chegam na ordem em que os arquivos terminam
+    for done, result in enumerate(engine.run(to_parse), start=1):
+        file_name = os.path.basename(result.file_path)
+        if not result.ok:
+            print(f"   ❌ ERRO FINAL em '{file_name}': {result.error}")
+            failed_files.append(file_name)
+            # Sem entrada no manifesto o arquivo será tentado novamente na próxima execução
+            manifest.pop(result.file_path, None)
+            report(done=done, files_parsed=done - len(failed_files), files_failed=len(failed_files))
+            continue
+
+        print(f"   ✅ {file_name}: {len(result.docs)} documento(s) em {result.duration:.1f}s")
+        new_docs.extend(result.docs)
+        manifest[result.file_path] = {
+            **fingerprints[result.file_path],
+            "sources": sorted({str(doc.metadata.get("source", result.file_path)) for doc in result.docs}),
+        }
+        report(done=done, files_parsed=done - len(failed_files), files_failed=len(failed_files))
+
+    kept_positions = [position for position, entry in enumerate(existing) if entry["source"] not in stale_sources]
+
+    report(stage="saving")
+    processed_count = store.write(chain(store.iter_documents(positions=kept_positions), new_docs))
+    save_manifest(output_docs_file, manifest)
+
+    return {
+        "processed_documents": processed_count,
+        "new_documents": len(new_docs),
+        "parsed_files": len(to_parse) - len(failed_files),
+        "unchanged_files": len(file_paths) - len(to_parse),
+        "removed_files": len(deleted),
+        "failed_files": failed_files,
+        "full_rebuild": full,
+        "output_file": str(store.path)
+    }
+
+def remove_file_from_processed(output_docs_file: str, file_path: str) -> list[str]:
+    """
+    Remove dos documentos processados e do manifesto tudo o que veio de um arquivo.
+    Retorna as fontes (metadata["source"]) removidas.
+    """
+    manifest = load_manifest(output_docs_file)
+    entry = manifest.pop(file_path, None)
+    sources = set(entry["sources"]) if entry else {file_path}
+
+    store = open_document_store(output_docs_file)
+    existing = store.summary()
+    kept_positions = [position for position, entry in enumerate(existing) if entry["source"] not in sources]
+    if len(kept_positions) != len(existing):
+        store.write(store.iter_documents(positions=kept_positions))
+    if entry:
+        save_manifest(output_docs_file, manifest)
+    return sorted(sources)
+
+def main(full: bool = False, workers: int = None, file_timeout: float = None):
+    """
+    Carrega, processa e salva os documentos de origem em um arquivo intermediário.
+    """
+    print("🚀 Etapa 1: Iniciando o carregamento dos documentos de origem...")
+
+    try:
+        result = process_directory(DOCUMENTS_DIR, OUTPUT_DOCS_FILE, full=full, workers=workers, file_timeout=file_timeout)
+    except Exception as e:
+        print(f"❌ Erro ao processar documentos: {str(e)}")
+        return
+
+    print(f"✨ {result['processed_documents']} documentos válidos após o pré-processamento ({result['new_documents']} novos).")
+    if result["failed_files"]:
+        print(f"⚠️ Arquivos que falharam no carregamento final: {', '.join(result['failed_files'])}")
+
+    print(f"🎉 Etapa 1 concluída! Documentos salvos em '{result['output_file']}'.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Processa os documentos de origem de forma incremental.")
+    parser.add_argument("--full", action="store_true", help="Reprocessa todos os arquivos, ignorando o manifesto")
+    parser.add_argument("--workers", type=int, default=None, help=f"Número de processos de parsing (padrão: {INGEST_WORKERS}; 0 = sem processos auxiliares)")
+    parser.add_argument("--timeout", type=float, default=None, help=f"Tempo limite por arquivo em segundos (padrão: {INGEST_FILE_TIMEOUT})")
+    args = parser.parse_args()
+    main(full=args.full, workers=args.workers, file_timeout=args.timeout)
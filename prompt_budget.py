@@ -0,0 +1,113 @@
+import os
+import math
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+
+load_dotenv()
+
+# Tokenizer do Hugging Face usado na contagem. Sem ele (padrão, "heuristic"), ou se
+# o tokenizer não puder ser carregado, a contagem é estimada por caracteres. O
+# GEN_MODEL_ID não é usado: os modelos da Groq não são repositórios do Hugging Face.
+PROMPT_TOKENIZER_ID = os.getenv("PROMPT_TOKENIZER_ID") or "heuristic"
+# Orçamentos de tokens do prompt para o contexto e para o histórico
+PROMPT_CONTEXT_TOKENS = int(os.getenv("PROMPT_CONTEXT_TOKENS", 2000))
+PROMPT_HISTORY_TOKENS = int(os.getenv("PROMPT_HISTORY_TOKENS", 800))
+
+# Média de caracteres por token em texto em português na estimativa
+CHARS_PER_TOKEN = 3.5
+
+
+class TokenCounter:
+    """
+    Conta tokens com o tokenizer configurado em PROMPT_TOKENIZER_ID, carregado
+    sob demanda. Modelos servidos pela Groq (ex.: llama-3.1-8b-instant) não têm
+    um id do Hugging Face, então por padrão a contagem usa a estimativa por
+    caracteres; para contar com um tokenizer real, configure PROMPT_TOKENIZER_ID
+    com um repositório equivalente (ex.: meta-llama/Llama-3.1-8B-Instruct).
+    """
+
+    def __init__(self, tokenizer_id: Optional[str] = PROMPT_TOKENIZER_ID):
+        self.tokenizer_id = tokenizer_id
+        self._tokenizer = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _get_tokenizer(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    if self.tokenizer_id and self.tokenizer_id != "heuristic":
+                        try:
+                            from transformers import AutoTokenizer
+                            self._tokenizer = AutoTokenizer.from_pretrained(self.tokenizer_id)
+                            print(f"🔢 Tokenizer carregado para contagem do prompt: {self.tokenizer_id}")
+                        except Exception as e:
+                            print(f"⚠️ Tokenizer '{self.tokenizer_id}' indisponível, usando estimativa por caracteres: {e}")
+                    self._loaded = True
+        return self._tokenizer
+
+    @property
+    def name(self) -> str:
+        return self.tokenizer_id if self._get_tokenizer() is not None else "heuristic"
+
+    def count(self, text: str) -> int:
+        return self.count_many([text])[0]
+
+    def count_many(self, texts: Sequence[str]) -> List[int]:
+        """Conta os tokens de vários textos de uma vez (tokenização em lote)."""
+        tokenizer = self._get_tokenizer()
+        if tokenizer is None:
+            return [math.ceil(len(text) / CHARS_PER_TOKEN) for text in texts]
+        encoded = tokenizer(list(texts), add_special_tokens=False)["input_ids"]
+        return [len(ids) for ids in encoded]
+
+
+# Instância global usada na ingestão e nas consultas
+token_counter = TokenCounter()
+
+
+def doc_tokens(doc: Document) -> int:
+    """Tokens do chunk: usa o valor calculado na criação do índice, se houver."""
+    n_tokens = doc.metadata.get("n_tokens")
+    return n_tokens if isinstance(n_tokens, int) else token_counter.count(doc.page_content)
+
+
+def pack_context(docs: List[Document], budget: int = PROMPT_CONTEXT_TOKENS) -> Tuple[List[Document], int]:
+    """
+    Seleciona, na ordem de relevância, os chunks que cabem no orçamento. Chunks
+    que não cabem são pulados (um menor mais abaixo ainda pode caber); o
+    primeiro chunk é sempre mantido para que o contexto nunca fique vazio.
+    Retorna (chunks selecionados, tokens usados).
+    """
+    packed, used = [], 0
+    for doc in docs:
+        tokens = doc_tokens(doc)
+        if packed and used + tokens > budget:
+            continue
+        packed.append(doc)
+        used += tokens
+    return packed, used
+
+
+def format_turn(turn: Dict[str, str]) -> str:
+    return f"User: {turn['question']}\nAI: {turn['answer']}"
+
+
+def pack_history(turns: List[Dict[str, str]], budget: int = PROMPT_HISTORY_TOKENS) -> Tuple[List[Dict[str, str]], int]:
+    """
+    Mantém os turnos mais recentes que cabem no orçamento, em ordem cronológica.
+    Retorna (turnos mantidos, tokens usados).
+    """
+    if not turns:
+        return [], 0
+    counts = token_counter.count_many([format_turn(turn) for turn in turns])
+    kept, used = [], 0
+    for turn, tokens in zip(reversed(turns), reversed(counts)):
+        if used + tokens > budget:
+            break
+        kept.append(turn)
+        used += tokens
+    return list(reversed(kept)), used
@@ -5,6 +5,9 @@ from typing import List, Dict
 from langchain_core.prompts import PromptTemplate
 from langchain_groq import ChatGroq
 
+from history_compactor import format_summary
+from transform_gate import transform_gate
+
 # --- Configurações Iniciais ---
 # Carrega as variáveis de ambiente do arquivo .env
 load_dotenv()
@@ -48,25 +51,55 @@ except Exception as e:
     print(f"Erro ao inicializar o cliente Groq: {e}")
     exit()
 
-def format_history_for_prompt(history: List[Dict[str, str]]) -> str:
-    """Formata o histórico para ser inserido de forma legível no prompt."""
-    if not history:
+def format_history_for_prompt(history: List[Dict[str, str]], summary: str = "") -> str:
+    """
+    Formata o histórico para ser inserido de forma legível no prompt. O resumo
+    dos turnos antigos, se houver, vem antes dos turnos recentes.
+    """
+    if not history and not summary:
         return "Nenhum histórico ainda."
-    return "\n".join([f"Usuário: {turn['question']}\nAssistente: {turn['answer']}" for turn in history])
+    lines = [format_summary(summary)] if summary else []
+    lines.extend(f"Usuário: {turn['question']}\nAssistente: {turn['answer']}" for turn in history)
+    return "\n".join(lines)
+
+def build_transform_prompt(question: str, history: List[Dict[str, str]], summary: str = "") -> str:
+    """Monta o prompt de transformação a partir da pergunta, do histórico e do resumo."""
+    return QUERY_TRANSFORM_PROMPT.format(
+        conversation=format_history_for_prompt(history, summary),
+        question=question
+    )
 
-def transform_query(question: str, history: List[Dict[str, str]]) -> str:
+def transform_query(question: str, history: List[Dict[str, str]], summary: str = "") -> str:
     """
     Usa o LLM para transformar a query do usuário em uma query otimizada para busca.
+    A chamada é evitada quando não pode ajudar (sem histórico, sem referências ao
+    histórico ou transformação já em cache; ver transform_gate).
     Esta é a função principal a ser testada.
     """
-    prompt_formatado = QUERY_TRANSFORM_PROMPT.format(
-        conversation=format_history_for_prompt(history),
-        question=question
-    )
+    skipped = transform_gate.lookup(question, history, summary)
+    if skipped is not None:
+        return skipped
+    prompt_formatado = build_transform_prompt(question, history, summary)
     
     try:
         response = client.invoke(prompt_formatado)
         transformed_query = response.content.strip()
+        transform_gate.store(question, history, summary, transformed_query)
+        return transformed_query
+    except Exception as e:
+        return f"Ocorreu um erro durante a chamada à API: {e}"
+
+async def atransform_query(question: str, history: List[Dict[str, str]], summary: str = "") -> str:
+    """Versão assíncrona de transform_query, usando ainvoke."""
+    skipped = transform_gate.lookup(question, history, summary)
+    if skipped is not None:
+        return skipped
+    prompt_formatado = build_transform_prompt(question, history, summary)
+
+    try:
+        response = await client.ainvoke(prompt_formatado)
+        transformed_query = response.content.strip()
+        transform_gate.store(question, history, summary, transformed_query)
         return transformed_query
     except Exception as e:
         return f"Ocorreu um erro durante a chamada à API: {e}"
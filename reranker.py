@@ -0,0 +1,146 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+
+from embedding_cache import normalize_query
+from prompt_budget import doc_tokens
+
+load_dotenv()
+
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+# Cross-encoder multilíngue pequeno (roda em CPU)
+RERANK_MODEL_ID = os.getenv("RERANK_MODEL_ID", "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1")
+# Candidatos buscados antes da reordenação e chunks enviados ao LLM depois dela
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", 12))
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", 3))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", 16))
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", 4096))
+
+
+def _content_key(doc: Document) -> str:
+    return hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+
+
+class CrossEncoderReranker:
+    """
+    Reordena os chunks recuperados com um cross-encoder local e mantém apenas os
+    melhores. Os pares (pergunta, chunk) são pontuados em lotes e as pontuações
+    ficam em um cache LRU, de modo que perguntas repetidas (ou a pergunta
+    original e a transformada, que costumam trazer os mesmos chunks) não
+    pontuam o mesmo par duas vezes.
+    """
+
+    def __init__(self, model_id: str = RERANK_MODEL_ID, batch_size: int = RERANK_BATCH_SIZE,
+                 cache_size: int = RERANK_CACHE_SIZE):
+        self.model_id = model_id
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._scores: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self.requests = 0
+        self.pairs_scored = 0
+        self.hits = 0
+        self.misses = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+
+    def _get_model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    print(f"🧠 Carregando modelo de reranking: {self.model_id}")
+                    self._model = CrossEncoder(self.model_id)
+        return self._model
+
+    def score(self, query: str, docs: List[Document]) -> List[float]:
+        """Pontua cada documento em relação à pergunta, usando o cache quando possível."""
+        query_key = normalize_query(query)
+        keys = [(query_key, _content_key(doc)) for doc in docs]
+        scores: List[Optional[float]] = []
+        with self._lock:
+            for key in keys:
+                score = self._scores.get(key)
+                if score is not None:
+                    self._scores.move_to_end(key)
+                scores.append(score)
+
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            pairs = [(query, docs[i].page_content) for i in missing]
+            computed = self._get_model().predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+            with self._lock:
+                for i, score in zip(missing, computed):
+                    scores[i] = float(score)
+                    self._scores[keys[i]] = float(score)
+                while len(self._scores) > self.cache_size:
+                    self._scores.popitem(last=False)
+
+        with self._lock:
+            self.hits += len(docs) - len(missing)
+            self.misses += len(missing)
+            self.pairs_scored += len(missing)
+        return scores
+
+    def rerank(self, query: str, docs: List[Document], top_n: int = RERANK_TOP_N) -> Tuple[List[Document], Dict]:
+        """
+        Retorna (os top_n documentos mais relevantes, relatório da etapa). O
+        relatório traz os tokens de contexto antes e depois do corte.
+        """
+        start = time.perf_counter()
+        scores = self.score(query, docs) if docs else []
+        ranked = sorted(zip(docs, scores), key=lambda pair: pair[1], reverse=True)
+        kept = [doc for doc, _ in ranked[:top_n]]
+
+        tokens_before = sum(doc_tokens(doc) for doc in docs)
+        tokens_after = sum(doc_tokens(doc) for doc in kept)
+        with self._lock:
+            self.requests += 1
+            self.tokens_before += tokens_before
+            self.tokens_after += tokens_after
+
+        report = {
+            "candidates": len(docs),
+            "kept": len(kept),
+            "context_tokens_before": tokens_before,
+            "context_tokens_after": tokens_after,
+            "tokens_saved": tokens_before - tokens_after,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+        return kept, report
+
+    def clear(self):
+        with self._lock:
+            self._scores.clear()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": RERANK_ENABLED,
+                "model": self.model_id,
+                "loaded": self._model is not None,
+                "requests": self.requests,
+                "pairs_scored": self.pairs_scored,
+                "cached_scores": len(self._scores),
+                "cache_size": self.cache_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "context_tokens_before": self.tokens_before,
+                "context_tokens_after": self.tokens_after,
+                "tokens_saved": self.tokens_before - self.tokens_after,
+                "avg_tokens_saved": round((self.tokens_before - self.tokens_after) / self.requests, 1) if self.requests else 0.0,
+            }
+
+
+# Instância global usada pelo RAG
+reranker = CrossEncoderReranker()
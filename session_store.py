@@ -0,0 +1,195 @@
+import os
+import time
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Limites do armazenamento de sessões (podem ser sobrescritos pelo .env)
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", 3600))
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", 10))
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", 1000))
+SESSION_MAX_CHARS = int(os.getenv("SESSION_MAX_CHARS", 5_000_000))
+
+DEFAULT_SESSION_ID = "default"
+
+
+class _Session:
+    """Histórico de uma sessão com o instante do último acesso."""
+
+    def __init__(self, generation: int):
+        # Identifica esta instância da sessão: muda quando ela é resetada e recriada
+        self.generation = generation
+        self.turns: List[Dict[str, str]] = []
+        # Resumo dos turnos mais antigos, já retirados de `turns`
+        self.summary = ""
+        self.last_access = time.monotonic()
+        self.chars = 0
+
+
+class SessionStore:
+    """
+    Armazena o histórico de conversa por session_id.
+
+    As sessões são mantidas em ordem LRU e expiram após `ttl_seconds` sem uso.
+    Cada sessão guarda no máximo `max_turns` turnos e o total de caracteres de
+    todas as sessões é limitado por `max_chars`; ao ultrapassar os limites as
+    sessões menos usadas recentemente são descartadas primeiro. Turnos antigos
+    podem ser substituídos por um resumo da conversa (ver apply_summary).
+
+    Requisições sem session_id não têm sessão: o histórico é vazio e o turno
+    não é guardado, em vez de todas compartilharem o mesmo histórico.
+    """
+
+    def __init__(self, ttl_seconds: int = SESSION_TTL_SECONDS, max_turns: int = SESSION_MAX_TURNS,
+                 max_sessions: int = SESSION_MAX_SESSIONS, max_chars: int = SESSION_MAX_CHARS):
+        self.ttl_seconds = ttl_seconds
+        self.max_turns = max_turns
+        self.max_sessions = max_sessions
+        self.max_chars = max_chars
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._total_chars = 0
+        self._generations = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(session_id: Optional[str]) -> str:
+        return session_id or DEFAULT_SESSION_ID
+
+    @staticmethod
+    def _turn_chars(turn: Dict[str, str]) -> int:
+        return len(turn["question"]) + len(turn["answer"])
+
+    def _drop(self, key: str):
+        session = self._sessions.pop(key, None)
+        if session is not None:
+            self._total_chars -= session.chars
+
+    def _evict_expired(self, now: float):
+        # As sessões estão em ordem LRU: as mais antigas ficam no início
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if now - session.last_access <= self.ttl_seconds:
+                break
+            self._drop(key)
+
+    def _enforce_limits(self, keep: str):
+        while len(self._sessions) > self.max_sessions or (
+            self._total_chars > self.max_chars and len(self._sessions) > 1
+        ):
+            oldest = next(iter(self._sessions))
+            if oldest == keep:
+                break
+            self._drop(oldest)
+
+    def get_history(self, session_id: Optional[str] = None) -> List[Dict[str, str]]:
+        """Retorna uma cópia do histórico da sessão (vazio se inexistente ou expirada)."""
+        if not session_id:
+            return []
+        key = self._key(session_id)
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            session = self._sessions.get(key)
+            if session is None:
+                return []
+            session.last_access = now
+            self._sessions.move_to_end(key)
+            return list(session.turns)
+
+    def get_summary(self, session_id: Optional[str] = None) -> str:
+        """Retorna o resumo dos turnos antigos da sessão (vazio se não houver)."""
+        if not session_id:
+            return ""
+        with self._lock:
+            session = self._sessions.get(self._key(session_id))
+            return session.summary if session is not None else ""
+
+    def peek(self, session_id: Optional[str] = None) -> Tuple[str, List[Dict[str, str]], int]:
+        """
+        Retorna (resumo, turnos, geração) sem contar como acesso à sessão. A
+        geração é 0 se a sessão não existir.
+        """
+        if not session_id:
+            return "", [], 0
+        with self._lock:
+            session = self._sessions.get(self._key(session_id))
+            if session is None:
+                return "", [], 0
+            return session.summary, list(session.turns), session.generation
+
+    def apply_summary(self, session_id: Optional[str], summary: str, folded: List[Dict[str, str]],
+                      generation: int) -> bool:
+        """
+        Substitui o resumo da sessão e retira os turnos `folded`, que ele passa a
+        cobrir. Turnos adicionados enquanto o resumo era gerado são mantidos.
+        Retorna False se a sessão não existir mais ou se não for a mesma da
+        geração lida em peek (expirada, resetada ou recriada nesse intervalo).
+        """
+        with self._lock:
+            session = self._sessions.get(self._key(session_id))
+            if session is None or session.generation != generation:
+                return False
+            # `folded` mantém referências aos turnos, então seus ids não são reutilizados
+            folded_ids = {id(turn) for turn in folded}
+            removed_chars = sum(self._turn_chars(turn) for turn in session.turns if id(turn) in folded_ids)
+            session.turns = [turn for turn in session.turns if id(turn) not in folded_ids]
+            delta = len(summary) - len(session.summary) - removed_chars
+            session.summary = summary
+            session.chars += delta
+            self._total_chars += delta
+            return True
+
+    def append(self, session_id: Optional[str], question: str, answer: str):
+        """Adiciona um turno à sessão, respeitando os limites de turnos e memória."""
+        if not session_id:
+            return
+        key = self._key(session_id)
+        turn = {"question": question, "answer": answer}
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._sessions[key] = _Session(next(self._generations))
+            self._sessions.move_to_end(key)
+            session.last_access = now
+
+            session.turns.append(turn)
+            session.chars += self._turn_chars(turn)
+            self._total_chars += self._turn_chars(turn)
+            while len(session.turns) > self.max_turns:
+                removed = session.turns.pop(0)
+                session.chars -= self._turn_chars(removed)
+                self._total_chars -= self._turn_chars(removed)
+
+            self._enforce_limits(keep=key)
+
+    def reset(self, session_id: Optional[str] = None):
+        """Remove o histórico de uma sessão."""
+        with self._lock:
+            self._drop(self._key(session_id))
+
+    def clear(self):
+        """Remove o histórico de todas as sessões."""
+        with self._lock:
+            self._sessions.clear()
+            self._total_chars = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Retorna números agregados sobre as sessões ativas."""
+        with self._lock:
+            self._evict_expired(time.monotonic())
+            return {
+                "active_sessions": len(self._sessions),
+                "summarized_sessions": sum(1 for session in self._sessions.values() if session.summary),
+                "total_chars": self._total_chars,
+                "max_sessions": self.max_sessions,
+                "max_turns": self.max_turns,
+                "max_chars": self.max_chars,
+                "ttl_seconds": self.ttl_seconds,
+            }
@@ -0,0 +1,191 @@
+import os
+import re
+import json
+import math
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BM25_K1 = float(os.getenv("BM25_K1", 1.5))
+BM25_B = float(os.getenv("BM25_B", 0.75))
+
+SPARSE_INDEX_FILE = "bm25.json"
+
+# Usadas quando os dados do nltk (stopwords) não estão instalados
+FALLBACK_STOPWORDS = {
+    "a", "ao", "aos", "aquela", "aquele", "as", "até", "com", "como", "da", "das", "de", "dela",
+    "dele", "deles", "depois", "do", "dos", "e", "ela", "elas", "ele", "eles", "em", "entre", "era",
+    "essa", "esse", "esta", "está", "este", "eu", "foi", "for", "há", "isso", "isto", "já", "lhe",
+    "mais", "mas", "me", "mesmo", "meu", "minha", "muito", "na", "nas", "nem", "no", "nos", "não",
+    "o", "os", "ou", "para", "pela", "pelas", "pelo", "pelos", "por", "qual", "quando", "que",
+    "quem", "se", "sem", "ser", "seu", "sua", "são", "só", "também", "te", "tem", "um", "uma",
+    "você", "à", "às", "é",
+}
+
+# Palavras, números e identificadores como "12/2020", "art.5" ou "CES-01"
+TOKEN_PATTERN = re.compile(r"\w+(?:[./-]\w+)*")
+
+
+def strip_accents(text: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+
+
+class PortugueseAnalyzer:
+    """
+    Tokenização para o BM25: minúsculas, remoção de stopwords e stemming RSLP do
+    nltk. Tokens com dígitos (números de resolução, artigos) não passam pelo
+    stemmer. Siglas em maiúsculas ("ACEX", "DRCA") geram também o termo sem
+    stemming, que casa exatamente com a sigla na pergunta; o radical continua
+    no índice para perguntas escritas em minúsculas. Sem os dados do nltk, usa
+    uma lista própria de stopwords e não aplica stemming (analisador "simple").
+    """
+
+    def __init__(self, name: Optional[str] = None):
+        self.stemmer = None
+        self.stopwords = FALLBACK_STOPWORDS
+        if name in (None, "rslp"):
+            try:
+                from nltk.corpus import stopwords
+                from nltk.stem import RSLPStemmer
+                self.stemmer = RSLPStemmer()
+                self.stopwords = set(stopwords.words("portuguese"))
+            except (ImportError, LookupError):
+                print("⚠️ Dados do nltk não encontrados (rode: python -m nltk.downloader rslp stopwords); "
+                      "BM25 sem stemming.")
+        self.name = "rslp" if self.stemmer is not None else "simple"
+        self._stems: Dict[str, str] = {}
+
+    def _stem(self, token: str) -> str:
+        if self.stemmer is None or len(token) <= 3 or any(c.isdigit() for c in token):
+            return token
+        stem = self._stems.get(token)
+        if stem is None:
+            stem = self._stems[token] = self.stemmer.stem(token)
+        return stem
+
+    def tokenize(self, text: str) -> List[str]:
+        tokens = []
+        for word in TOKEN_PATTERN.findall(text):
+            token = word.lower()
+            if token in self.stopwords:
+                continue
+            stem = strip_accents(self._stem(token))
+            tokens.append(stem)
+            if len(word) > 1 and word.isupper():
+                exact = strip_accents(token)
+                if exact != stem:
+                    tokens.append(exact)
+        return tokens
+
+
+class BM25Index:
+    """
+    Índice invertido BM25 dos chunks de uma base, persistido em JSON junto ao
+    índice FAISS. Cada termo guarda a lista de documentos e frequências.
+    """
+
+    def __init__(self, analyzer: PortugueseAnalyzer, ids: List[str], doc_lengths: List[int],
+                 postings: Dict[str, Tuple[List[int], List[int]]], k1: float = BM25_K1, b: float = BM25_B):
+        self.analyzer = analyzer
+        self.ids = ids
+        self.doc_lengths = np.asarray(doc_lengths, dtype=np.float32)
+        self.avg_length = float(self.doc_lengths.mean()) if len(ids) else 0.0
+        self.postings = postings
+        self.k1 = k1
+        self.b = b
+
+    @classmethod
+    def build(cls, chunks: Iterable[Tuple[str, str]], analyzer: Optional[PortugueseAnalyzer] = None) -> "BM25Index":
+        """Cria o índice a partir de pares (id do chunk, texto)."""
+        analyzer = analyzer or PortugueseAnalyzer()
+        ids, doc_lengths = [], []
+        postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        for position, (chunk_id, text) in enumerate(chunks):
+            terms = Counter(analyzer.tokenize(text))
+            ids.append(chunk_id)
+            doc_lengths.append(sum(terms.values()))
+            for term, freq in terms.items():
+                docs, freqs = postings.setdefault(term, ([], []))
+                docs.append(position)
+                freqs.append(freq)
+        return cls(analyzer, ids, doc_lengths, postings)
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """Retorna os k chunks com maior pontuação BM25 como (id, pontuação)."""
+        if not self.ids:
+            return []
+        count = len(self.ids)
+        scores = np.zeros(count, dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * self.doc_lengths / max(self.avg_length, 1e-6))
+        for term in set(self.analyzer.tokenize(query)):
+            entry = self.postings.get(term)
+            if entry is None:
+                continue
+            docs = np.asarray(entry[0], dtype=np.int64)
+            freqs = np.asarray(entry[1], dtype=np.float32)
+            idf = math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores[docs] += idf * freqs * (self.k1 + 1) / (freqs + norm[docs])
+
+        candidates = np.flatnonzero(scores)
+        if candidates.size == 0:
+            return []
+        top = candidates[np.argsort(-scores[candidates])[:k]]
+        return [(self.ids[i], float(scores[i])) for i in top]
+
+    def remove(self, ids: Iterable[str]) -> int:
+        """Remove chunks do índice, renumerando as posições. Retorna quantos foram removidos."""
+        removed = set(ids)
+        keep = [i for i, chunk_id in enumerate(self.ids) if chunk_id not in removed]
+        if len(keep) == len(self.ids):
+            return 0
+        new_position = {old: new for new, old in enumerate(keep)}
+        postings = {}
+        for term, (docs, freqs) in self.postings.items():
+            kept = [(new_position[d], f) for d, f in zip(docs, freqs) if d in new_position]
+            if kept:
+                postings[term] = ([d for d, _ in kept], [f for _, f in kept])
+        removed_count = len(self.ids) - len(keep)
+        self.__init__(self.analyzer, [self.ids[i] for i in keep], [int(self.doc_lengths[i]) for i in keep],
+                      postings, self.k1, self.b)
+        return removed_count
+
+    def save(self, faiss_index_path: str):
+        """Grava o índice de forma atômica no diretório do índice FAISS."""
+        target = Path(faiss_index_path) / SPARSE_INDEX_FILE
+        tmp_file = target.with_suffix(".json.tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump({
+                "analyzer": self.analyzer.name,
+                "k1": self.k1,
+                "b": self.b,
+                "ids": self.ids,
+                "doc_lengths": [int(length) for length in self.doc_lengths],
+                "postings": self.postings,
+            }, f, ensure_ascii=False)
+        os.replace(tmp_file, target)
+
+    @classmethod
+    def load(cls, faiss_index_path: str) -> Optional["BM25Index"]:
+        """Carrega o índice salvo (None se a base ainda não tiver um)."""
+        target = Path(faiss_index_path) / SPARSE_INDEX_FILE
+        if not target.exists():
+            return None
+        with open(target, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        analyzer = PortugueseAnalyzer(data.get("analyzer"))
+        postings = {term: (entry[0], entry[1]) for term, entry in data["postings"].items()}
+        return cls(analyzer, data["ids"], data["doc_lengths"], postings, data.get("k1", BM25_K1), data.get("b", BM25_B))
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "analyzer": self.analyzer.name,
+            "chunks": len(self.ids),
+            "terms": len(self.postings),
+            "avg_length": round(self.avg_length, 1),
+        }
@@ -0,0 +1,135 @@
+import queue
+import threading
+import time
+
+import pytest
+
+from job_manager import (
+    ACTIVE_STATUSES,
+    JOB_CREATE_VECTORSTORE,
+    JOB_PROCESS_DOCUMENTS,
+    JobConflictError,
+    JobManager,
+)
+
+
+class FakeProcess:
+    """Processo controlado pelo teste: só termina quando exit() é chamado."""
+
+    def __init__(self, target=None, args=(), daemon=None):
+        self.terminated = False
+        self.exitcode = None
+        self._done = threading.Event()
+
+    def start(self):
+        pass
+
+    def terminate(self):
+        # O SIGTERM só é tratado depois que a chamada em C em andamento retorna
+        self.terminated = True
+
+    def exit(self, code=0):
+        self.exitcode = code
+        self._done.set()
+
+    def is_alive(self):
+        return not self._done.is_set()
+
+    def join(self, timeout=None):
+        self._done.wait(timeout)
+
+
+class FakeContext:
+    def __init__(self):
+        self.processes = []
+        self.queues = []
+
+    def Process(self, **kwargs):
+        process = FakeProcess(**kwargs)
+        self.processes.append(process)
+        return process
+
+    def Queue(self):
+        q = queue.Queue()
+        self.queues.append(q)
+        return q
+
+
+@pytest.fixture
+def manager():
+    manager = JobManager()
+    manager._ctx = FakeContext()
+    return manager
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_completed_job_runs_on_success(manager):
+    finished = []
+    job = manager.submit(JOB_PROCESS_DOCUMENTS, "base", {}, on_success=finished.append)
+    manager._ctx.queues[0].put({"type": "progress", "progress": {"stage": "loading", "done": 1, "total": 2}})
+    manager._ctx.queues[0].put({"type": "result", "result": {"status": "success"}})
+    manager._ctx.processes[0].exit(0)
+    assert wait_for(lambda: finished)
+    assert job.status == "completed"
+    assert job.to_dict()["progress"]["stage"] == "loading"
+    assert manager.active("base") is None
+
+
+def test_one_active_job_per_base(manager):
+    job = manager.submit(JOB_PROCESS_DOCUMENTS, "base", {})
+    assert manager.submit(JOB_PROCESS_DOCUMENTS, "base", {}) is job
+    with pytest.raises(JobConflictError):
+        manager.submit(JOB_CREATE_VECTORSTORE, "base", {})
+    other = manager.submit(JOB_CREATE_VECTORSTORE, "outra", {})
+    assert other is not job
+    for process in manager._ctx.processes:
+        process.exit(0)
+
+
+def test_cancel_keeps_base_busy_until_process_exits(manager):
+    job = manager.submit(JOB_CREATE_VECTORSTORE, "base", {})
+    process = manager._ctx.processes[0]
+
+    manager.cancel(job.id)
+    assert process.terminated
+    assert job.status == "cancelling"
+    assert job.status in ACTIVE_STATUSES
+    assert manager.active("base") is job
+    with pytest.raises(JobConflictError):
+        manager.submit(JOB_PROCESS_DOCUMENTS, "base", {})
+
+    # O processo ainda grava os arquivos: a base só é liberada quando ele termina
+    time.sleep(1.2)
+    assert job.status == "cancelling"
+
+    process.exit(-15)
+    assert wait_for(lambda: job.status == "cancelled")
+    assert job.finished_at is not None
+    assert manager.active("base") is None
+    assert manager.submit(JOB_PROCESS_DOCUMENTS, "base", {}) is not job
+    manager._ctx.processes[-1].exit(0)
+
+
+def test_cancelled_job_ignores_late_result(manager):
+    finished = []
+    job = manager.submit(JOB_CREATE_VECTORSTORE, "base", {}, on_success=finished.append)
+    manager.cancel(job.id)
+    manager._ctx.queues[0].put({"type": "result", "result": {"status": "success"}})
+    manager._ctx.processes[0].exit(0)
+    assert wait_for(lambda: job.status == "cancelled")
+    assert finished == []
+
+
+def test_process_exit_without_result_fails_job(manager):
+    job = manager.submit(JOB_PROCESS_DOCUMENTS, "base", {})
+    manager._ctx.processes[0].exit(1)
+    assert wait_for(lambda: job.status == "failed")
+    assert "código 1" in job.error
@@ -0,0 +1,120 @@
+import pytest
+
+import session_store
+from session_store import SessionStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(session_store.time, "monotonic", fake)
+    return fake
+
+
+def turn(question, answer="resposta"):
+    return {"question": question, "answer": answer}
+
+
+def test_append_and_get_history_returns_copy():
+    store = SessionStore()
+    store.append("s1", "q1", "a1")
+    history = store.get_history("s1")
+    history.append(turn("externo"))
+    assert store.get_history("s1") == [turn("q1", "a1")]
+
+
+def test_sessionless_requests_do_not_share_history():
+    store = SessionStore()
+    store.append(None, "q1", "a1")
+    store.append("", "q2", "a2")
+    assert store.get_history(None) == []
+    assert store.get_summary(None) == ""
+    assert store.peek(None) == ("", [], 0)
+    assert store.stats()["active_sessions"] == 0
+
+
+def test_turns_are_capped_per_session():
+    store = SessionStore(max_turns=3)
+    for i in range(5):
+        store.append("s1", f"q{i}", "a")
+    assert [t["question"] for t in store.get_history("s1")] == ["q2", "q3", "q4"]
+    assert store.stats()["total_chars"] == 3 * len("q0a")
+
+
+def test_sessions_expire_after_ttl(clock):
+    store = SessionStore(ttl_seconds=60)
+    store.append("velha", "q", "a")
+    clock.now += 30
+    store.append("nova", "q", "a")
+    clock.now += 40
+    assert store.get_history("velha") == []
+    assert store.get_history("nova") == [turn("q", "a")]
+    assert store.stats()["active_sessions"] == 1
+
+
+def test_least_recently_used_session_is_evicted(clock):
+    store = SessionStore(max_sessions=2)
+    store.append("s1", "q", "a")
+    store.append("s2", "q", "a")
+    clock.now += 1
+    store.get_history("s1")  # s1 passa a ser a mais recente
+    store.append("s3", "q", "a")
+    assert store.get_history("s2") == []
+    assert store.get_history("s1") and store.get_history("s3")
+
+
+def test_char_budget_evicts_old_sessions_but_keeps_current():
+    store = SessionStore(max_chars=25)
+    store.append("s1", "q" * 10, "a")
+    store.append("s2", "q" * 10, "a")
+    store.append("s3", "q" * 10, "a")
+    stats = store.stats()
+    assert stats["total_chars"] <= 25
+    assert store.get_history("s1") == []
+    assert store.get_history("s3")
+    # Uma única sessão acima do orçamento é mantida
+    store.append("s3", "q" * 50, "a")
+    assert store.get_history("s3")
+
+
+def test_apply_summary_folds_turns_and_keeps_new_ones():
+    store = SessionStore()
+    for i in range(4):
+        store.append("s1", f"q{i}", "a")
+    _, turns, generation = store.peek("s1")
+    store.append("s1", "q4", "a")  # chega enquanto o resumo é gerado
+    assert store.apply_summary("s1", "resumo", turns[:3], generation)
+    summary, remaining, _ = store.peek("s1")
+    assert summary == "resumo"
+    assert [t["question"] for t in remaining] == ["q3", "q4"]
+    assert store.stats()["total_chars"] == len("resumo") + 2 * len("q0a")
+
+
+def test_apply_summary_is_skipped_after_reset():
+    store = SessionStore()
+    for i in range(3):
+        store.append("s1", f"q{i}", "a")
+    _, turns, generation = store.peek("s1")
+    store.reset("s1")
+    store.append("s1", "nova", "a")
+    assert not store.apply_summary("s1", "resumo antigo", turns, generation)
+    assert store.peek("s1")[:2] == ("", [turn("nova", "a")])
+
+
+def test_apply_summary_is_skipped_after_clear_and_for_missing_sessions():
+    store = SessionStore()
+    store.append("s1", "q", "a")
+    _, turns, generation = store.peek("s1")
+    store.clear()
+    assert not store.apply_summary("s1", "resumo", turns, generation)
+    store.append("s1", "q", "a")
+    assert not store.apply_summary("s1", "resumo", turns, generation)
+    assert not store.apply_summary("outra", "resumo", turns, generation)
@@ -0,0 +1,57 @@
+from transform_gate import TransformGate, history_key, references_history
+
+HISTORY = [{"question": "Como faço a matrícula?", "answer": "Pelo SIGAA, no período de matrícula."}]
+
+
+def test_references_history():
+    assert references_history("E no mestrado?")
+    assert references_history("Qual o prazo para isso no próximo semestre?")
+    assert not references_history("Qual o prazo para trancamento de matrícula na graduação?")
+
+
+def test_history_key_depends_on_turns_and_summary():
+    assert history_key(HISTORY) == history_key(list(HISTORY))
+    assert history_key(HISTORY) != history_key(HISTORY, "resumo")
+    assert history_key(HISTORY) != history_key([])
+
+
+def test_llm_is_skipped_without_history_or_references():
+    gate = TransformGate()
+    assert gate.lookup("E isso?", []) == "E isso?"
+    question = "Qual o prazo para trancamento de matrícula na graduação?"
+    assert gate.lookup(question, HISTORY) == question
+    stats = gate.stats()
+    assert stats["skipped_empty_history"] == 1
+    assert stats["skipped_no_references"] == 1
+    assert stats["llm_calls"] == 0
+
+
+def test_transformation_is_cached_per_history():
+    gate = TransformGate()
+    assert gate.lookup("E no mestrado?", HISTORY) is None
+    gate.store("E no mestrado?", HISTORY, "", "Como faço a matrícula no mestrado?")
+    assert gate.lookup("E  no mestrado?", HISTORY) == "Como faço a matrícula no mestrado?"
+    # Outro histórico (ou resumo) não reaproveita a transformação
+    assert gate.lookup("E no mestrado?", HISTORY, "resumo") is None
+    stats = gate.stats()
+    assert stats["cache_hits"] == 1
+    assert stats["llm_calls"] == 2
+
+
+def test_lru_evicts_least_recently_used():
+    gate = TransformGate(max_size=2)
+    for question in ("E isso?", "E aquilo?"):
+        gate.store(question, HISTORY, "", f"transformada: {question}")
+    assert gate.lookup("E isso?", HISTORY) == "transformada: E isso?"  # passa a ser a mais recente
+    gate.store("E o outro?", HISTORY, "", "transformada: E o outro?")
+    assert gate.lookup("E aquilo?", HISTORY) is None
+    assert gate.lookup("E isso?", HISTORY) == "transformada: E isso?"
+    assert gate.stats()["entries"] == 2
+
+
+def test_disabled_gate_always_calls_llm():
+    gate = TransformGate(enabled=False)
+    gate.store("E isso?", HISTORY, "", "x")
+    assert gate.lookup("E isso?", HISTORY) is None
+    assert gate.lookup("E isso?", []) is None
+    assert gate.stats()["llm_calls"] == 2
@@ -0,0 +1,116 @@
+import json
+
+import numpy as np
+import pytest
+
+import vector_cache
+from vector_cache import INDEX_FILE, INDEX_LOG_FILE, VECTORS_FILE, VectorCache, cache_stats_all
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(0).random((40, 4), dtype=np.float32)
+
+
+def hashes(start, stop):
+    return [f"h{i}" for i in range(start, stop)]
+
+
+def assert_cached(cache, vectors, indices):
+    found = cache.get_many(hashes(0, len(vectors)))
+    assert sorted(found) == sorted(f"h{i}" for i in indices)
+    for i in indices:
+        np.testing.assert_allclose(found[f"h{i}"], vectors[i])
+
+
+def test_batches_go_to_the_log_without_rewriting_the_index(tmp_path, vectors):
+    cache = VectorCache("org/modelo", str(tmp_path))
+    cache.put_many(hashes(0, 3), vectors[:3])
+    index_file = cache.path / INDEX_FILE
+    written = index_file.stat().st_mtime_ns
+
+    cache.put_many(hashes(3, 6), vectors[3:6])
+    cache.put_many(hashes(0, 3), vectors[:3])  # já em cache: nada é gravado
+    assert index_file.stat().st_mtime_ns == written
+    assert len((cache.path / INDEX_LOG_FILE).read_text().splitlines()) == 3
+    assert_cached(cache, vectors, range(6))
+
+
+def test_other_instances_see_appended_rows(tmp_path, vectors):
+    writer = VectorCache("modelo", str(tmp_path))
+    reader = VectorCache("modelo", str(tmp_path))
+    writer.put_many(hashes(0, 4), vectors[:4])
+    reader.put_many(hashes(4, 6), vectors[4:6])
+    assert_cached(writer, vectors, range(6))
+    assert_cached(reader, vectors, range(6))
+
+
+def test_log_is_folded_into_the_index(tmp_path, vectors, monkeypatch):
+    monkeypatch.setattr(vector_cache, "INDEX_LOG_MIN_FOLD", 4)
+    cache = VectorCache("modelo", str(tmp_path))
+    for start in range(0, 12, 2):
+        cache.put_many(hashes(start, start + 2), vectors[start:start + 2])
+    with open(cache.path / INDEX_FILE, encoding="utf-8") as f:
+        rows = json.load(f)["rows"]
+    log_file = cache.path / INDEX_LOG_FILE
+    log_entries = len(log_file.read_text().splitlines()) if log_file.exists() else 0
+    assert len(rows) + log_entries == 12
+    assert log_entries <= 4
+    assert_cached(VectorCache("modelo", str(tmp_path)), vectors, range(12))
+
+
+def test_replay_skips_a_log_line_cut_by_a_crash(tmp_path, vectors):
+    cache = VectorCache("modelo", str(tmp_path))
+    cache.put_many(hashes(0, 3), vectors[:3])
+    cache.put_many(hashes(3, 5), vectors[3:5])
+    # Processo morto no meio da gravação do log
+    with open(cache.path / INDEX_LOG_FILE, "a", encoding="utf-8") as f:
+        f.write("h9\t1")
+
+    reopened = VectorCache("modelo", str(tmp_path))
+    assert_cached(reopened, vectors, range(5))
+    reopened.put_many(hashes(5, 7), vectors[5:7])
+    assert_cached(VectorCache("modelo", str(tmp_path)), vectors, range(7))
+
+
+def test_vectors_written_without_log_entries_are_orphans(tmp_path, vectors):
+    cache = VectorCache("modelo", str(tmp_path))
+    cache.put_many(hashes(0, 3), vectors[:3])
+    # Processo morto depois de gravar os vetores e antes do log
+    with open(cache.path / VECTORS_FILE, "ab") as f:
+        f.write(vectors[3:5].tobytes())
+
+    reopened = VectorCache("modelo", str(tmp_path))
+    assert_cached(reopened, vectors, range(3))
+    reopened.put_many(hashes(5, 7), vectors[5:7])
+    assert_cached(reopened, vectors, [0, 1, 2, 5, 6])
+    assert reopened.stats()["rows_on_disk"] == 7
+
+    result = reopened.compact()
+    assert result["entries"] == 5
+    assert reopened.stats()["rows_on_disk"] == 5
+    assert_cached(VectorCache("modelo", str(tmp_path)), vectors, [0, 1, 2, 5, 6])
+
+
+def test_compact_keeps_only_requested_hashes_and_drops_the_log(tmp_path, vectors):
+    cache = VectorCache("modelo", str(tmp_path))
+    cache.put_many(hashes(0, 4), vectors[:4])
+    cache.put_many(hashes(4, 8), vectors[4:8])
+    result = cache.compact(hashes(0, 8)[::2])
+    assert result["removed"] == 4
+    assert not (cache.path / INDEX_LOG_FILE).exists()
+    assert_cached(VectorCache("modelo", str(tmp_path)), vectors, [0, 2, 4, 6])
+
+
+def test_dimension_mismatch_is_rejected(tmp_path, vectors):
+    cache = VectorCache("modelo", str(tmp_path))
+    cache.put_many(hashes(0, 1), vectors[:1])
+    with pytest.raises(ValueError):
+        cache.put_many(["x"], np.zeros((1, 8), dtype=np.float32))
+
+
+def test_stats_for_all_models(tmp_path, vectors):
+    VectorCache("org/a", str(tmp_path)).put_many(hashes(0, 2), vectors[:2])
+    VectorCache("org/b", str(tmp_path)).put_many(hashes(0, 3), vectors[:3])
+    stats = {s["model_id"]: s["entries"] for s in cache_stats_all(str(tmp_path))}
+    assert stats == {"org/a": 2, "org/b": 3}
@@ -0,0 +1,137 @@
+import os
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from embedding_cache import normalize_query
+
+load_dotenv()
+
+TRANSFORM_GATE_ENABLED = os.getenv("TRANSFORM_GATE_ENABLED", "true").lower() == "true"
+TRANSFORM_CACHE_SIZE = int(os.getenv("TRANSFORM_CACHE_SIZE", 1024))
+# Perguntas com até este número de palavras são tratadas como elípticas ("E no mestrado?")
+ELLIPTICAL_MAX_WORDS = 3
+
+# Pronomes e referências dêiticas/anafóricas que só fazem sentido com o histórico
+REFERENCE_WORDS = {
+    "ele", "ela", "eles", "elas", "dele", "dela", "deles", "delas", "nele", "nela", "neles", "nelas",
+    "isso", "isto", "aquilo", "disso", "disto", "daquilo", "nisso", "nisto", "naquilo",
+    "esse", "essa", "esses", "essas", "desse", "dessa", "desses", "dessas", "nesse", "nessa",
+    "este", "esta", "estes", "estas", "deste", "desta", "destes", "destas", "neste", "nesta",
+    "aquele", "aquela", "aqueles", "aquelas", "daquele", "daquela", "naquele", "naquela",
+    "lo", "la", "los", "las", "lhe", "lhes", "mesmo", "mesma", "mesmos", "mesmas",
+    "anterior", "acima", "citado", "citada", "mencionado", "mencionada", "referido", "referida",
+    "ali", "lá", "aí", "outro", "outra", "outros", "outras", "também", "tambem",
+}
+# Perguntas de continuação: "e ...?", "e quanto a ...", "mas e ..."
+CONTINUATION_PATTERN = re.compile(r"^(e|mas e|e quanto|e sobre|e se|e no|e na|e para)\b")
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def references_history(question: str) -> bool:
+    """Indica se a pergunta depende do histórico (pronomes, dêiticos ou elipse)."""
+    text = normalize_query(question).lower()
+    words = WORD_PATTERN.findall(text)
+    if len(words) <= ELLIPTICAL_MAX_WORDS or CONTINUATION_PATTERN.match(text):
+        return True
+    return any(word in REFERENCE_WORDS for word in words)
+
+
+def history_key(history: List[Dict[str, str]], summary: str = "") -> str:
+    digest = hashlib.sha1(summary.encode("utf-8"))
+    for turn in history:
+        digest.update(b"\0" + turn["question"].encode("utf-8") + b"\0" + turn["answer"].encode("utf-8"))
+    return digest.hexdigest()
+
+
+class TransformGate:
+    """
+    Decide se a transformação da pergunta pelo LLM é necessária. A chamada é
+    evitada quando não há histórico, quando a pergunta não tem pronomes nem
+    referências ao que foi dito antes, ou quando a mesma pergunta já foi
+    transformada com o mesmo histórico (cache LRU por hash do histórico).
+    """
+
+    def __init__(self, max_size: int = TRANSFORM_CACHE_SIZE, enabled: bool = TRANSFORM_GATE_ENABLED):
+        self.max_size = max_size
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self.requests = 0
+        self.skipped_empty_history = 0
+        self.skipped_no_references = 0
+        self.cache_hits = 0
+        self.llm_calls = 0
+
+    @staticmethod
+    def _key(question: str, history: List[Dict[str, str]], summary: str) -> Tuple[str, str]:
+        return history_key(history, summary), normalize_query(question)
+
+    def lookup(self, question: str, history: List[Dict[str, str]], summary: str = "") -> Optional[str]:
+        """
+        Retorna a query a usar sem chamar o LLM (a própria pergunta ou uma
+        transformação em cache), ou None se o LLM precisa ser chamado.
+        """
+        with self._lock:
+            self.requests += 1
+        if not self.enabled:
+            with self._lock:
+                self.llm_calls += 1
+            return None
+
+        if not history and not summary:
+            with self._lock:
+                self.skipped_empty_history += 1
+            return question
+        if not references_history(question):
+            with self._lock:
+                self.skipped_no_references += 1
+            return question
+
+        key = self._key(question, history, summary)
+        with self._lock:
+            transformed = self._entries.get(key)
+            if transformed is not None:
+                self._entries.move_to_end(key)
+                self.cache_hits += 1
+                return transformed
+            self.llm_calls += 1
+        return None
+
+    def store(self, question: str, history: List[Dict[str, str]], summary: str, transformed: str):
+        if not self.enabled:
+            return
+        key = self._key(question, history, summary)
+        with self._lock:
+            self._entries[key] = transformed
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            avoided = self.skipped_empty_history + self.skipped_no_references + self.cache_hits
+            return {
+                "enabled": self.enabled,
+                "requests": self.requests,
+                "skipped_empty_history": self.skipped_empty_history,
+                "skipped_no_references": self.skipped_no_references,
+                "cache_hits": self.cache_hits,
+                "llm_calls": self.llm_calls,
+                "llm_calls_avoided": avoided,
+                "avoided_rate": round(avoided / self.requests, 4) if self.requests else 0.0,
+                "entries": len(self._entries),
+                "max_size": self.max_size,
+            }
+
+
+# Instância global usada por transform_query e atransform_query
+transform_gate = TransformGate()
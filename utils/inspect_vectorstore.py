@@ -1,8 +1,12 @@
 import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
-from langchain_huggingface.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
+
+# Permite importar os módulos da raiz do projeto
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from embedding_registry import get_embeddings
+from vectorstore_io import get_index_embedding_model, load_vectorstore
 
 # --- Configurações ---
 # Garanta que estas configurações sejam as mesmas usadas no ingest.py
@@ -23,12 +27,8 @@ def inspect_vector_store():
 
     # 1. Carregar o Vector Store do disco
     print(f"🔍 Carregando índice de '{FAISS_INDEX_PATH}'...")
-    embeddings = HuggingFaceEmbeddings(model_name=EMBED_MODEL_ID)
-    vectorstore = FAISS.load_local(
-        FAISS_INDEX_PATH, 
-        embeddings, 
-        allow_dangerous_deserialization=True
-    )
+    embeddings = get_embeddings(get_index_embedding_model(FAISS_INDEX_PATH, default=EMBED_MODEL_ID))
+    vectorstore = load_vectorstore(FAISS_INDEX_PATH, embeddings)
     print("✅ Índice carregado com sucesso!")
     print("-" * 50)
 
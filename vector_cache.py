@@ -0,0 +1,259 @@
+import os
+import re
+import json
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos
+    fcntl = None
+
+load_dotenv()
+
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "true").lower() == "true"
+EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", "embedding_cache")
+
+VECTORS_FILE = "vectors.f32"
+INDEX_FILE = "index.json"
+# Linhas novas ("hash\tlinha") acrescentadas desde a última reescrita do index.json
+INDEX_LOG_FILE = "index.log"
+LOCK_FILE = ".lock"
+# O log é incorporado ao index.json quando passa deste número de entradas
+# (ou do tamanho do próprio índice, o que for maior)
+INDEX_LOG_MIN_FOLD = 4096
+
+
+def model_slug(model_id: str) -> str:
+    """Nome de diretório seguro para o model id."""
+    return re.sub(r"[^\w.-]", "_", model_id)
+
+
+class VectorCache:
+    """
+    Cache persistente de embeddings de chunks de um modelo.
+
+    Os vetores ficam em um arquivo float32 contínuo (lido via memmap) e o
+    arquivo index.json mapeia o hash do chunk para a linha correspondente.
+    Novos vetores são apenas acrescentados ao final, e suas linhas vão para o
+    log index.log; o index.json só é reescrito quando o log é incorporado a
+    ele (em compact() ou quando o log cresce além do índice), de modo que cada
+    lote da ingestão grava apenas o que acrescentou. compact() reescreve o
+    arquivo de vetores mantendo somente as linhas em uso.
+    """
+
+    def __init__(self, model_id: str, cache_dir: str = EMBED_CACHE_DIR):
+        self.model_id = model_id
+        self.path = Path(cache_dir) / model_slug(model_id)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._thread_lock = threading.Lock()
+        self.dim: Optional[int] = None
+        self.rows: Dict[str, int] = {}
+        self._index_stamp = None
+        self._log_offset = 0
+        self._log_entries = 0
+        self._load_index()
+
+    @contextmanager
+    def _lock(self):
+        with self._thread_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.path / LOCK_FILE, "w") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load_index(self):
+        """
+        Atualiza o mapeamento hash -> linha. O index.json só é relido se mudou
+        (outro processo o reescreveu); do log são lidas apenas as entradas
+        acrescentadas desde a última leitura.
+        """
+        index_file = self.path / INDEX_FILE
+        stamp = None
+        if index_file.exists():
+            stat = index_file.stat()
+            stamp = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if stamp != self._index_stamp:
+            if stamp is not None:
+                with open(index_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self.dim = data.get("dim")
+                self.rows = data.get("rows", {})
+            else:
+                self.dim = None
+                self.rows = {}
+            self._index_stamp = stamp
+            self._log_offset = 0
+            self._log_entries = 0
+        self._read_log()
+
+    def _read_log(self):
+        log_file = self.path / INDEX_LOG_FILE
+        if not log_file.exists():
+            return
+        with open(log_file, "rb") as f:
+            f.seek(self._log_offset)
+            data = f.read()
+        # Uma linha sem "\n" no final é uma gravação interrompida e é ignorada
+        complete = data[:data.rfind(b"\n") + 1]
+        for line in complete.decode("utf-8").splitlines():
+            parts = line.split("\t")
+            if len(parts) == 2 and parts[1].isdigit():
+                self.rows[parts[0]] = int(parts[1])
+                self._log_entries += 1
+        self._log_offset += len(complete)
+
+    def _append_log(self, entries: List[str]):
+        log_file = self.path / INDEX_LOG_FILE
+        # Descarta a linha incompleta de uma gravação interrompida (sob a trava,
+        # ninguém mais está escrevendo), para que ela não se junte às novas
+        if log_file.exists() and log_file.stat().st_size > self._log_offset:
+            os.truncate(log_file, self._log_offset)
+        with open(log_file, "a", encoding="utf-8") as f:
+            f.write("".join(entry + "\n" for entry in entries))
+            f.flush()
+            os.fsync(f.fileno())
+        self._read_log()
+
+    def _save_index(self):
+        """Reescreve o index.json com todas as entradas e descarta o log."""
+        index_file = self.path / INDEX_FILE
+        tmp_file = index_file.with_suffix(".json.tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump({"model_id": self.model_id, "dim": self.dim, "rows": self.rows}, f)
+        os.replace(tmp_file, index_file)
+        (self.path / INDEX_LOG_FILE).unlink(missing_ok=True)
+        stat = index_file.stat()
+        self._index_stamp = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        self._log_offset = 0
+        self._log_entries = 0
+
+    def _row_count(self) -> int:
+        vectors_file = self.path / VECTORS_FILE
+        if self.dim is None or not vectors_file.exists():
+            return 0
+        return vectors_file.stat().st_size // (4 * self.dim)
+
+    def _memmap(self) -> Optional[np.memmap]:
+        rows = self._row_count()
+        if rows == 0:
+            return None
+        return np.memmap(self.path / VECTORS_FILE, dtype=np.float32, mode="r", shape=(rows, self.dim))
+
+    def get_many(self, hashes: Iterable[str]) -> Dict[str, List[float]]:
+        """Retorna os vetores em cache para os hashes informados (ausentes são omitidos)."""
+        with self._lock():
+            self._load_index()
+            matrix = self._memmap()
+            if matrix is None:
+                return {}
+            found = {}
+            for chunk_hash in hashes:
+                row = self.rows.get(chunk_hash)
+                if row is not None and row < matrix.shape[0]:
+                    found[chunk_hash] = matrix[row].tolist()
+            return found
+
+    def put_many(self, hashes: List[str], vectors: List[List[float]]):
+        """Acrescenta novos vetores ao cache (vetores no arquivo, linhas no log)."""
+        if not hashes:
+            return
+        array = np.asarray(vectors, dtype=np.float32)
+        with self._lock():
+            self._load_index()
+            if self.dim is None:
+                self.dim = int(array.shape[1])
+            if array.shape[1] != self.dim:
+                raise ValueError(f"Dimensão {array.shape[1]} diferente da dimensão do cache ({self.dim})")
+
+            # A próxima linha vem do tamanho real do arquivo (linhas órfãs são ignoradas)
+            next_row = self._row_count()
+            new_rows, entries = [], []
+            for chunk_hash, vector in zip(hashes, array):
+                if chunk_hash not in self.rows:
+                    entries.append(f"{chunk_hash}\t{next_row + len(new_rows)}")
+                    self.rows[chunk_hash] = next_row + len(new_rows)
+                    new_rows.append(vector)
+            if not new_rows:
+                return
+
+            with open(self.path / VECTORS_FILE, "ab") as f:
+                f.write(np.stack(new_rows).astype(np.float32).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            # Os vetores são gravados antes das linhas do log que apontam para eles
+            self._append_log(entries)
+            # Cache novo: o index.json é criado já no primeiro lote (com o model id e a dimensão)
+            if self._index_stamp is None or self._log_entries > max(INDEX_LOG_MIN_FOLD, len(self.rows) - self._log_entries):
+                self._save_index()
+
+    def compact(self, keep_hashes: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """
+        Reescreve o cache mantendo apenas os hashes informados (ou todos os
+        referenciados no índice, descartando linhas órfãs).
+        """
+        with self._lock():
+            self._load_index()
+            before_bytes = self.size_bytes()
+            matrix = self._memmap()
+            keep = set(self.rows) if keep_hashes is None else set(keep_hashes) & set(self.rows)
+            if matrix is None:
+                if self._log_entries:
+                    self._save_index()
+                return {"entries": 0, "removed": 0, "bytes_before": before_bytes, "bytes_after": before_bytes}
+
+            ordered = sorted(keep, key=lambda chunk_hash: self.rows[chunk_hash])
+            tmp_file = self.path / f"{VECTORS_FILE}.tmp"
+            with open(tmp_file, "wb") as f:
+                for start in range(0, len(ordered), 4096):
+                    rows = [self.rows[chunk_hash] for chunk_hash in ordered[start:start + 4096]]
+                    f.write(np.asarray(matrix[rows], dtype=np.float32).tobytes())
+            del matrix
+            os.replace(tmp_file, self.path / VECTORS_FILE)
+
+            removed = len(self.rows) - len(ordered)
+            self.rows = {chunk_hash: row for row, chunk_hash in enumerate(ordered)}
+            self._save_index()
+            return {
+                "entries": len(self.rows),
+                "removed": removed,
+                "bytes_before": before_bytes,
+                "bytes_after": self.size_bytes(),
+            }
+
+    def size_bytes(self) -> int:
+        return sum(f.stat().st_size for f in self.path.iterdir() if f.is_file())
+
+    def stats(self) -> Dict[str, object]:
+        self._load_index()
+        return {
+            "model_id": self.model_id,
+            "path": str(self.path),
+            "entries": len(self.rows),
+            "rows_on_disk": self._row_count(),
+            "dim": self.dim,
+            "size_mb": round(self.size_bytes() / (1024 * 1024), 2),
+        }
+
+
+def cache_stats_all(cache_dir: str = EMBED_CACHE_DIR) -> List[Dict[str, object]]:
+    """Estatísticas de todos os caches de modelos existentes no diretório."""
+    root = Path(cache_dir)
+    if not root.is_dir():
+        return []
+    stats = []
+    for model_dir in sorted(p for p in root.iterdir() if (p / INDEX_FILE).exists()):
+        with open(model_dir / INDEX_FILE, "r", encoding="utf-8") as f:
+            model_id = json.load(f).get("model_id", model_dir.name)
+        stats.append(VectorCache(model_id, cache_dir).stats())
+    return stats
@@ -0,0 +1,270 @@
+import os
+import json
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import faiss
+import numpy as np
+from dotenv import load_dotenv
+from langchain_community.vectorstores import FAISS
+
+from ann_index import ANN_RESCORE_FACTOR, apply_search_params, open_full_vectors, rescored_search
+from chunk_store import DOCSTORE_DB_FILE, SQLiteDocstore, convert_pickle_docstore, write_docstore
+from sparse_index import BM25Index
+
+load_dotenv()
+
+EMBED_MODEL_ID = os.getenv("EMBED_MODEL_ID")
+# Abre o index.faiss via memory-map (compartilhado entre processos pelo page cache)
+FAISS_MMAP = os.getenv("FAISS_MMAP", "true").lower() == "true"
+
+INDEX_META_FILE = "index_meta.json"
+INDEX_FILE = "index.faiss"
+# Formato antigo do docstore (convertido para SQLite no primeiro carregamento)
+LEGACY_DOCSTORE_FILE = "index.pkl"
+
+
+class IndexMismatchError(Exception):
+    """O docstore em disco não corresponde ao index.faiss (publicação interrompida)."""
+
+
+def read_index_meta(faiss_index_path: str) -> Dict[str, Any]:
+    """Lê os metadados gravados junto ao índice (vazio para índices antigos)."""
+    meta_file = Path(faiss_index_path) / INDEX_META_FILE
+    if not meta_file.exists():
+        return {}
+    try:
+        with open(meta_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠️ Erro ao ler metadados do índice '{meta_file}': {e}")
+        return {}
+
+
+def write_index_meta(faiss_index_path: str, **meta: Any) -> Dict[str, Any]:
+    """Grava os metadados do índice de forma atômica, preservando campos existentes."""
+    data = read_index_meta(faiss_index_path)
+    data.update(meta)
+    data["updated_at"] = datetime.now().isoformat()
+
+    meta_file = Path(faiss_index_path) / INDEX_META_FILE
+    tmp_file = meta_file.with_suffix(".json.tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_file, meta_file)
+    return data
+
+
+def get_index_embedding_model(faiss_index_path: str, default: Optional[str] = EMBED_MODEL_ID) -> Optional[str]:
+    """Retorna o modelo de embeddings que construiu o índice (ou o padrão do .env)."""
+    return read_index_meta(faiss_index_path).get("embedding_model") or default
+
+
+def index_exists(faiss_index_path: str) -> bool:
+    return (Path(faiss_index_path) / INDEX_FILE).exists()
+
+
+class RescoringFAISS(FAISS):
+    """
+    Vector store FAISS que, quando há vetores em precisão total no disco, busca
+    mais candidatos no índice quantizado e os reordena pela distância exata.
+    """
+
+    full_vectors = None
+    rescore_factor = ANN_RESCORE_FACTOR
+    mmapped = False
+    # Índice BM25 da base (None se o índice foi criado antes da busca híbrida)
+    sparse_index = None
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4, filter=None, fetch_k=20, **kwargs):
+        if self.full_vectors is None or filter is not None:
+            return super().similarity_search_with_score_by_vector(embedding, k=k, filter=filter, fetch_k=fetch_k, **kwargs)
+
+        query = np.asarray([embedding], dtype=np.float32)
+        if self._normalize_L2:
+            faiss.normalize_L2(query)
+        distances, positions = rescored_search(self.index, self.full_vectors, query, k, self.rescore_factor)
+
+        docs = []
+        for distance, position in zip(distances, positions):
+            doc = self.docstore.search(self.index_to_docstore_id[int(position)])
+            docs.append((doc, float(distance)))
+        score_threshold = kwargs.get("score_threshold")
+        if score_threshold is not None:
+            docs = [(doc, score) for doc, score in docs if score <= score_threshold]
+        return docs
+
+
+# IO_FLAG_MMAP só mapeia as listas invertidas dos índices IVF; IO_FLAG_MMAP_IFC
+# (faiss >= 1.10) mapeia também os códigos dos índices flat, HNSW, SQ e PQ
+MMAP_READ_FLAG = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+
+
+def _is_view(codes) -> bool:
+    """Indica se um vetor de códigos do faiss aponta para o arquivo mapeado (não é uma cópia)."""
+    return hasattr(codes, "is_owned") and codes.size() > 0 and not codes.is_owned
+
+
+def is_index_mapped(index) -> bool:
+    """Indica se os dados do índice são lidos do arquivo mapeado em vez de copiados para o heap."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIDMap):
+        index = faiss.downcast_index(index.index)
+    if isinstance(index, faiss.IndexHNSW):
+        index = faiss.downcast_index(index.storage)
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except RuntimeError:
+        ivf = None
+    if ivf is not None:
+        invlists = faiss.downcast_InvertedLists(ivf.invlists)
+        if isinstance(invlists, faiss.OnDiskInvertedLists):
+            return True
+        codes = getattr(invlists, "codes", None)
+        if codes is None:
+            return False
+        lists = [codes.at(i) for i in range(invlists.nlist) if invlists.list_size(i)]
+        return bool(lists) and all(_is_view(c) for c in lists)
+    codes = getattr(index, "codes", None)
+    return codes is not None and _is_view(codes)
+
+
+def read_faiss_index(index_file: str, mmap: bool = FAISS_MMAP):
+    """
+    Lê o índice FAISS. Com mmap=True o arquivo é mapeado em memória (somente
+    leitura): a abertura é quase instantânea e os processos que abrem o mesmo
+    arquivo compartilham as páginas. Se o tipo de índice não permitir, carrega
+    normalmente. Retorna (índice, mapeado); mapeado só é True quando os dados
+    do índice ficam de fato no arquivo mapeado, e não no heap do processo.
+    """
+    if mmap:
+        try:
+            index = faiss.read_index(str(index_file), MMAP_READ_FLAG | faiss.IO_FLAG_READ_ONLY)
+            mapped = is_index_mapped(index)
+            if not mapped:
+                print(f"⚠️ Índice '{index_file}' carregado em memória: este tipo de índice não é mapeado nesta versão do faiss.")
+            return index, mapped
+        except RuntimeError as e:
+            print(f"⚠️ Índice '{index_file}' não pode ser mapeado em memória, carregando por completo: {e}")
+    return faiss.read_index(str(index_file)), False
+
+
+def file_checksum(path) -> int:
+    """CRC32 do conteúdo do arquivo."""
+    checksum = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            checksum = zlib.crc32(block, checksum)
+    return checksum
+
+
+def index_stamp(index_file) -> Dict[str, int]:
+    """
+    Identifica um index.faiss: inode, tamanho e mtime (preservados pelo
+    os.replace) e o CRC32 do conteúdo, usado quando o diretório foi copiado.
+    """
+    stat = os.stat(index_file)
+    return {"inode": stat.st_ino, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+            "crc32": file_checksum(index_file)}
+
+
+def _file_id(index_file):
+    stat = os.stat(index_file)
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def matches_stamp(index_file, stamp: Optional[Dict[str, int]], file_id=None) -> bool:
+    """Indica se o index.faiss é o que foi gravado junto com o docstore."""
+    if stamp is None:
+        return True  # docstore anterior à marcação: não há como conferir
+    file_id = file_id or _file_id(index_file)
+    if file_id == (stamp["inode"], stamp["size"], stamp["mtime_ns"]):
+        return True
+    # Diretório copiado ou restaurado (novo inode): confere pelo conteúdo
+    return file_id[1] == stamp["size"] and file_checksum(index_file) == stamp["crc32"]
+
+
+# Tentativas de leitura de um par índice/docstore consistente enquanto outro
+# processo publica uma nova versão (o docstore é trocado antes do index.faiss)
+LOAD_ATTEMPTS = 5
+LOAD_RETRY_SECONDS = 0.5
+
+
+def load_vectorstore(faiss_index_path: str, embedding, mmap: Optional[bool] = None):
+    """
+    Carrega o vector store FAISS salvo em disco e aplica os parâmetros de busca
+    (nprobe / efSearch) registrados na especificação do índice. Índices
+    quantizados com rerank usam os vetores em precisão total via memmap.
+    mmap (padrão: FAISS_MMAP) mapeia o índice em memória; um índice mapeado é
+    somente leitura, então quem vai alterá-lo deve passar mmap=False.
+    embedding pode ser None para quem só remove ou regrava chunks (sem buscas).
+    O texto dos chunks fica no SQLite e é lido sob demanda; um index.pkl antigo
+    é convertido na primeira vez. O índice BM25, se existir, é carregado junto.
+
+    O docstore guarda a identificação do index.faiss gravado com ele; se não
+    corresponderem (publicação interrompida), levanta IndexMismatchError em vez
+    de associar as posições do FAISS aos chunks errados.
+    """
+    index_dir = Path(faiss_index_path)
+    if not (index_dir / DOCSTORE_DB_FILE).exists() and (index_dir / LEGACY_DOCSTORE_FILE).exists():
+        try:
+            convert_pickle_docstore(faiss_index_path, index_dir / LEGACY_DOCSTORE_FILE)
+        except FileNotFoundError:
+            pass  # convertido por outro processo ao mesmo tempo
+
+    index_file = index_dir / INDEX_FILE
+    for attempt in range(LOAD_ATTEMPTS):
+        docstore = SQLiteDocstore(index_dir / DOCSTORE_DB_FILE)
+        file_id = _file_id(index_file)
+        index, mapped = read_faiss_index(index_file, FAISS_MMAP if mmap is None else mmap)
+        # O arquivo lido é o identificado se ele não foi trocado durante a leitura
+        if _file_id(index_file) == file_id and matches_stamp(index_file, docstore.load_index_stamp(), file_id):
+            break
+        docstore.close()
+        if attempt == LOAD_ATTEMPTS - 1:
+            raise IndexMismatchError(
+                f"O docstore de '{faiss_index_path}' não corresponde ao index.faiss "
+                "(gravação interrompida). Recrie o vector store da base."
+            )
+        time.sleep(LOAD_RETRY_SECONDS)
+    vectorstore = RescoringFAISS(embedding, index, docstore, docstore.load_positions())
+    vectorstore.mmapped = mapped
+    index_spec = read_index_meta(faiss_index_path).get("index_spec")
+    apply_search_params(vectorstore.index, index_spec)
+    if index_spec and index_spec.get("rerank"):
+        vectorstore.full_vectors = open_full_vectors(faiss_index_path, vectorstore.index.d)
+    vectorstore.sparse_index = BM25Index.load(faiss_index_path)
+    return vectorstore
+
+
+def save_vectorstore(vectorstore, faiss_index_path: str, before_publish: Optional[Callable[[], None]] = None):
+    """
+    Salva o vector store FAISS em disco (índice e docstore SQLite). Os arquivos
+    são gravados em temporários e substituídos com os.replace, para não alterar
+    os arquivos que outros processos mantêm abertos ou mapeados em memória.
+
+    O index.faiss é sempre o último arquivo publicado: a versão do índice (e a
+    recarga pelo pool nos outros processos) vem dele, então todos os demais
+    arquivos já precisam estar atualizados quando ele mudar. before_publish
+    grava os arquivos auxiliares (vetores em precisão total, BM25, metadados)
+    depois do docstore e antes do index.faiss. O docstore leva a identificação
+    do novo index.faiss, conferida por load_vectorstore, de modo que uma
+    interrupção entre as duas trocas não passa despercebida.
+    """
+    index_dir = Path(faiss_index_path)
+    index_dir.mkdir(parents=True, exist_ok=True)
+
+    tmp_index = index_dir / f"{INDEX_FILE}.tmp"
+    try:
+        faiss.write_index(vectorstore.index, str(tmp_index))
+        write_docstore(faiss_index_path, vectorstore.docstore, vectorstore.index_to_docstore_id,
+                       index_stamp=index_stamp(tmp_index))
+        if before_publish is not None:
+            before_publish()
+    except BaseException:
+        tmp_index.unlink(missing_ok=True)
+        raise
+    os.replace(tmp_index, index_dir / INDEX_FILE)